@@ -14,51 +14,81 @@ Usage:
     python3 ltx_generate.py a2v "scene prompt" --audio track.mp3            # Audio-to-video
     python3 ltx_generate.py --test                                          # Test API connection
     python3 ltx_generate.py --estimate t2v --model ltx-2-pro --duration 10 --resolution 4k
+    python3 ltx_generate.py batch jobs.jsonl --workers 4                    # Run a JSONL manifest
+    python3 ltx_generate.py validate jobs.jsonl                             # Check a manifest offline
+    python3 ltx_generate.py serve                                           # Resident daemon
+    python3 ltx_generate.py --daemon t2v "prompt"                           # Run via the daemon
+    python3 ltx_generate.py costs --by model --days 7                       # Spend report
+    python3 ltx_generate.py sweep grid.json --max-cost 5                    # Variant grid
 """
 
 import sys
 import os
+import io
+import html
 import json
-import urllib.request
-import urllib.parse
+import signal
+import socket
+import socketserver
+import threading
+import time
 import urllib.error
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+from datetime import datetime, timedelta
 from pathlib import Path
 
-BASE_URL = "https://api.ltx.video/v1"
-
-# Resolution mappings
-RESOLUTIONS = {
-    "1080p": "1920x1080",
-    "1080": "1920x1080",
-    "1920x1080": "1920x1080",
-    "1440p": "2560x1440",
-    "1440": "2560x1440",
-    "2560x1440": "2560x1440",
-    "2k": "2560x1440",
-    "4k": "3840x2160",
-    "2160p": "3840x2160",
-    "3840x2160": "3840x2160",
-    "uhd": "3840x2160",
-}
+# The client library lives next to the skill's script in scripts/
+sys.path.insert(0, str(Path(__file__).resolve().parent / "scripts"))
+
+from ltx_client import (  # noqa: E402
+    BASE_URL, CAMERA_MOTIONS, COST_PER_SEC, LATENCY, POOL, PRIORITIES, RESOLUTIONS, RETRY,
+    SCHEDULER, STATE_DIR, APIError, AsyncTransport, BudgetExceeded, GenerationRequest,
+    InvalidRequestError, JobRequeued, KeyPool, LTXClient, LTXError, SyncTransport, fix_request,
+    instrument, latency_profile, load_keys, parse_seconds, plan_sweep, print_costs, print_keys,
+    print_latency_stats, validate_fields, validate_request,
+)
+
+# Batch concurrency: starting workers and ceiling (standard tier allows 10)
+BATCH_WORKERS = 2
 
-# Cost per second estimates (USD)
-COST_PER_SEC = {
-    "ltx-2-fast": {"1920x1080": 0.02, "2560x1440": 0.04, "3840x2160": 0.08},
-    "ltx-2-pro":  {"1920x1080": 0.05, "2560x1440": 0.10, "3840x2160": 0.20},
+BATCH_MAX_WORKERS = 10
+
+# Manifest fields accepted by the batch subcommand (generate_video() kwargs)
+BATCH_FIELDS = {
+    "mode", "prompt", "model", "duration", "resolution", "fps", "camera_motion",
+    "generate_audio", "image_path", "audio_path", "output_path", "use_cache",
+    "cache_unseeded", "coalesce", "auto_fix", "project", "deadline", "priority",
 }
 
-CAMERA_MOTIONS = [
-    "dolly_in", "dolly_out", "pan_left", "pan_right",
-    "crane_up", "crane_down", "static", "handheld"
-]
+# Field defaults for manifest lines that leave them out
+DEFAULT_REQUEST = GenerationRequest("t2v", "")
+
+# Invalid lines listed by the validate subcommand before summarising
+VALIDATE_SHOW = 50
+
+# Concurrent jobs in a sweep
+SWEEP_WORKERS = 4
+
+# Manifest fields that describe the video itself (GenerationRequest fields)
+REQUEST_FIELDS = {
+    "mode", "prompt", "model", "duration", "resolution", "fps", "camera_motion",
+    "generate_audio", "image_path", "audio_path",
+}
 
 
 def get_token():
-    token = os.environ.get("LTX_API_KEY", "")
+    """The KeyPool of every configured API key (see load_keys())."""
+    try:
+        token = load_keys()
+    except LTXError as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        sys.exit(1)
     if not token:
         print("ERROR: LTX_API_KEY is not set.", file=sys.stderr)
         print("Set it with: export LTX_API_KEY=your_key_here", file=sys.stderr)
+        print("  (several keys: LTX_API_KEYS=\"k1,k2\" or LTX_API_KEYS_FILE=keys.txt)",
+              file=sys.stderr)
         print("Get your key at: https://console.ltx.video", file=sys.stderr)
         sys.exit(1)
     return token
@@ -86,10 +116,10 @@ def estimate_cost(model, resolution, duration):
     print(f"=====================")
 
 
-def ensure_output_dir():
-    out_dir = Path.home() / "Desktop" / "cineclaw"
-    out_dir.mkdir(parents=True, exist_ok=True)
-    return out_dir
+def print_pool_stats(pool=POOL):
+    stats = pool.stats()
+    print(f"  ✓ Connections: {stats['handshakes']} handshakes for {stats['requests']} requests "
+          f"({stats['reuse_ratio']:.0%} reused)")
 
 
 def test_connection(token):
@@ -102,15 +132,15 @@ def test_connection(token):
         "resolution": "1920x1080",
     }).encode("utf-8")
 
-    req = urllib.request.Request(url, data=payload, headers={
+    headers = {
         "Authorization": f"Bearer {token}",
         "Content-Type": "application/json",
         "User-Agent": "CineClaw/1.0",
-    })
+    }
 
     try:
         # We expect either success or a known error — either proves connectivity
-        with urllib.request.urlopen(req) as resp:
+        with POOL.request("POST", url, body=payload, headers=headers) as resp:
             print(f"OK - LTX-2 API working (HTTP {resp.status})")
             # Discard the test video data
             resp.read()
@@ -140,69 +170,164 @@ def test_connection(token):
         return False
 
 
+# Sync transport shared by every job in this process
+TRANSPORT = SyncTransport()
+
+
+def asset_location(location):
+    """A URL as is, or a local file as an absolute path (so the daemon finds it)."""
+    if not location or location.startswith(("http://", "https://")):
+        return location
+    return os.path.abspath(location)
+
+
+def stage_assets(paths):
+    """Upload the local files a batch or sweep uses, in parallel, before it starts.
+
+    Jobs would upload them on first use anyway; staging them up front keeps
+    uploads off the generation slots. Failures are left for the jobs to report.
+    """
+    assets = TRANSPORT.assets
+    if not paths or assets.store is None:
+        return
+    start = time.monotonic()
+    before = assets.stats()
+    urls, errors = assets.stage(sorted(paths))
+    after = assets.stats()
+    uploaded = after["uploads"] - before["uploads"]
+    size = (after["uploaded_bytes"] - before["uploaded_bytes"]) / (1024 * 1024)
+    print(f"[assets] {len(paths)} local file(s): {uploaded} uploaded ({size:.1f} MB), "
+          f"{len(urls) - uploaded} already stored, in {time.monotonic() - start:.1f}s")
+    for path, e in errors.items():
+        print(f"WARNING: {path}: {e}", file=sys.stderr)
+
+
+def print_event(event, **info):
+    """Render client progress events on the terminal."""
+    if event == "queued":
+        print(f"  Queued behind {info['ahead']} {info['priority']} job(s) for a free slot...")
+    elif event == "key_switched":
+        print(f"  {info['key']} refused the job (HTTP {info['status']}); trying another key...")
+    elif event == "uploaded":
+        print(f"  Uploaded {os.path.basename(info['path'])} "
+              f"({info['bytes'] / (1024 * 1024):.1f} MB in {info['seconds']:.1f}s)")
+    elif event == "deadline":
+        print(f"  Deadline: {info['change']}")
+    elif event == "download_retry":
+        print(f"  Download interrupted ({info['error']}). Resuming at {info['offset']} bytes "
+              f"in {info['delay']}s (attempt {info['attempt']}/{info['max_attempts']})...")
+    elif event == "phases":
+        # "http" spans wrap dns/connect/send/ttfb, which are listed on their own
+        print("  Phases: " + ", ".join(f"{name} {seconds:.2f}s"
+                                       for name, seconds in info["phases"].items()
+                                       if name != "http"))
+
+
+def report_error(e, report):
+    """Print an LTXError the way the CLI always has and note it in report."""
+    report["error"] = str(e)
+    if isinstance(e, BudgetExceeded):
+        report["budget_exceeded"] = True
+        print(f"ERROR: Not sent — {e}", file=sys.stderr)
+        print("  → Raise the cap in CINECLAW_BUDGETS, or see spend with: ltx_generate.py costs",
+              file=sys.stderr)
+        return
+    if isinstance(e, JobRequeued):
+        report["requeued"] = True
+        print(f"NOTE: Not sent — {e}", file=sys.stderr)
+        return
+    if not isinstance(e, APIError):
+        print(f"ERROR: {e}", file=sys.stderr)
+        if getattr(e, "part_path", None):
+            print(f"  → Partial file kept: {e.part_path}", file=sys.stderr)
+        return
+    report["http_status"] = e.status
+    report["error"] = e.message
+    if e.request_id:
+        report["request_id"] = e.request_id
+    print(f"ERROR: HTTP {e.status}", file=sys.stderr)
+    print(f"  {e.message}", file=sys.stderr)
+    if e.status == 401:
+        print("  → API key invalid. Get a new one at console.ltx.video", file=sys.stderr)
+    elif e.status == 403:
+        print("  → No credits. Add funds at console.ltx.video", file=sys.stderr)
+    elif e.status == 429:
+        print("  → Still rate limited after retries. Try again in a few minutes.", file=sys.stderr)
+    elif e.status in (500, 502, 503, 504):
+        print("  → API error persisted after retries. Try again later.", file=sys.stderr)
+    elif e.status == 422:
+        print("  → Invalid parameter combination. Check model/resolution/duration.", file=sys.stderr)
+
+
 def generate_video(mode, prompt, token, model="ltx-2-fast", duration=6,
                    resolution="1920x1080", fps=25, camera_motion=None,
                    generate_audio=True, image_path=None, audio_path=None,
-                   output_path=None):
-    """Generate a video via the LTX-2 API."""
-
-    # Determine endpoint
-    if mode == "t2v":
-        endpoint = f"{BASE_URL}/text-to-video"
-    elif mode == "i2v":
-        endpoint = f"{BASE_URL}/image-to-video"
-    elif mode == "a2v":
-        endpoint = f"{BASE_URL}/audio-to-video"
-    else:
-        print(f"ERROR: Unknown mode '{mode}'. Use t2v, i2v, or a2v.", file=sys.stderr)
-        sys.exit(1)
+                   output_path=None, report=None, use_cache=True, cache_unseeded=False,
+                   coalesce=True, auto_fix=False, project=None, deadline=None,
+                   priority="interactive"):
+    """Generate a video via the LTX-2 API.
 
-    # Build payload
-    payload = {
-        "prompt": prompt,
-        "model": model,
-        "duration": duration,
-        "resolution": resolution,
-        "fps": fps,
-        "generate_audio": generate_audio,
-    }
+    Identical requests are served from the result cache. The sync API takes
+    no seed, so results are only cached when cache_unseeded opts in. With
+    coalesce, a request identical to one already running (in this or another
+    process) waits for it and shares its video instead of paying again.
 
-    if camera_motion:
-        payload["camera_motion"] = camera_motion
-
-    # Audio-to-video constraints
-    if mode == "a2v":
-        payload["model"] = "ltx-2-pro"
-        payload["resolution"] = "1920x1080"
-        # Remove duration — driven by audio length
-        payload.pop("duration", None)
-        payload.pop("fps", None)
-        payload.pop("generate_audio", None)
-        if audio_path:
-            if audio_path.startswith("http"):
-                payload["audio_url"] = audio_path
-            else:
-                print("ERROR: Audio must be a public HTTPS URL for the API.", file=sys.stderr)
-                print("Upload your audio file first and provide the URL.", file=sys.stderr)
-                sys.exit(1)
+    Requests outside the supported configurations are rejected before
+    anything is sent, or with auto_fix moved to the nearest valid one. The
+    estimated cost is reserved against the daily and project budgets first.
+    With deadline (seconds, or text like "30s"), the best configuration whose
+    p90 latency fits is used instead, or the request is refused up front.
+    priority picks the scheduler class ("interactive" or "batch") the job
+    queues under for a generation slot.
 
-    # Image-to-video: add image URL
-    if mode == "i2v":
-        if image_path:
-            if image_path.startswith("http"):
-                payload["image_url"] = image_path
-            else:
-                print("ERROR: Image must be a public HTTPS URL for the API.", file=sys.stderr)
-                print("Upload your image first and provide the URL.", file=sys.stderr)
-                sys.exit(1)
-        else:
-            print("ERROR: Image-to-video requires --image URL.", file=sys.stderr)
-            sys.exit(1)
+    If report is a dict it is filled with the request id, estimated cost,
+    byte count and, on failure, the HTTP status and error message.
+    """
+    if report is None:
+        report = {}
+
+    if mode == "a2v" and model != "ltx-2-pro":
+        print("NOTE: Audio-to-video requires ltx-2-pro. Switching automatically.")
+        model = "ltx-2-pro"
+
+    request = GenerationRequest(mode, prompt, model, duration, resolution, fps,
+                                camera_motion=camera_motion, generate_audio=generate_audio,
+                                image_path=image_path, audio_path=audio_path)
+    problems = [] if auto_fix else validate_request(request)
+    if problems:
+        report["error"] = "; ".join(problems)
+        print("ERROR: Unsupported request (not sent):", file=sys.stderr)
+        for problem in problems:
+            print(f"  - {problem}", file=sys.stderr)
+        print("  → Pass --auto-fix to use the nearest supported configuration.", file=sys.stderr)
+        sys.exit(1)
+    try:
+        if priority not in PRIORITIES:
+            raise InvalidRequestError(f"Unknown priority '{priority}'. "
+                                      f"Use {' or '.join(PRIORITIES)}.")
+        if auto_fix:
+            request, changes = fix_request(request)
+            for change in changes:
+                print(f"NOTE: Auto-fix: {change}")
+        if deadline is not None:
+            try:
+                deadline = parse_seconds(deadline)
+            except ValueError as e:
+                raise InvalidRequestError(f"Bad deadline: {e}") from None
+        TRANSPORT.prepare(request)
+    except LTXError as e:
+        report_error(e, report)
+        sys.exit(1)
+    prompt, model, duration = request.prompt, request.model, request.duration
+    resolution, fps, camera_motion = request.resolution, request.fps, request.camera_motion
+    client = LTXClient(token, TRANSPORT, use_cache=use_cache, cache_unseeded=cache_unseeded,
+                       coalesce=coalesce, on_event=print_event, project=project,
+                       priority=priority)
 
     # Print generation info
-    res_label = resolution
     cost_sec = COST_PER_SEC.get(model, {}).get(resolution, 0.05)
     est_cost = cost_sec * duration if mode != "a2v" else cost_sec * 10  # estimate
+    report["est_cost"] = round(est_cost, 4)
 
     print(f"[CineClaw] Generating {mode.upper()} video...")
     print(f"  Model: {model}")
@@ -216,69 +341,752 @@ def generate_video(mode, prompt, token, model="ltx-2-fast", duration=6,
     print()
     print(f"  Prompt: {prompt[:200]}{'...' if len(prompt) > 200 else ''}")
     print()
-    print("  Generating... (this may take 10-90 seconds)")
+    history = LATENCY.get(latency_profile(
+        TRANSPORT.name, mode, model, resolution, None if mode == "a2v" else fps,
+        None if mode == "a2v" else duration))
+    if history:
+        print(f"  Generating... (usually {history['p50']:.3g}s, "
+              f"90% within {history['p90']:.3g}s)")
+    else:
+        print("  Generating... (this may take 10-90 seconds)")
     print()
 
-    # Make request
-    data = json.dumps(payload).encode("utf-8")
-    req = urllib.request.Request(endpoint, data=data, headers={
-        "Authorization": f"Bearer {token}",
-        "Content-Type": "application/json",
-        "User-Agent": "CineClaw/1.0",
-    })
+    try:
+        result = client.generate(request, output_path, deadline=deadline)
+    except LTXError as e:
+        report_error(e, report)
+        sys.exit(1)
+
+    report.update(request_id=result.request_id, bytes=result.bytes, sha256=result.sha256)
+    if result.cached:
+        report.update(est_cost=0.0, cached=True)
+        print(f"  ✓ Cache hit — video saved: {result.output_path}")
+        print(f"  ✓ Size: {result.bytes / (1024 * 1024):.1f} MB")
+        print(f"  ✓ Original request ID: {result.request_id}")
+        print("  ✓ Cost: $0.00 (cached)")
+        return result.output_path
+    if result.coalesced:
+        report.update(est_cost=0.0, coalesced=True)
+        print(f"  ✓ Shared result — video saved: {result.output_path}")
+        print(f"  ✓ Request ID: {result.request_id}")
+        return result.output_path
+
+    print(f"  ✓ Video saved: {result.output_path}")
+    print(f"  ✓ Size: {result.bytes / (1024 * 1024):.1f} MB ({result.mb_per_sec:.1f} MB/s)")
+    print(f"  ✓ SHA-256: {result.sha256}")
+    print(f"  ✓ Request ID: {result.request_id}")
+    # A deadline may have moved the job to a cheaper configuration
+    report["est_cost"] = round(result.estimated_cost, 4)
+    print(f"  ✓ Est. cost: ~${result.estimated_cost:.2f}")
+    print_pool_stats()
+    return result.output_path
+
+
+class AdaptiveLimit:
+    """Concurrency limit for batch jobs.
+
+    Additive increase, multiplicative decrease: the limit halves when the API
+    answers 429 (at most once per cooldown, so one burst of 429s counts once)
+    and grows by one after ramp_after consecutive successes.
+    """
+
+    def __init__(self, initial, maximum, adaptive=True, ramp_after=3, cooldown=5.0):
+        self.limit = max(1, min(initial, maximum))
+        self.maximum = maximum
+        self.adaptive = adaptive
+        self.ramp_after = ramp_after
+        self.cooldown = cooldown
+        self.active = 0
+        self._streak = 0
+        self._last_throttle = 0.0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        with self._cond:
+            while self.active >= self.limit:
+                self._cond.wait()
+            self.active += 1
+
+    def release(self, ok):
+        with self._cond:
+            self.active -= 1
+            if self.adaptive and ok:
+                self._streak += 1
+                if self._streak >= self.ramp_after and self.limit < self.maximum:
+                    self.limit += 1
+                    self._streak = 0
+                    print(f"[batch] Concurrency up to {self.limit}")
+            self._cond.notify_all()
+
+    def throttle(self):
+        with self._cond:
+            self._streak = 0
+            now = time.monotonic()
+            if not self.adaptive or now - self._last_throttle < self.cooldown:
+                return
+            self._last_throttle = now
+            if self.limit > 1:
+                self.limit = max(1, self.limit // 2)
+                print(f"[batch] Rate limited — concurrency down to {self.limit}", file=sys.stderr)
 
+
+def validate_manifest(manifest_path, auto_fix=False, assets=None):
+    """Check every manifest line locally, without touching the network.
+
+    Returns (rows, problems) where problems lists (line number, message).
+    Only parsing and table lookups are involved, so a 100k-line manifest is
+    checked in a fraction of a second. assets, if a set, receives the local
+    image and audio files the jobs use.
+    """
+    rows = 0
+    problems = []
+    # Local files already found, so a file shared by many lines is checked once
+    local_files = set()
+    decode = json.JSONDecoder().decode
+    # Configurations fix_request() already repaired; rows sharing one only differ by prompt
+    fixable = set()
+    with open(manifest_path, encoding="utf-8") as manifest:
+        for line_no, line in enumerate(manifest, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            rows += 1
+            try:
+                job = decode(line)
+                if not isinstance(job, dict):
+                    raise ValueError("manifest line must be a JSON object")
+                job.pop("id", None)
+                if not BATCH_FIELDS.issuperset(job):
+                    unknown = set(job) - BATCH_FIELDS
+                    raise ValueError(f"unknown field(s): {', '.join(sorted(unknown))}")
+                mode = job.get("mode")
+                resolution = job.get("resolution", DEFAULT_REQUEST.resolution)
+                resolution = RESOLUTIONS.get(str(resolution).lower().strip(), resolution)
+                # generate_video() switches a2v to the pro model itself
+                model = "ltx-2-pro" if mode == "a2v" else job.get("model", DEFAULT_REQUEST.model)
+                config = (mode, model, resolution, job.get("fps", DEFAULT_REQUEST.fps),
+                          job.get("duration", DEFAULT_REQUEST.duration),
+                          job.get("camera_motion"))
+                prompt = job.get("prompt")
+                found = validate_fields(config[0], prompt, *config[1:])
+                if found and job.get("auto_fix", auto_fix):
+                    try:
+                        known = config in fixable
+                    except TypeError:
+                        raise ValueError("; ".join(found)) from None
+                    if not known or not isinstance(prompt, str) or not prompt.strip():
+                        fields = {name: job[name] for name in REQUEST_FIELDS & job.keys()}
+                        fields.update(resolution=resolution, model=model, prompt=prompt)
+                        fix_request(GenerationRequest(**fields))
+                        fixable.add(config)
+                elif found:
+                    raise ValueError("; ".join(found))
+                if job.get("deadline") is not None:
+                    parse_seconds(job["deadline"])
+                if job.get("priority", "batch") not in PRIORITIES:
+                    raise ValueError(f"priority must be {' or '.join(PRIORITIES)}")
+                source = {"i2v": "image_path", "a2v": "audio_path"}.get(mode)
+                location = job.get(source) if source else None
+                location = asset_location(location) if isinstance(location, str) else None
+                if location and not location.startswith(("http://", "https://")):
+                    if location not in local_files:
+                        if not os.path.isfile(location):
+                            raise ValueError(f"{source} not found: {job[source]}")
+                        if TRANSPORT.assets.store is None:
+                            raise ValueError(f"{source} is a local file; set "
+                                             f"CINECLAW_ASSET_STORE to upload it")
+                        local_files.add(location)
+                    if assets is not None:
+                        assets.add(location)
+            except (ValueError, TypeError, LTXError) as e:
+                problems.append((line_no, str(e)))
+    return rows, problems
+
+
+def run_batch_job(line_no, line, token, limit, results, write_lock, counts, auto_fix=False,
+                  project=None, stop=None, use_daemon=False, handback=None, requeue_path=None):
+    """Run one manifest line and append its outcome to the results file.
+
+    Jobs default to the "batch" priority. Sets stop once a job is refused for
+    budget, so no more are submitted. With use_daemon the job runs in the
+    serve daemon when one is up; a job the daemon's queue hands back is
+    appended to requeue_path and sets handback.
+    """
+    start = time.monotonic()
+    record = {"line": line_no}
+    report = {}
+    ok = False
     try:
-        with urllib.request.urlopen(req, timeout=300) as resp:
-            content_type = resp.headers.get("Content-Type", "")
-            request_id = resp.headers.get("x-request-id", "unknown")
-
-            if "video/mp4" not in content_type and "application/octet-stream" not in content_type:
-                # Might be JSON error
-                body = resp.read().decode("utf-8", errors="replace")
-                print(f"WARNING: Unexpected content type: {content_type}", file=sys.stderr)
-                print(f"Response: {body[:500]}", file=sys.stderr)
-                return None
-
-            # Save video
-            if output_path:
-                out_file = Path(output_path)
-            else:
-                out_dir = ensure_output_dir()
-                timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
-                out_file = out_dir / f"cineclaw-{mode}-{timestamp}.mp4"
+        job = json.loads(line)
+        if not isinstance(job, dict):
+            raise ValueError("manifest line must be a JSON object")
+        record["id"] = job.pop("id", None)
+        unknown = set(job) - BATCH_FIELDS
+        if unknown:
+            raise ValueError(f"unknown field(s): {', '.join(sorted(unknown))}")
+        if "resolution" in job:
+            job["resolution"] = resolve_resolution(str(job["resolution"]))
+        job.setdefault("auto_fix", auto_fix)
+        job.setdefault("project", project)
+        job.setdefault("priority", "batch")
+        code = None
+        if use_daemon:
+            if job.get("output_path"):
+                job["output_path"] = os.path.abspath(job["output_path"])
+            for source in ("image_path", "audio_path"):
+                if isinstance(job.get(source), str):
+                    job[source] = asset_location(job[source])
+            code = run_via_daemon(job, token, report=report)
+        if code is None:
+            output_path = generate_video(token=token, report=report, **job)
+        else:
+            output_path = report.get("output_path") if code == 0 else None
+        ok = output_path is not None
+        record["status"] = "ok" if ok else "error"
+        record["output_path"] = output_path
+        if not ok:
+            record["error"] = report.get("error", "generation failed")
+    except SystemExit:
+        record["status"] = "error"
+        record["error"] = report.get("error", "generation failed (see log)")
+    except (ValueError, TypeError) as e:
+        record["status"] = "error"
+        record["error"] = str(e)
+    except Exception as e:
+        record["status"] = "error"
+        record["error"] = f"{e.__class__.__name__}: {e}"
+    finally:
+        record["request_id"] = report.get("request_id")
+        record["http_status"] = report.get("http_status")
+        record["est_cost"] = report.get("est_cost")
+        record["elapsed"] = round(time.monotonic() - start, 3)
+        if report.get("budget_exceeded") and stop is not None:
+            stop.set()
+        if report.get("requeued") and handback is not None:
+            record["status"] = "requeued"
+            handback.set()
+        with write_lock:
+            if record["status"] == "requeued":
+                with open(requeue_path, "a", encoding="utf-8") as requeue:
+                    requeue.write(line + "\n")
+            results.write(json.dumps(record) + "\n")
+            results.flush()
+            counts[record["status"]] += 1
+        limit.release(ok)
 
-            video_data = resp.read()
-            out_file.write_bytes(video_data)
 
-            size_mb = len(video_data) / (1024 * 1024)
-            print(f"  ✓ Video saved: {out_file}")
-            print(f"  ✓ Size: {size_mb:.1f} MB")
-            print(f"  ✓ Request ID: {request_id}")
-            print(f"  ✓ Est. cost: ~${est_cost:.2f}")
-            return str(out_file)
+def run_batch(manifest_path, token, results_path=None, workers=BATCH_WORKERS,
+              max_workers=BATCH_MAX_WORKERS, adaptive=True, auto_fix=False, project=None,
+              use_daemon=False):
+    """Run every job in a JSONL manifest on a bounded, adaptive worker pool.
 
-    except urllib.error.HTTPError as e:
-        body = e.read().decode("utf-8", errors="replace")
-        print(f"ERROR: HTTP {e.code}", file=sys.stderr)
+    The manifest is read one line at a time and a line is only read once a
+    worker slot is free, so memory stays flat for arbitrarily long files.
+    Each line takes the same fields as generate_video(), plus an optional
+    "id" echoed into the results. The whole manifest is validated up front;
+    invalid lines are recorded as errors without ever reaching the API.
+    The first job refused by the budget stops the rest from being submitted.
+    With use_daemon, jobs queue in the serve daemon as "batch" priority
+    behind its interactive work; once `queue requeue batch` hands them back,
+    the unsent jobs and the rest of the manifest go to <manifest>.requeue.jsonl.
+    """
+    manifest_path = Path(manifest_path)
+    if results_path is None:
+        results_path = manifest_path.with_suffix(".results.jsonl")
+    requeue_path = manifest_path.with_suffix(".requeue.jsonl")
+    limit = AdaptiveLimit(workers, max_workers, adaptive)
+
+    check_start = time.monotonic()
+    assets = set()
+    rows, problems = validate_manifest(manifest_path, auto_fix, assets)
+    print(f"[batch] Checked {rows} jobs in {(time.monotonic() - check_start) * 1000:.0f}ms"
+          f"{f' — {len(problems)} invalid, skipped' if problems else ''}")
+    stage_assets(assets)
+
+    def on_retry(error_class, exc):
+        if error_class == "rate_limit":
+            limit.throttle()
+
+    counts = {"ok": 0, "error": 0, "skipped": 0, "requeued": 0}
+    write_lock = threading.Lock()
+    stop = threading.Event()
+    handback = threading.Event()
+    start = time.monotonic()
+    RETRY.listeners.append(on_retry)
+    try:
+        with open(manifest_path, encoding="utf-8") as manifest, \
+                open(results_path, "a", encoding="utf-8") as results, \
+                ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for line_no, line in enumerate(manifest, 1):
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                # After a budget refusal or a hand-back the rest are never submitted
+                if not stop.is_set() and not handback.is_set():
+                    limit.acquire()
+                    if not stop.is_set() and not handback.is_set():
+                        executor.submit(run_batch_job, line_no, line, token, limit, results,
+                                        write_lock, counts, auto_fix, project, stop, use_daemon,
+                                        handback, requeue_path)
+                        continue
+                    limit.release(False)
+                try:
+                    job_id = json.loads(line).get("id")
+                except (ValueError, AttributeError):
+                    job_id = None
+                record = {"line": line_no, "id": job_id, "status": "skipped",
+                          "error": "not submitted: budget reached"}
+                with write_lock:
+                    if handback.is_set() and not stop.is_set():
+                        record.update(status="requeued", error="not submitted: handed back")
+                        with open(requeue_path, "a", encoding="utf-8") as requeue:
+                            requeue.write(line + "\n")
+                    results.write(json.dumps(record) + "\n")
+                    counts[record["status"]] += 1
+    finally:
+        RETRY.listeners.remove(on_retry)
+    if counts["skipped"]:
+        print(f"[batch] Budget reached — {counts['skipped']} remaining jobs not submitted",
+              file=sys.stderr)
+    if counts["requeued"]:
+        print(f"[batch] {counts['requeued']} jobs handed back unsent — run them later with: "
+              f"ltx_generate.py batch {requeue_path}", file=sys.stderr)
+
+    elapsed = time.monotonic() - start
+    print()
+    print("=== BATCH DONE ===")
+    skipped = f", {counts['skipped']} skipped" if counts["skipped"] else ""
+    requeued = f", {counts['requeued']} requeued" if counts["requeued"] else ""
+    print(f"Jobs: {counts['ok']} ok, {counts['error']} failed{skipped}{requeued} "
+          f"in {elapsed:.1f}s")
+    print(f"Final concurrency: {limit.limit}")
+    print(f"Results: {results_path}")
+    if isinstance(token, KeyPool) and len(token) > 1:
+        print_keys(token)
+    print_pool_stats()
+    print("==================")
+    return counts
+
+
+def sweep_label(position, swept):
+    """Filename-safe name for a sweep variant, e.g. "007-seed3-dolly_in-6s"."""
+    parts = [f"{position:03d}"]
+    for name, value in swept.items():
+        if name == "seed":
+            parts.append(f"seed{value}")
+        elif name == "duration":
+            parts.append(f"{value}s")
+        elif name == "fps":
+            parts.append(f"{value}fps")
+        elif name != "prompt":
+            parts.append(str(value or "none"))
+    label = "-".join(parts)
+    return "".join(c if c.isalnum() or c in "-_." else "_" for c in label)
+
+
+def write_contact_sheet(out_dir, grid, entries):
+    """Write index.json and index.html for a sweep, replacing earlier versions."""
+    out_dir = Path(out_dir)
+    index = {"grid": grid, "updated": datetime.now().isoformat(timespec="seconds"),
+             "variants": entries}
+    cells = []
+    for entry in entries:
+        caption = html.escape(", ".join(f"{k}={v}" for k, v in entry["swept"].items()
+                                        if k != "prompt") or entry["label"])
+        if entry.get("video"):
+            media = (f'<video src="{html.escape(entry["video"])}" controls muted loop '
+                     f'preload="metadata"></video>')
+        else:
+            media = f'<div class="empty">{html.escape(entry["status"])}</div>'
+        cost = f"${entry['cost']:.2f}" if entry.get("cost") is not None else ""
+        note = html.escape(entry.get("error") or "")
+        cells.append(f'<figure class="{entry["status"]}">{media}<figcaption>{caption}'
+                     f'<br><small>{entry["status"]} {cost} {note}</small></figcaption></figure>')
+    page = (
+        "<!DOCTYPE html>\n<meta charset=\"utf-8\">\n"
+        f"<title>CineClaw sweep — {html.escape(str(grid.get('prompt', ''))[:80])}</title>\n"
+        "<style>body{font-family:sans-serif;background:#111;color:#ddd}"
+        ".grid{display:grid;grid-template-columns:repeat(auto-fill,minmax(320px,1fr));gap:12px}"
+        "figure{margin:0}video,.empty{width:100%;aspect-ratio:16/9;background:#222}"
+        ".empty{display:flex;align-items:center;justify-content:center;color:#777}"
+        ".error small,.skipped small{color:#e77}</style>\n"
+        f"<p>{html.escape(str(grid.get('prompt', '')))}</p>\n"
+        f'<div class="grid">\n{chr(10).join(cells)}\n</div>\n'
+    )
+    for name, content in (("index.json", json.dumps(index, indent=2)), ("index.html", page)):
+        tmp = out_dir / f".{name}.tmp"
+        tmp.write_text(content, encoding="utf-8")
+        os.replace(tmp, out_dir / name)
+
+
+def run_sweep(grid_path, token=None, out_dir=None, max_cost=None, workers=SWEEP_WORKERS,
+              project=None, dry_run=False):
+    """Generate every variant of a JSON sweep grid, cheapest first.
+
+    The grid holds generation fields; list values are swept (e.g. "seed":
+    [1, 2, 3], "camera_motion": "all"). Combinations the API can't take or
+    that repeat another are dropped, earlier results come from the cache,
+    and jobs stop once max_cost (USD, estimates until actual costs arrive)
+    would be exceeded. index.json/index.html in out_dir are rewritten as
+    each variant lands.
+    """
+    try:
+        with open(grid_path, encoding="utf-8") as f:
+            grid = json.load(f)
+        if not isinstance(grid, dict):
+            raise ValueError("grid must be a JSON object")
+        transports = {"sync": TRANSPORT, "async": AsyncTransport()}
+        jobs, dropped = plan_sweep(grid, transports, max_cost)
+    except (OSError, ValueError, TypeError) as e:
+        print(f"ERROR: Can't plan sweep {grid_path}: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    cached = sum(1 for job in jobs if job["cached"])
+    total = sum(job["estimated"] for job in jobs)
+    print(f"[sweep] {len(jobs) + len(dropped)} combinations: {len(jobs)} to run "
+          f"({cached} already generated), est. ~${total:.2f}; {len(dropped)} dropped")
+    reasons = {}
+    for _, reason in dropped:
+        reasons[reason] = reasons.get(reason, 0) + 1
+    for reason, count in sorted(reasons.items(), key=lambda item: -item[1]):
+        print(f"  dropped {count}: {reason}")
+    if dry_run or not jobs:
+        for position, job in enumerate(jobs, 1):
+            cost = "cached" if job["cached"] else f"~${job['estimated']:.2f}"
+            print(f"  {sweep_label(position, job['swept'])}  {job['transport']}  {cost}")
+        return {"ok": 0, "error": 0, "skipped": 0}
+
+    if out_dir is None:
+        out_dir = os.path.join(os.path.expanduser("~/Desktop/cineclaw"),
+                               f"sweep-{datetime.now().strftime('%Y-%m-%d-%H%M%S')}")
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    entries = []
+    for position, job in enumerate(jobs, 1):
+        entries.append({"label": sweep_label(position, job["swept"]), "swept": job["swept"],
+                        "request": asdict(job["request"]), "transport": job["transport"],
+                        "estimated": job["estimated"], "status": "pending"})
+    for swept, reason in dropped:
+        entries.append({"label": "", "swept": swept, "status": "dropped", "error": reason})
+    clients = {name: LTXClient(token, transport, cache_unseeded=True, project=project,
+                               priority="batch")
+               for name, transport in transports.items()}
+    stage_assets({path for job in jobs if job["transport"] == "sync" and not job["cached"]
+                  for path in (job["request"].image_path, job["request"].audio_path)
+                  if path and not path.startswith(("http://", "https://"))})
+
+    lock = threading.Lock()
+    stop = threading.Event()
+    counts = {"ok": 0, "error": 0, "skipped": 0}
+    committed = [0.0]
+
+    def finish(entry, status, **fields):
+        with lock:
+            entry.update(status=status, **fields)
+            counts["ok" if status in ("ok", "cached") else status] += 1
+            write_contact_sheet(out_dir, grid, entries)
+            done = sum(counts.values())
+        line = f"[sweep] {done}/{len(jobs)} {status:<7} {entry['label']}"
+        if fields.get("cost") is not None:
+            line += f" ${fields['cost']:.2f}"
+        if fields.get("error"):
+            line += f"  {fields['error']}"
+        print(line)
+
+    def run_job(job, entry):
+        with lock:
+            over = max_cost is not None and committed[0] + job["estimated"] > max_cost + 1e-9
+            skip = stop.is_set() or over
+            if not skip:
+                committed[0] += job["estimated"]
+        if skip:
+            finish(entry, "skipped", error="cost cap" if over else "budget reached")
+            return
+        output_path = out_dir / f"{entry['label']}.mp4"
         try:
-            err = json.loads(body)
-            msg = err.get("error", {}).get("message", body)
-            print(f"  {msg}", file=sys.stderr)
-        except json.JSONDecodeError:
-            print(f"  {body[:500]}", file=sys.stderr)
+            result = clients[job["transport"]].generate(job["request"], output_path)
+        except BudgetExceeded as e:
+            stop.set()
+            with lock:
+                committed[0] -= job["estimated"]
+            finish(entry, "skipped", error=str(e))
+            return
+        except LTXError as e:
+            finish(entry, "error", error=str(e))
+            return
+        cost = 0.0 if result.cached or result.coalesced else result.cost
+        if cost is None:
+            cost = result.estimated_cost
+        with lock:
+            # The actual cost replaces the estimate held for this job
+            committed[0] += cost - job["estimated"]
+        finish(entry, "cached" if result.cached else "ok", video=output_path.name,
+               cost=round(cost, 4), request_id=result.request_id)
 
-        if e.code == 401:
-            print("  → API key invalid. Get a new one at console.ltx.video", file=sys.stderr)
-        elif e.code == 403:
-            print("  → No credits. Add funds at console.ltx.video", file=sys.stderr)
-        elif e.code == 429:
-            print("  → Rate limited. Wait 30 seconds and retry.", file=sys.stderr)
-        elif e.code == 422:
-            print("  → Invalid parameter combination. Check model/resolution/duration.", file=sys.stderr)
+    write_contact_sheet(out_dir, grid, entries)
+    print(f"[sweep] Contact sheet: {out_dir / 'index.html'}")
+    start = time.monotonic()
+    # Jobs start in plan order, so the cheapest previews are the first to land
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        for job, entry in zip(jobs, entries):
+            executor.submit(run_job, job, entry)
+
+    print()
+    print("=== SWEEP DONE ===")
+    print(f"Variants: {counts['ok']} ok, {counts['error']} failed, {counts['skipped']} skipped "
+          f"in {time.monotonic() - start:.1f}s")
+    print(f"Spent: ~${committed[0]:.2f}")
+    print(f"Contact sheet: {out_dir / 'index.html'}")
+    if isinstance(token, KeyPool) and len(token) > 1:
+        print_keys(token)
+    print("==================")
+    return counts
+
+
+# Unix socket the `serve` daemon listens on; override with CINECLAW_SOCKET
+DAEMON_SOCKET = Path(os.environ.get("CINECLAW_SOCKET") or STATE_DIR / "daemon.sock")
+
+_job_output = threading.local()
+
+
+class JobOutput(io.TextIOBase):
+    """Stand-in for sys.stdout/sys.stderr inside the daemon.
+
+    Writes from a thread serving a client are forwarded to that client as
+    progress events; everything else goes to the daemon's own stream.
+    """
+
+    def __init__(self, stream, name):
+        self.stream = stream
+        self.name = name
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        send = getattr(_job_output, "send", None)
+        if send is None:
+            return self.stream.write(text)
+        send({"event": self.name, "data": text})
+        return len(text)
+
+    def flush(self):
+        if getattr(_job_output, "send", None) is None:
+            self.stream.flush()
+
+
+class DaemonHandler(socketserver.StreamRequestHandler):
+    """Run one generation per connection, streaming its output back.
+
+    The client sends a single JSON line: {"token": ..., "job": {...}} where job
+    holds generate_video() arguments and token is a key or a list of keys. The reply is a stream of JSON lines —
+    {"event": "stdout"|"stderr", "data": ...} — ending with
+    {"event": "done", "exit": code, "output_path": ..., "report": {...}}.
+    A client that disconnects doesn't cancel the job; it still finishes and
+    lands in the result cache.
+
+    {"control": "stats"|"pause"|"resume"|"requeue", "priority": ...} instead
+    acts on the daemon's scheduler and is answered with one "done" event
+    carrying its per-class stats.
+    """
+
+    def send(self, event):
+        if self.connected:
+            try:
+                self.wfile.write((json.dumps(event) + "\n").encode("utf-8"))
+            except OSError:
+                self.connected = False
+
+    def handle(self):
+        self.connected = True
+        start = time.monotonic()
+        try:
+            request = json.loads(self.rfile.readline())
+            if "control" in request:
+                self.control(request["control"], request.get("priority"))
+                return
+            token = self.key_pool(request["token"])
+            job = dict(request["job"])
+            unknown = set(job) - BATCH_FIELDS
+            if unknown:
+                raise ValueError(f"unknown field(s): {', '.join(sorted(unknown))}")
+        except (ValueError, KeyError, TypeError) as e:
+            self.send({"event": "done", "exit": 2, "error": f"bad request: {e}"})
+            return
+
+        report = {}
+        output_path = None
+        code = 0
+        _job_output.send = self.send
+        try:
+            output_path = generate_video(token=token, report=report, **job)
+            code = 0 if output_path else 1
+        except SystemExit as e:
+            code = e.code if isinstance(e.code, int) else 1
+        except Exception as e:
+            code = 1
+            report["error"] = f"{e.__class__.__name__}: {e}"
+            print(f"ERROR: {report['error']}", file=sys.stderr)
+        finally:
+            _job_output.send = None
+        self.send({"event": "done", "exit": code, "output_path": output_path,
+                   "report": report})
+        self.server.jobs += 1
+        print(f"[daemon] {job.get('priority', 'interactive')} {job.get('mode')} job finished "
+              f"with exit {code} in {time.monotonic() - start:.1f}s"
+              f"{'' if self.connected else ' (client gone)'}")
+
+    def key_pool(self, keys):
+        """One KeyPool per set of keys, so key health carries across jobs."""
+        keys = (keys,) if isinstance(keys, str) else tuple(keys)
+        with self.server.lock:
+            return self.server.pools.setdefault(keys, KeyPool(keys))
+
+    def control(self, action, priority):
+        if action != "stats" and priority not in PRIORITIES:
+            raise ValueError(f"priority must be {' or '.join(PRIORITIES)}")
+        done = {"event": "done", "exit": 0}
+        if action == "pause":
+            SCHEDULER.pause(priority)
+        elif action == "resume":
+            SCHEDULER.resume(priority)
+        elif action == "requeue":
+            done["requeued"] = SCHEDULER.requeue(priority)
+        elif action != "stats":
+            raise ValueError(f"unknown control '{action}'")
+        if action != "stats":
+            handed = f" ({done['requeued']} job(s) handed back)" if "requeued" in done else ""
+            print(f"[daemon] {action} {priority}{handed}")
+        done["stats"] = SCHEDULER.stats()
+        self.send(done)
+
+
+def serve_daemon(socket_path=DAEMON_SOCKET, slots=None, reserve=None):
+    """Run the generation daemon until interrupted.
+
+    One resident process keeps the interpreter, imports, warm keep-alive
+    connections, rate-limiter and cache state across jobs, so a client pays
+    for a socket round trip instead of a process start and TLS handshake.
+    Its scheduler shares slots (default SCHEDULER_SLOTS) between interactive
+    and batch jobs, holding reserve of them for interactive ones.
+    """
+    if not hasattr(socketserver, "ThreadingUnixStreamServer"):
+        print("ERROR: serve needs Unix domain sockets, unavailable on this platform.",
+              file=sys.stderr)
         sys.exit(1)
-    except urllib.error.URLError as e:
-        print(f"ERROR: Connection failed: {e.reason}", file=sys.stderr)
+    socket_path = Path(socket_path)
+    socket_path.parent.mkdir(parents=True, exist_ok=True)
+    if socket_path.exists():
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(str(socket_path))
+        except OSError:
+            # Left behind by a daemon that didn't shut down cleanly
+            socket_path.unlink()
+        else:
+            print(f"ERROR: A daemon is already listening on {socket_path}", file=sys.stderr)
+            sys.exit(1)
+        finally:
+            probe.close()
+
+    if slots is not None:
+        SCHEDULER.slots = slots
+    if reserve is not None:
+        SCHEDULER.reserved["interactive"] = reserve
+    server = socketserver.ThreadingUnixStreamServer(str(socket_path), DaemonHandler)
+    server.daemon_threads = True
+    server.jobs = 0
+    server.pools = {}
+    server.lock = threading.Lock()
+    os.chmod(socket_path, 0o600)
+    sys.stdout = JobOutput(sys.stdout, "stdout")
+    sys.stderr = JobOutput(sys.stderr, "stderr")
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    print(f"[daemon] Listening on {socket_path} (Ctrl-C to stop); {SCHEDULER.slots} slots, "
+          f"{SCHEDULER.reserved.get('interactive', 0)} reserved for interactive jobs")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print()
+    finally:
+        server.server_close()
+        socket_path.unlink(missing_ok=True)
+        print(f"[daemon] Stopped after {server.jobs} job(s)")
+        print_queue_stats(SCHEDULER.stats())
+        for pool in server.pools.values():
+            if len(pool) > 1:
+                print_keys(pool)
+        print_pool_stats()
+
+
+def run_via_daemon(job, token, socket_path=DAEMON_SOCKET, report=None):
+    """Hand a job to a running daemon and relay its output.
+
+    Returns the daemon's exit code, or None if no daemon is reachable (the
+    caller then runs the job in-process). report, if a dict, receives the
+    daemon's report and output_path.
+    """
+    if not hasattr(socket, "AF_UNIX"):
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(str(socket_path))
+    except OSError:
+        sock.close()
+        return None
+
+    with sock, sock.makefile("rb") as events:
+        keys = token.keys if isinstance(token, KeyPool) else token
+        sock.sendall((json.dumps({"token": keys, "job": job}) + "\n").encode("utf-8"))
+        for line in events:
+            event = json.loads(line)
+            if event["event"] == "stdout":
+                sys.stdout.write(event["data"])
+            elif event["event"] == "stderr":
+                sys.stderr.write(event["data"])
+            elif event["event"] == "done":
+                if event.get("error"):
+                    print(f"ERROR: Daemon rejected the job: {event['error']}", file=sys.stderr)
+                if report is not None:
+                    report.update(event.get("report") or {}, output_path=event.get("output_path"))
+                return event["exit"]
+    print("ERROR: Lost connection to the daemon; the job may still finish there.",
+          file=sys.stderr)
+    return 1
+
+
+def daemon_control(action, priority=None, socket_path=DAEMON_SOCKET):
+    """Send a scheduler control to the running daemon and return its reply."""
+    if not hasattr(socket, "AF_UNIX"):
+        print("ERROR: The daemon needs Unix domain sockets, unavailable on this platform.",
+              file=sys.stderr)
+        sys.exit(1)
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(str(socket_path))
+    except OSError:
+        sock.close()
+        print(f"ERROR: No daemon listening on {socket_path} (start one with: "
+              f"ltx_generate.py serve)", file=sys.stderr)
         sys.exit(1)
+    with sock, sock.makefile("rb") as events:
+        sock.sendall((json.dumps({"control": action, "priority": priority}) + "\n")
+                     .encode("utf-8"))
+        reply = json.loads(events.readline() or "{}")
+    if reply.get("error"):
+        print(f"ERROR: {reply['error']}", file=sys.stderr)
+        sys.exit(1)
+    return reply
+
+
+def print_queue_stats(stats):
+    """Print per-class scheduler depth and wait times."""
+    print(f"{'class':<12}  {'running':>7}  {'queued':>6}  {'jobs':>5}  {'avg wait':>8}  "
+          f"{'max wait':>8}")
+    for name, row in stats.items():
+        paused = "  (paused)" if row["paused"] else ""
+        print(f"{name:<12}  {row['running']:>7}  {row['queued']:>6}  {row['jobs']:>5}  "
+              f"{row['wait_avg']:>7.1f}s  {row['wait_max']:>7.1f}s{paused}")
 
 
 def main():
@@ -289,10 +1097,18 @@ def main():
         print()
         print("Usage:")
         print("  python3 ltx_generate.py t2v \"prompt\"           Text-to-video")
-        print("  python3 ltx_generate.py i2v \"prompt\" --image URL  Image-to-video")
-        print("  python3 ltx_generate.py a2v \"prompt\" --audio URL  Audio-to-video")
+        print("  python3 ltx_generate.py i2v \"prompt\" --image FILE|URL  Image-to-video")
+        print("  python3 ltx_generate.py a2v \"prompt\" --audio FILE|URL  Audio-to-video")
         print("  python3 ltx_generate.py --test                    Test connection")
         print("  python3 ltx_generate.py --estimate t2v [options]  Cost estimate")
+        print("  python3 ltx_generate.py batch jobs.jsonl [options] Run a JSONL manifest")
+        print("  python3 ltx_generate.py validate jobs.jsonl       Check a manifest offline")
+        print("  python3 ltx_generate.py serve [--slots N] [--reserve N]  Run the resident daemon")
+        print("  python3 ltx_generate.py queue [pause|resume|requeue] [batch]  Daemon queue control")
+        print("  python3 ltx_generate.py costs [--by day,model,resolution] [--days N]  Spend report")
+        print("  python3 ltx_generate.py sweep grid.json [options]  Generate a grid of variants")
+        print("  python3 ltx_generate.py stats                     Latency history per configuration")
+        print("  python3 ltx_generate.py keys                      API keys and spend per key")
         print()
         print("Options:")
         print("  --model ltx-2-fast|ltx-2-pro   Model (default: ltx-2-fast)")
@@ -301,18 +1117,226 @@ def main():
         print("  --fps 25|50                     Frame rate (default: 25)")
         print("  --camera MOTION                 Camera motion preset")
         print("  --no-audio                      Disable audio generation")
-        print("  --image URL                     Image URL for i2v")
-        print("  --audio URL                     Audio URL for a2v")
+        print("  --image FILE|URL                Image for i2v (files go via the asset store)")
+        print("  --audio FILE|URL                Audio for a2v (files go via the asset store)")
         print("  --output PATH                   Custom output path")
+        print("  --no-cache                      Always generate, bypassing the result cache")
+        print("  --cache-unseeded                Cache/reuse results even without a seed")
+        print("  --no-coalesce                   Don't share results with identical running jobs")
+        print("  --daemon                        Run via the serve daemon if it is running")
+        print("  --auto-fix                      Use the nearest supported model/resolution/fps/duration")
+        print("  --project NAME                  Charge the job to NAME's budget")
+        print("  --deadline 30s                  Best quality whose p90 latency fits, else refuse")
+        print("  --priority interactive|batch    Scheduler class (default: interactive)")
+        print("  --trace FILE                    Append per-phase timing spans to FILE (JSONL)")
+        print("  --metrics FILE|[HOST]:PORT      Prometheus metrics as a textfile or on /metrics")
+        print("  --profile                       cProfile + tracemalloc report under ~/.cineclaw/profiles")
+        print()
+        print("Batch options:")
+        print("  --results PATH                  Results JSONL (default: <manifest>.results.jsonl)")
+        print(f"  --workers N                     Starting concurrency (default: {BATCH_WORKERS})")
+        print(f"  --max-workers N                 Concurrency ceiling (default: {BATCH_MAX_WORKERS})")
+        print("  --fixed                         Don't adapt concurrency to 429s")
+        print("  --auto-fix                      Fix unsupported rows instead of skipping them")
+        print("  --project NAME                  Default project for rows without one")
+        print("  --daemon                        Queue jobs in the serve daemon at batch priority")
+        print()
+        print("Sweep options (grid.json: {\"mode\": \"t2v\", \"prompt\": \"...\", "
+              "\"seed\": [1, 2], \"camera_motion\": \"all\", ...}):")
+        print("  --max-cost USD                  Stop before estimated spend passes USD")
+        print(f"  --workers N                     Concurrent jobs (default: {SWEEP_WORKERS})")
+        print("  --output DIR                    Videos + index.html (default: ~/Desktop/cineclaw/sweep-*)")
+        print("  --dry-run                       Print the plan without generating")
+        print()
+        print("Budgets: CINECLAW_BUDGETS='{\"daily\": 50, \"projects\": {\"NAME\": 200}}' (USD)")
+        print("Several API keys: LTX_API_KEYS=\"k1,k2\", LTX_API_KEY_1, LTX_API_KEY_2, ... or "
+              "LTX_API_KEYS_FILE=keys.txt")
+        print("Local --image/--audio files: CINECLAW_ASSET_STORE=s3://bucket/prefix with AWS_* "
+              "credentials (CINECLAW_ASSET_ENDPOINT for S3-compatible stores)")
         sys.exit(0)
 
+    # Manifest check; needs no API key
+    if args[0] == "validate":
+        paths = [a for a in args[1:] if not a.startswith("--")]
+        if not paths:
+            print("ERROR: validate needs a manifest file.", file=sys.stderr)
+            sys.exit(1)
+        start = time.monotonic()
+        rows, problems = validate_manifest(paths[0], "--auto-fix" in args)
+        for line_no, problem in problems[:VALIDATE_SHOW]:
+            print(f"  line {line_no}: {problem}")
+        if len(problems) > VALIDATE_SHOW:
+            print(f"  ... and {len(problems) - VALIDATE_SHOW} more")
+        print(f"{rows} jobs checked in {(time.monotonic() - start) * 1000:.0f}ms: "
+              f"{rows - len(problems)} valid, {len(problems)} invalid")
+        sys.exit(1 if problems else 0)
+
+    # Spend report; needs no API key
+    if args[0] == "costs":
+        by = ("day", "model", "resolution")
+        since = None
+        project = None
+        i = 1
+        while i < len(args):
+            if args[i] == "--by" and i + 1 < len(args):
+                by = tuple(name.strip() for name in args[i + 1].split(",") if name.strip())
+                i += 2
+            elif args[i] == "--since" and i + 1 < len(args):
+                since = args[i + 1]
+                i += 2
+            elif args[i] == "--days" and i + 1 < len(args):
+                since = datetime.now() - timedelta(days=int(args[i + 1]) - 1)
+                since = since.strftime("%Y-%m-%d")
+                i += 2
+            elif args[i] == "--project" and i + 1 < len(args):
+                project = args[i + 1]
+                i += 2
+            else:
+                i += 1
+        try:
+            print_costs(by, since, project)
+        except LTXError as e:
+            print(f"ERROR: {e}", file=sys.stderr)
+            sys.exit(1)
+        return
+
+    # Configured keys and their recorded spend; needs no network
+    if args[0] == "keys":
+        print_keys(get_token())
+        return
+
+    # Latency history; needs no API key
+    if args[0] == "stats":
+        try:
+            print_latency_stats()
+        except LTXError as e:
+            print(f"ERROR: {e}", file=sys.stderr)
+            sys.exit(1)
+        return
+
+    # Daemon mode; each client passes its own token
+    if args[0] == "serve":
+        socket_path = DAEMON_SOCKET
+        slots = None
+        reserve = None
+        i = 1
+        while i < len(args):
+            if args[i] == "--slots" and i + 1 < len(args):
+                slots = int(args[i + 1])
+                i += 2
+            elif args[i] == "--reserve" and i + 1 < len(args):
+                reserve = int(args[i + 1])
+                i += 2
+            elif not args[i].startswith("--"):
+                socket_path = args[i]
+                i += 1
+            else:
+                i += 1
+        serve_daemon(socket_path, slots, reserve)
+        return
+
+    # Daemon queue: stats, or pause/resume/requeue a priority class
+    if args[0] == "queue":
+        action = args[1] if len(args) > 1 else "stats"
+        if action not in ("stats", "pause", "resume", "requeue"):
+            print("ERROR: queue takes stats, pause, resume or requeue.", file=sys.stderr)
+            sys.exit(1)
+        reply = daemon_control(action, args[2] if len(args) > 2 else "batch")
+        if "requeued" in reply:
+            print(f"Handed back {reply['requeued']} queued job(s).")
+        print_queue_stats(reply["stats"])
+        return
+
+    # Parameter sweep; --dry-run only prints the plan and needs no API key
+    if args[0] == "sweep":
+        grid_path = None
+        out_dir = None
+        max_cost = None
+        workers = SWEEP_WORKERS
+        project = None
+        i = 1
+        while i < len(args):
+            if args[i] == "--max-cost" and i + 1 < len(args):
+                max_cost = float(args[i + 1])
+                i += 2
+            elif args[i] == "--workers" and i + 1 < len(args):
+                workers = int(args[i + 1])
+                i += 2
+            elif args[i] == "--output" and i + 1 < len(args):
+                out_dir = args[i + 1]
+                i += 2
+            elif args[i] == "--project" and i + 1 < len(args):
+                project = args[i + 1]
+                i += 2
+            elif not args[i].startswith("--") and grid_path is None:
+                grid_path = args[i]
+                i += 1
+            else:
+                i += 1
+        if not grid_path:
+            print("ERROR: sweep needs a grid file.", file=sys.stderr)
+            sys.exit(1)
+        dry_run = "--dry-run" in args
+        counts = run_sweep(grid_path, None if dry_run else get_token(), out_dir, max_cost,
+                           workers, project, dry_run)
+        sys.exit(1 if counts["error"] else 0)
+
     token = get_token()
 
     # Test mode
     if args[0] == "--test":
-        test_connection(token)
+        for api_key in token.keys:
+            if len(token) > 1:
+                print(f"[{token.label(api_key)}]")
+            test_connection(api_key)
         return
 
+    # Batch mode
+    if args[0] == "batch":
+        manifest_path = None
+        results_path = None
+        workers = BATCH_WORKERS
+        max_workers = BATCH_MAX_WORKERS
+        adaptive = True
+        auto_fix = False
+        project = None
+        use_daemon = False
+        i = 1
+        while i < len(args):
+            if args[i] == "--results" and i + 1 < len(args):
+                results_path = args[i + 1]
+                i += 2
+            elif args[i] == "--workers" and i + 1 < len(args):
+                workers = int(args[i + 1])
+                i += 2
+            elif args[i] == "--max-workers" and i + 1 < len(args):
+                max_workers = int(args[i + 1])
+                i += 2
+            elif args[i] == "--fixed":
+                adaptive = False
+                i += 1
+            elif args[i] == "--auto-fix":
+                auto_fix = True
+                i += 1
+            elif args[i] == "--project" and i + 1 < len(args):
+                project = args[i + 1]
+                i += 2
+            elif args[i] == "--daemon":
+                use_daemon = True
+                i += 1
+            elif not args[i].startswith("--") and manifest_path is None:
+                manifest_path = args[i]
+                i += 1
+            else:
+                i += 1
+        if not manifest_path:
+            print("ERROR: batch needs a manifest file.", file=sys.stderr)
+            sys.exit(1)
+        max_workers = max(max_workers, workers)
+        counts = run_batch(manifest_path, token, results_path, workers, max_workers, adaptive,
+                           auto_fix, project, use_daemon)
+        sys.exit(1 if counts["error"] or counts["skipped"] or counts["requeued"] else 0)
+
     # Parse arguments
     estimate_mode = False
     mode = None
@@ -326,6 +1350,14 @@ def main():
     image_path = None
     audio_path = None
     output_path = None
+    use_cache = True
+    cache_unseeded = False
+    coalesce = True
+    use_daemon = False
+    auto_fix = False
+    project = None
+    deadline = None
+    priority = "interactive"
 
     i = 0
     while i < len(args):
@@ -354,6 +1386,34 @@ def main():
         elif args[i] == "--no-audio":
             generate_audio = False
             i += 1
+        elif args[i] == "--no-cache":
+            use_cache = False
+            i += 1
+        elif args[i] == "--cache-unseeded":
+            cache_unseeded = True
+            i += 1
+        elif args[i] == "--no-coalesce":
+            coalesce = False
+            i += 1
+        elif args[i] == "--daemon":
+            use_daemon = True
+            i += 1
+        elif args[i] == "--auto-fix":
+            auto_fix = True
+            i += 1
+        elif args[i] == "--project" and i + 1 < len(args):
+            project = args[i + 1]
+            i += 2
+        elif args[i] == "--deadline" and i + 1 < len(args):
+            try:
+                deadline = parse_seconds(args[i + 1])
+            except ValueError as e:
+                print(f"ERROR: --deadline: {e}", file=sys.stderr)
+                sys.exit(1)
+            i += 2
+        elif args[i] == "--priority" and i + 1 < len(args):
+            priority = args[i + 1]
+            i += 2
         elif args[i] == "--image" and i + 1 < len(args):
             image_path = args[i + 1]
             i += 2
@@ -384,21 +1444,41 @@ def main():
         print("ERROR: No prompt provided.", file=sys.stderr)
         sys.exit(1)
 
-    generate_video(
+    job = dict(
         mode=mode,
         prompt=prompt,
-        token=token,
         model=model,
         duration=duration,
         resolution=resolution,
         fps=fps,
         camera_motion=camera_motion,
         generate_audio=generate_audio,
-        image_path=image_path,
-        audio_path=audio_path,
-        output_path=output_path,
+        image_path=asset_location(image_path),
+        audio_path=asset_location(audio_path),
+        output_path=os.path.abspath(output_path) if output_path else None,
+        use_cache=use_cache,
+        cache_unseeded=cache_unseeded,
+        coalesce=coalesce,
+        auto_fix=auto_fix,
+        project=project,
+        deadline=deadline,
+        priority=priority,
     )
 
+    if use_daemon:
+        code = run_via_daemon(job, token)
+        if code is not None:
+            sys.exit(code)
+        print("  (daemon not running — generating in this process)")
+
+    generate_video(token=token, **job)
+
 
 if __name__ == "__main__":
-    main()
+    try:
+        sys.argv[1:], session = instrument(sys.argv[1:])
+    except (ValueError, OSError) as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        sys.exit(1)
+    with session:
+        main()
@@ -0,0 +1,533 @@
+#!/usr/bin/env python3
+"""
+ltx_bench.py — benchmarks for the client itself, run against ltx_emulator
+
+Stdlib only. Starts an LTXEmulator in this process and measures what the
+client adds on top of the API:
+
+    overhead    per-job wall and CPU time over a bare HTTP exchange, sync and async
+    download    peak RSS while generate_video() and download_video() save large MP4s
+    upload      peak RSS while api_call() streams a multipart upload
+    polling     status requests per async job, cold, with learned timings, and with a webhook
+    throughput  jobs/s and latency at several concurrency levels
+
+Memory cases run in a child process each, so the numbers are the client's
+alone (the emulator stays in this process). Everything runs with its own
+scratch CINECLAW_HOME and no rate limiting, so the real cache, ledger and
+timing history are never touched.
+
+Usage:
+    python3 scripts/ltx_bench.py                         # everything, JSON to stdout
+    python3 scripts/ltx_bench.py --only overhead,polling --output bench.json
+    python3 scripts/ltx_bench.py --sizes 50,200,500 --concurrency 1,10,50
+    python3 scripts/ltx_bench.py --quick --compare bench.json
+"""
+
+import os
+import sys
+import atexit
+import json
+import time
+import shutil
+import platform
+import resource
+import tempfile
+import subprocess
+import http.client
+import contextlib
+import importlib.util
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Benchmarks get a scratch state directory and no client-side rate limiting;
+# both must be set before ltx_client is imported
+if os.environ.get("CINECLAW_BENCH_HOME"):
+    SCRATCH = Path(os.environ["CINECLAW_BENCH_HOME"])
+else:
+    SCRATCH = Path(tempfile.mkdtemp(prefix="cineclaw-bench-"))
+    atexit.register(shutil.rmtree, SCRATCH, ignore_errors=True)
+os.environ["CINECLAW_HOME"] = str(SCRATCH)
+os.environ["CINECLAW_RATE_LIMITS"] = "off"
+os.environ.pop("CINECLAW_BUDGETS", None)
+
+import ltx_client  # noqa: E402
+from ltx_client import (  # noqa: E402
+    POLLER, POOL, AsyncTransport, GenerationRequest, LTXClient, PriorityScheduler,
+    SyncTransport, WebhookReceiver, api_call, download_video,
+)
+from ltx_emulator import EmulatorConfig, LTXEmulator  # noqa: E402
+
+# The sync command line, whose generate_video() the download benchmark drives
+ROOT_CLI = Path(__file__).resolve().parent.parent / "ltx_generate.py"
+
+# Format version of the JSON report; bump when metric names or meanings change
+REPORT_VERSION = 1
+
+# Key sent to the emulator (it accepts any)
+BENCH_KEY = "bench-key"
+
+# Request every benchmark generates
+BENCH_REQUEST = GenerationRequest("t2v", "A red fox trots across fresh snow at dawn, "
+                                         "slow tracking shot, soft golden light")
+
+# Defaults: full run, and --quick for a smoke test between commits
+DEFAULTS = {
+    "overhead_jobs": 50, "sizes": [50, 200, 500], "upload_mb": 45,
+    "polling_jobs": 20, "polling_latency": "uniform:2,6",
+    "concurrency": [1, 5, 10, 25, 50], "jobs_per_worker": 4, "throughput_latency": "fixed:1",
+    "throughput_video_mb": 1.0,
+}
+QUICK = {
+    "overhead_jobs": 10, "sizes": [20], "upload_mb": 10,
+    "polling_jobs": 5, "polling_latency": "uniform:1,2",
+    "concurrency": [1, 10], "jobs_per_worker": 2, "throughput_latency": "fixed:0.2",
+    "throughput_video_mb": 0.5,
+}
+
+# Change (as a fraction) beyond which --compare flags a metric
+COMPARE_THRESHOLD = 0.10
+
+MB = 1024 * 1024
+
+
+def percentile(values, q):
+    """q-th percentile (0-100) of values by nearest rank; None if empty."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(q / 100 * len(ordered) + 0.5) - 1))]
+
+
+def summarize(seconds):
+    """Milliseconds mean/p50/p95/max of a list of durations."""
+    if not seconds:
+        return {}
+    return {"mean_ms": round(1000 * sum(seconds) / len(seconds), 3),
+            "p50_ms": round(1000 * percentile(seconds, 50), 3),
+            "p95_ms": round(1000 * percentile(seconds, 95), 3),
+            "max_ms": round(1000 * max(seconds), 3)}
+
+
+def peak_rss():
+    """This process's peak resident set size in bytes."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def quiet_client(transport, **options):
+    return LTXClient(BENCH_KEY, transport, use_cache=False, coalesce=False, **options)
+
+
+# -- overhead --
+
+def bare_sync(base_url, body, count):
+    """Seconds per POST + full body read over one keep-alive connection."""
+    parts = urllib.parse.urlsplit(base_url)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=60)
+    headers = {"Authorization": f"Bearer {BENCH_KEY}", "Content-Type": "application/json"}
+    times = []
+    for _ in range(count):
+        start = time.perf_counter()
+        conn.request("POST", f"{parts.path}/text-to-video", body, headers)
+        resp = conn.getresponse()
+        while resp.read(ltx_client.CHUNK_SIZE):
+            pass
+        times.append(time.perf_counter() - start)
+    conn.close()
+    return times
+
+
+def bare_async(base_url, body, count):
+    """Seconds per submit + status + download over one keep-alive connection."""
+    parts = urllib.parse.urlsplit(base_url)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=60)
+    headers = {"Authorization": f"Bearer {BENCH_KEY}", "Content-Type": "application/json"}
+    times = []
+    for _ in range(count):
+        start = time.perf_counter()
+        conn.request("POST", f"{parts.path}/generations/text-to-video", body, headers)
+        job = json.loads(conn.getresponse().read())
+        conn.request("GET", f"{parts.path}/generations/{job['id']}", headers=headers)
+        record = json.loads(conn.getresponse().read())
+        conn.request("GET", urllib.parse.urlsplit(record["video_url"]).path, headers=headers)
+        resp = conn.getresponse()
+        while resp.read(ltx_client.CHUNK_SIZE):
+            pass
+        times.append(time.perf_counter() - start)
+    conn.close()
+    return times
+
+
+def bench_overhead(api, opts, out_dir):
+    """Client time per job minus a bare HTTP client's time for the same exchange."""
+    jobs = opts["overhead_jobs"]
+    api.configure(latency="fixed:0", video_bytes=256 * 1024, errors={}, drop_rate=0,
+                  slow_rate=0, fail_rate=0)
+    request = BENCH_REQUEST
+    body = json.dumps({"prompt": request.prompt, "model": request.model,
+                       "resolution": request.resolution, "duration": request.duration,
+                       "fps": request.fps}).encode("utf-8")
+    results = {"jobs": jobs, "video_bytes": 256 * 1024}
+
+    client = quiet_client(SyncTransport())
+    bare_sync(api.base_url, body, 3)
+    bare = bare_sync(api.base_url, body, jobs)
+    wall, cpu = [], []
+    for i in range(jobs + 3):
+        start, start_cpu = time.perf_counter(), time.thread_time()
+        client.generate(request, str(out_dir / f"overhead-sync-{i}.mp4"))
+        if i >= 3:
+            wall.append(time.perf_counter() - start)
+            cpu.append(time.thread_time() - start_cpu)
+        os.unlink(out_dir / f"overhead-sync-{i}.mp4")
+    results["sync"] = {
+        "bare": summarize(bare), "client": summarize(wall),
+        "overhead_ms": round(1000 * (sum(wall) - sum(bare)) / jobs, 3),
+        "client_cpu_ms": round(1000 * sum(cpu) / jobs, 3),
+    }
+
+    # The async path's calls without the poller's scheduling, which is policy, not overhead
+    bare_async(api.base_url, body, 3)
+    bare = bare_async(api.base_url, body, jobs)
+    payload = json.loads(body)
+    wall, cpu = [], []
+    for i in range(jobs + 3):
+        start, start_cpu = time.perf_counter(), time.thread_time()
+        job = api_call("/generations/text-to-video", BENCH_KEY, "POST", payload)
+        record = api_call(f"/generations/{job['id']}", BENCH_KEY)
+        download_video(record["video_url"], str(out_dir / f"overhead-async-{i}.mp4"))
+        if i >= 3:
+            wall.append(time.perf_counter() - start)
+            cpu.append(time.thread_time() - start_cpu)
+        os.unlink(out_dir / f"overhead-async-{i}.mp4")
+    results["async"] = {
+        "bare": summarize(bare), "client": summarize(wall),
+        "overhead_ms": round(1000 * (sum(wall) - sum(bare)) / jobs, 3),
+        "client_cpu_ms": round(1000 * sum(cpu) / jobs, 3),
+    }
+    return results
+
+
+# -- memory (child processes) --
+
+def child_generate_video(args):
+    """generate_video() from the sync command line, its output silenced."""
+    spec = importlib.util.spec_from_file_location("cineclaw_sync_cli", ROOT_CLI)
+    cli = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(cli)
+    request = BENCH_REQUEST
+    baseline = peak_rss()
+    start = time.perf_counter()
+    with open(os.devnull, "w") as sink, contextlib.redirect_stdout(sink):
+        cli.generate_video(request.mode, request.prompt, BENCH_KEY, request.model,
+                           request.duration, request.resolution, request.fps,
+                           output_path=args["output"], use_cache=False, coalesce=False)
+    return baseline, time.perf_counter() - start
+
+
+def child_download_video(args):
+    baseline = peak_rss()
+    start = time.perf_counter()
+    download_video(args["url"], args["output"])
+    return baseline, time.perf_counter() - start
+
+
+def child_api_call_upload(args):
+    request = BENCH_REQUEST
+    data = {"prompt": request.prompt, "model": request.model,
+            "resolution": request.resolution, "duration": request.duration}
+    baseline = peak_rss()
+    start = time.perf_counter()
+    api_call("/generations/image-to-video", BENCH_KEY, "POST", data, {"image": args["file"]})
+    return baseline, time.perf_counter() - start
+
+
+CHILD_CASES = {
+    "generate_video": child_generate_video,
+    "download_video": child_download_video,
+    "api_call_upload": child_api_call_upload,
+}
+
+
+def run_child(case, args, base_url):
+    """Run one memory case in a fresh interpreter; returns its measurements."""
+    env = dict(os.environ, LTX_BASE_URL=base_url, CINECLAW_BENCH_HOME=str(SCRATCH))
+    proc = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", case,
+                           json.dumps(args)], env=env, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"{case} failed: {(proc.stderr or proc.stdout).strip()[-500:]}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def child_main(case, args):
+    """Entry point of a memory child: print one JSON line of measurements."""
+    baseline, seconds = CHILD_CASES[case](json.loads(args))
+    peak = peak_rss()
+    result = {"seconds": round(seconds, 3), "baseline_rss_mb": round(baseline / MB, 1),
+              "peak_rss_mb": round(peak / MB, 1), "rss_growth_mb": round((peak - baseline) / MB, 1)}
+    size = json.loads(args).get("bytes")
+    if size:
+        result["mb_per_sec"] = round(size / MB / max(seconds, 1e-9), 1)
+    print(json.dumps(result))
+
+
+def bench_download(api, opts, out_dir):
+    """Peak RSS of the client while it saves MP4s of each size."""
+    results = {}
+    for size_mb in opts["sizes"]:
+        size = size_mb * MB
+        api.configure(latency="fixed:0", video_bytes=size, errors={}, drop_rate=0,
+                      slow_rate=0, fail_rate=0)
+        row = {}
+        if ROOT_CLI.exists():
+            output = out_dir / f"generate-{size_mb}.mp4"
+            row["generate_video"] = run_child("generate_video", {"output": str(output),
+                                                                 "bytes": size}, api.base_url)
+            output.unlink(missing_ok=True)
+        job = api_call("/generations/text-to-video", BENCH_KEY, "POST", {
+            "prompt": BENCH_REQUEST.prompt, "model": BENCH_REQUEST.model,
+            "resolution": BENCH_REQUEST.resolution, "duration": BENCH_REQUEST.duration})
+        while True:
+            record = api_call(f"/generations/{job['id']}", BENCH_KEY)
+            if record["status"] == "completed":
+                break
+            time.sleep(0.05)
+        output = out_dir / f"download-{size_mb}.mp4"
+        row["download_video"] = run_child("download_video", {
+            "url": record["video_url"], "output": str(output), "bytes": size}, api.base_url)
+        output.unlink(missing_ok=True)
+        results[f"{size_mb}MB"] = row
+    return results
+
+
+def bench_upload(api, opts, out_dir):
+    """Peak RSS of the client while api_call() streams a multipart upload."""
+    size = opts["upload_mb"] * MB
+    image = out_dir / "upload.png"
+    with open(image, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n")
+        block = os.urandom(MB)
+        remaining = size - 8
+        while remaining > 0:
+            f.write(block[:remaining])
+            remaining -= len(block)
+    api.configure(latency="fixed:0", errors={}, drop_rate=0, slow_rate=0, fail_rate=0)
+    try:
+        result = run_child("api_call_upload", {"file": str(image), "bytes": size}, api.base_url)
+    finally:
+        image.unlink(missing_ok=True)
+    return {f"{opts['upload_mb']}MB": result}
+
+
+# -- polling and throughput (in process) --
+
+def run_jobs(client, count, workers, out_dir, label):
+    """Generate count videos on workers threads; per-job seconds and failures."""
+    def one(i):
+        output = out_dir / f"{label}-{i}.mp4"
+        start = time.perf_counter()
+        try:
+            client.generate(BENCH_REQUEST, str(output))
+            return time.perf_counter() - start, None
+        except ltx_client.LTXError as e:
+            return time.perf_counter() - start, f"{type(e).__name__}: {e}"
+        finally:
+            output.unlink(missing_ok=True)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        outcomes = list(pool.map(one, range(count)))
+    return [seconds for seconds, _ in outcomes], [error for _, error in outcomes if error]
+
+
+def bench_polling(api, opts, out_dir):
+    """Status requests per async job: no history, learned timings, webhook."""
+    jobs = opts["polling_jobs"]
+    api.configure(latency=opts["polling_latency"], video_bytes=256 * 1024, errors={},
+                  drop_rate=0, slow_rate=0, fail_rate=0)
+    results = {"jobs": jobs, "latency": opts["polling_latency"]}
+    scheduler = PriorityScheduler(slots=jobs, reserved={})
+    rounds = [("cold", None), ("warm", None)]
+    receiver = WebhookReceiver(POLLER).start()
+    rounds.append(("webhook", receiver))
+    try:
+        for name, webhook in rounds:
+            client = quiet_client(AsyncTransport(webhook=webhook), scheduler=scheduler)
+            polls = api.stats()["polls"]
+            start = time.perf_counter()
+            seconds, errors = run_jobs(client, jobs, jobs, out_dir, f"poll-{name}")
+            elapsed = time.perf_counter() - start
+            polls = api.stats()["polls"] - polls
+            results[name] = {"polls": polls, "polls_per_job": round(polls / jobs, 2),
+                             "seconds": round(elapsed, 2), "jobs": summarize(seconds),
+                             "errors": len(errors)}
+    finally:
+        receiver.stop()
+    return results
+
+
+def bench_throughput(api, opts, out_dir):
+    """Completed jobs per second at each concurrency level, sync transport.
+
+    The scheduler gets one slot per worker, so the client's own limits (not
+    SCHEDULER_SLOTS) are what is measured.
+    """
+    video_bytes = int(opts["throughput_video_mb"] * MB)
+    api.configure(latency=opts["throughput_latency"], video_bytes=video_bytes, errors={},
+                  drop_rate=0, slow_rate=0, fail_rate=0)
+    results = {"latency": opts["throughput_latency"], "video_bytes": video_bytes, "levels": {}}
+    for workers in opts["concurrency"]:
+        count = workers * opts["jobs_per_worker"]
+        client = quiet_client(SyncTransport(),
+                              scheduler=PriorityScheduler(slots=workers, reserved={}))
+        api.reset()
+        handshakes = POOL.handshakes
+        start = time.perf_counter()
+        seconds, errors = run_jobs(client, count, workers, out_dir, f"tp-{workers}")
+        elapsed = time.perf_counter() - start
+        stats = api.stats()
+        results["levels"][str(workers)] = {
+            "jobs": count, "seconds": round(elapsed, 3),
+            "jobs_per_sec": round((count - len(errors)) / elapsed, 3),
+            "latency": summarize(seconds), "errors": len(errors),
+            "server_peak_in_flight": stats["peak_in_flight"],
+            "handshakes": POOL.handshakes - handshakes,
+        }
+        if errors:
+            results["levels"][str(workers)]["first_error"] = errors[0]
+    return results
+
+
+BENCHMARKS = {
+    "overhead": bench_overhead,
+    "download": bench_download,
+    "upload": bench_upload,
+    "polling": bench_polling,
+    "throughput": bench_throughput,
+}
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, cwd=Path(__file__).resolve().parent,
+                              timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run(only, opts):
+    """Run the selected benchmarks and return the report dict."""
+    report = {"version": REPORT_VERSION, "commit": git_commit(),
+              "python": platform.python_version(), "platform": platform.platform(),
+              "cpus": os.cpu_count(), "started": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+              "options": opts, "results": {}}
+    out_dir = SCRATCH / "videos"
+    out_dir.mkdir(parents=True, exist_ok=True)
+    with LTXEmulator(EmulatorConfig(seed=0)) as api:
+        ltx_client.BASE_URL = api.base_url
+        for name in only:
+            print(f"[bench] {name}...", file=sys.stderr)
+            started = time.perf_counter()
+            report["results"][name] = BENCHMARKS[name](api, opts, out_dir)
+            print(f"[bench] {name} done in {time.perf_counter() - started:.1f}s",
+                  file=sys.stderr)
+    return report
+
+
+def flatten(tree, prefix=""):
+    """{"a": {"b": 1}} -> {"a.b": 1}, numbers only."""
+    flat = {}
+    for key, value in tree.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{name}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare(old, new, threshold=COMPARE_THRESHOLD, file=sys.stdout):
+    """Print every metric that moved by more than threshold between two reports."""
+    before, after = flatten(old.get("results", {})), flatten(new.get("results", {}))
+    print(f"Comparing {old.get('commit') or '?'} -> {new.get('commit') or '?'} "
+          f"(changes over {threshold:.0%}):", file=file)
+    moved = 0
+    for name in sorted(before.keys() & after.keys()):
+        a, b = before[name], after[name]
+        if a == b or (a == 0 and abs(b) < 1e-9):
+            continue
+        change = (b - a) / abs(a) if a else float("inf")
+        if abs(change) > threshold:
+            moved += 1
+            print(f"  {name}: {a:g} -> {b:g} ({change:+.0%})", file=file)
+    if not moved:
+        print("  nothing moved", file=file)
+
+
+def main():
+    args = sys.argv[1:]
+    if args[:1] == ["--child"] and len(args) == 3:
+        child_main(args[1], args[2])
+        return
+    if "-h" in args or "--help" in args:
+        print(__doc__.strip())
+        return
+    opts = dict(QUICK if "--quick" in args else DEFAULTS)
+    only = list(BENCHMARKS)
+    output = baseline = None
+    lists = {"--sizes": "sizes", "--concurrency": "concurrency"}
+    i = 0
+    try:
+        while i < len(args):
+            if args[i] == "--only" and i + 1 < len(args):
+                only = [name for name in args[i + 1].split(",") if name]
+                unknown = set(only) - set(BENCHMARKS)
+                if unknown:
+                    raise ValueError(f"unknown benchmark(s) {', '.join(sorted(unknown))} "
+                                     f"(use {', '.join(BENCHMARKS)})")
+                i += 2
+            elif args[i] in lists and i + 1 < len(args):
+                opts[lists[args[i]]] = [int(n) for n in args[i + 1].split(",") if n]
+                i += 2
+            elif args[i] == "--jobs" and i + 1 < len(args):
+                opts["overhead_jobs"] = opts["polling_jobs"] = int(args[i + 1])
+                i += 2
+            elif args[i] == "--upload-mb" and i + 1 < len(args):
+                opts["upload_mb"] = int(args[i + 1])
+                i += 2
+            elif args[i] == "--output" and i + 1 < len(args):
+                output = args[i + 1]
+                i += 2
+            elif args[i] == "--compare" and i + 1 < len(args):
+                with open(args[i + 1]) as f:
+                    baseline = json.load(f)
+                i += 2
+            elif args[i] == "--quick":
+                i += 1
+            else:
+                print(f"WARNING: Ignoring unknown argument {args[i]}", file=sys.stderr)
+                i += 1
+    except (ValueError, OSError) as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        report = run(only, opts)
+    except (RuntimeError, ltx_client.LTXError, OSError) as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        sys.exit(1)
+    text = json.dumps(report, indent=2)
+    if output:
+        with open(output, "w") as f:
+            f.write(text + "\n")
+        print(f"Results written to {output}", file=sys.stderr)
+    else:
+        print(text)
+    if baseline:
+        # Keep stdout pure JSON when the report went there
+        compare(baseline, report, file=sys.stdout if output else sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
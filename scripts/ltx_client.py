@@ -0,0 +1,4353 @@
+#!/usr/bin/env python3
+"""
+ltx_client.py — importable LTX-2 client shared by the CineClaw scripts
+
+Stdlib only. Usage:
+    from ltx_client import LTXClient, GenerationRequest
+
+    client = LTXClient(api_key, transport="async")
+    result = client.generate(GenerationRequest("t2v", "Lighthouse at dusk. Slow dolly in."))
+    print(result.output_path, result.cost)
+
+Two transports cover the two API styles. SyncTransport POSTs JSON to
+/v1/{text,image,audio}-to-video and receives the MP4 as the response body;
+local images and audio are put in an object store once per content and
+sent by URL. AsyncTransport POSTs multipart to /v1/generations/..., waits
+for the job (polling, or a webhook callback) and downloads the finished
+video. Failures raise LTXError subclasses instead of exiting, and one
+client can drive many generations from many threads.
+"""
+
+import os
+import sys
+import json
+import math
+import atexit
+import bisect
+import contextlib
+import cProfile
+import pstats
+import tracemalloc
+import urllib.parse
+import urllib.error
+import io
+import random
+import socket
+import sqlite3
+import ssl
+import time
+import select
+import struct
+import hashlib
+import hmac
+import itertools
+import email.utils
+import mimetypes
+import functools
+import http.client
+import secrets
+import shutil
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, asdict, replace
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Optional
+
+# API root; LTX_BASE_URL points both scripts elsewhere (e.g. scripts/ltx_emulator.py)
+BASE_URL = os.environ.get("LTX_BASE_URL", "https://api.ltx.video/v1").rstrip("/")
+
+# Generation modes and the name each has in the API's endpoint paths
+MODE_NAMES = {"t2v": "text", "i2v": "image", "a2v": "audio"}
+
+# Resolution aliases accepted by --resolution
+RESOLUTIONS = {
+    "1080p": "1920x1080",
+    "1080": "1920x1080",
+    "1920x1080": "1920x1080",
+    "1440p": "2560x1440",
+    "1440": "2560x1440",
+    "2560x1440": "2560x1440",
+    "2k": "2560x1440",
+    "4k": "3840x2160",
+    "2160p": "3840x2160",
+    "3840x2160": "3840x2160",
+    "uhd": "3840x2160",
+}
+
+# Cost per second estimates (USD)
+COST_PER_SEC = {
+    "ltx-2-fast": {"1920x1080": 0.02, "2560x1440": 0.04, "3840x2160": 0.08},
+    "ltx-2-pro":  {"1920x1080": 0.05, "2560x1440": 0.10, "3840x2160": 0.20},
+}
+
+CAMERA_MOTIONS = [
+    "dolly_in", "dolly_out", "pan_left", "pan_right",
+    "crane_up", "crane_down", "static", "handheld"
+]
+
+# Supported configurations from ltx-api.md: (model, resolution, fps) -> allowed
+# duration range in seconds. Anything not listed is answered with a 422.
+SUPPORTED_CONFIGS = {
+    ("ltx-2-fast", "1920x1080", 25): (6, 20),
+    ("ltx-2-fast", "1920x1080", 50): (6, 10),
+    ("ltx-2-fast", "2560x1440", 25): (6, 10),
+    ("ltx-2-fast", "3840x2160", 25): (6, 10),
+    ("ltx-2-pro", "1920x1080", 25): (6, 10),
+    ("ltx-2-pro", "1920x1080", 50): (6, 10),
+    ("ltx-2-pro", "2560x1440", 25): (6, 10),
+    ("ltx-2-pro", "2560x1440", 50): (6, 10),
+    ("ltx-2-pro", "3840x2160", 25): (6, 10),
+    ("ltx-2-pro", "3840x2160", 50): (6, 10),
+}
+
+# Audio-to-video runs on one model at one resolution; duration follows the audio
+A2V_CONFIG = ("ltx-2-pro", "1920x1080")
+
+# Longest prompt the API accepts
+MAX_PROMPT_CHARS = 5000
+
+# How far --auto-fix considers each kind of change: one second of duration
+# counts 1, so it prefers trimming a few seconds over dropping to 25fps, and
+# both over changing resolution or model
+FIX_WEIGHTS = {"duration": 1, "fps": 10, "resolution": 20, "model": 50}
+
+# Download chunk size — videos are streamed to disk, never held in memory
+CHUNK_SIZE = 1024 * 1024
+
+# Connection drops tolerated per download before giving up
+DOWNLOAD_ATTEMPTS = 5
+
+
+class LTXError(Exception):
+    """Base class for every error raised by the client."""
+
+
+class InvalidRequestError(LTXError, ValueError):
+    """The request was rejected locally, before anything was sent."""
+
+
+class APIError(LTXError):
+    """The API answered with an HTTP error (after any retries)."""
+
+    def __init__(self, status, message, request_id=None, retry_after=None):
+        super().__init__(f"HTTP {status}: {message}")
+        self.status = status
+        self.message = message
+        self.request_id = request_id
+        self.retry_after = retry_after
+
+    @classmethod
+    def from_http_error(cls, e):
+        body = e.read().decode("utf-8", errors="replace")
+        try:
+            message = json.loads(body).get("error", {}).get("message", body)
+        except (ValueError, AttributeError):
+            message = body[:500]
+        request_id = e.headers.get("x-request-id") if e.headers else None
+        return cls(e.code, message or e.reason, request_id, retry_after_seconds(e.headers))
+
+
+class NetworkError(LTXError):
+    """The API could not be reached (after any retries)."""
+
+    def __init__(self, reason):
+        super().__init__(f"Connection failed: {reason}")
+        self.reason = reason
+
+
+class GenerationError(LTXError):
+    """The API reported a generation as failed."""
+
+
+class GenerationTimeout(LTXError, TimeoutError):
+    """A generation did not finish within its deadline."""
+
+
+class DownloadError(LTXError):
+    """The finished video could not be downloaded intact."""
+
+    def __init__(self, message, part_path=None):
+        super().__init__(message)
+        self.part_path = part_path
+
+
+class BudgetExceeded(LTXError):
+    """Reserving a job's estimated cost would break a spending cap."""
+
+    def __init__(self, scope, limit, spent, requested):
+        super().__init__(f"{scope} budget ${limit:.2f} would be exceeded: ${spent:.2f} spent or "
+                         f"reserved, this job needs ~${requested:.2f}")
+        self.scope = scope
+        self.limit = limit
+        self.spent = spent
+        self.requested = requested
+
+
+class JobRequeued(LTXError):
+    """A queued job was handed back before it was sent (see PriorityScheduler.requeue())."""
+
+
+@dataclass(frozen=True)
+class GenerationRequest:
+    """One video to generate.
+
+    image_path/audio_path are local files, or public URLs for the sync API
+    (which uploads local files to the asset store first). seed is only
+    accepted by the async API, camera_motion and generate_audio only by the
+    sync API.
+    """
+    mode: str
+    prompt: str
+    model: str = "ltx-2-fast"
+    duration: int = 6
+    resolution: str = "1920x1080"
+    fps: int = 25
+    seed: Optional[int] = None
+    camera_motion: Optional[str] = None
+    generate_audio: bool = True
+    image_path: Optional[str] = None
+    audio_path: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class GenerationResult:
+    """A finished video on disk and where it came from."""
+    output_path: str
+    request_id: Optional[str]
+    bytes: int
+    sha256: str
+    estimated_cost: float
+    cost: Optional[float] = None
+    cached: bool = False
+    coalesced: bool = False
+    mb_per_sec: float = 0.0
+
+    def to_dict(self):
+        return asdict(self)
+
+
+def estimated_cost(model, resolution, duration):
+    """Approximate USD cost of a generation from COST_PER_SEC."""
+    return COST_PER_SEC.get(model, {}).get(resolution, 0.05) * duration
+
+
+def validate_request(request):
+    """Check request against SUPPORTED_CONFIGS and the prompt limit.
+
+    Returns a list of problems; empty means the API should accept it.
+    """
+    return validate_fields(request.mode, request.prompt, request.model, request.resolution,
+                           request.fps, request.duration, request.camera_motion)
+
+
+def validate_fields(mode, prompt, model, resolution, fps, duration, camera_motion=None):
+    """validate_request() on plain values, for loops that skip building requests."""
+    problems = []
+    if not isinstance(prompt, str) or not prompt.strip():
+        problems.append("prompt is empty")
+    elif len(prompt) > MAX_PROMPT_CHARS:
+        problems.append(f"prompt is {len(prompt)} characters (max {MAX_PROMPT_CHARS})")
+    if not all(isinstance(value, (int, float)) for value in (fps, duration)):
+        problems.append(f"fps and duration must be numbers, not {fps!r} and {duration!r}")
+        return problems
+    try:
+        problems.extend(_config_problems(mode, model, resolution, fps, duration, camera_motion))
+    except TypeError:
+        problems.append("mode, model, resolution and camera_motion must be strings")
+    return problems
+
+
+@functools.lru_cache(maxsize=4096)
+def _config_problems(mode, model, resolution, fps, duration, camera_motion):
+    # Manifests repeat a handful of configurations, so each is checked once
+    problems = []
+    if camera_motion and camera_motion not in CAMERA_MOTIONS:
+        problems.append(f"unknown camera motion '{camera_motion}'")
+    known_model = model in COST_PER_SEC
+    if not known_model:
+        problems.append(f"unknown model '{model}' (use {' or '.join(COST_PER_SEC)})")
+    if mode == "a2v":
+        if known_model and (model, resolution) != A2V_CONFIG:
+            problems.append(f"a2v only supports {A2V_CONFIG[0]} at {A2V_CONFIG[1]}")
+    elif mode not in MODE_NAMES:
+        problems.append(f"unknown mode '{mode}' (use t2v, i2v or a2v)")
+    elif known_model:
+        limits = SUPPORTED_CONFIGS.get((model, resolution, fps))
+        if limits is None:
+            problems.append(f"{model} doesn't support {resolution} at {fps}fps")
+        elif not limits[0] <= duration <= limits[1]:
+            problems.append(f"{model} at {resolution}/{fps}fps allows "
+                            f"{limits[0]}-{limits[1]}s, not {duration}s")
+    return tuple(problems)
+
+
+def check_request(request):
+    """Raise InvalidRequestError unless validate_request() finds nothing."""
+    problems = validate_request(request)
+    if problems:
+        raise InvalidRequestError("Invalid request: " + "; ".join(problems))
+
+
+def _resolution_steps(a, b):
+    order = ("1920x1080", "2560x1440", "3840x2160")
+    if a in order and b in order:
+        return abs(order.index(a) - order.index(b))
+    return len(order)
+
+
+@functools.lru_cache(maxsize=4096)
+def _nearest_config(model, resolution, fps, duration):
+    best = None
+    for (cand_model, cand_resolution, cand_fps), (low, high) in SUPPORTED_CONFIGS.items():
+        cand_duration = min(max(duration, low), high)
+        score = (FIX_WEIGHTS["duration"] * abs(cand_duration - duration)
+                 + FIX_WEIGHTS["fps"] * (cand_fps != fps)
+                 + FIX_WEIGHTS["resolution"] * _resolution_steps(cand_resolution, resolution)
+                 + FIX_WEIGHTS["model"] * (cand_model != model))
+        if best is None or score < best[0]:
+            best = (score, cand_model, cand_resolution, cand_fps, cand_duration)
+    return best[1:]
+
+
+def fix_request(request):
+    """Return (request, changes) moved to the nearest supported configuration.
+
+    changes is a list of human-readable explanations, empty when request was
+    already valid. Problems with no sensible fix (empty prompt, unknown mode)
+    raise InvalidRequestError.
+    """
+    changes = []
+    fields = {}
+    if request.prompt and len(request.prompt) > MAX_PROMPT_CHARS:
+        cut = request.prompt.rfind(" ", 0, MAX_PROMPT_CHARS + 1)
+        fields["prompt"] = request.prompt[:cut if cut > 0 else MAX_PROMPT_CHARS].rstrip()
+        changes.append(f"prompt trimmed from {len(request.prompt)} to "
+                       f"{len(fields['prompt'])} characters")
+    if request.camera_motion and request.camera_motion not in CAMERA_MOTIONS:
+        fields["camera_motion"] = None
+        changes.append(f"unknown camera motion '{request.camera_motion}' dropped")
+
+    if request.mode == "a2v":
+        model, resolution = A2V_CONFIG
+        if request.model != model:
+            fields["model"] = model
+            changes.append(f"model {request.model} -> {model} (a2v is {model} only)")
+        if request.resolution != resolution:
+            fields["resolution"] = resolution
+            changes.append(f"resolution {request.resolution} -> {resolution} "
+                           f"(a2v is {resolution} only)")
+    elif request.mode in MODE_NAMES:
+        if not all(isinstance(value, (int, float)) for value in (request.fps, request.duration)):
+            # Not a configuration at all; report why before looking anything up
+            check_request(request)
+        try:
+            model, resolution, fps, duration = _nearest_config(
+                request.model, request.resolution, request.fps, request.duration)
+        except TypeError:
+            # Unhashable values can't be looked up either
+            check_request(request)
+            raise
+        low, high = SUPPORTED_CONFIGS[(model, resolution, fps)]
+        for name, value in (("model", model), ("resolution", resolution), ("fps", fps),
+                            ("duration", duration)):
+            if getattr(request, name) != value:
+                fields[name] = value
+                changes.append(f"{name} {getattr(request, name)} -> {value} "
+                               f"(nearest supported: {model} {resolution}/{fps}fps, "
+                               f"{low}-{high}s)")
+
+    fixed = replace(request, **fields) if fields else request
+    check_request(fixed)
+    return fixed, changes
+
+
+def draft_request(request):
+    """Return (draft, final): request's cheapest supported stand-in and the
+    full-quality request it previews, both with the same pinned seed.
+
+    The draft keeps the prompt, mode and (where supported) duration and
+    only changes model, resolution and fps; a2v has a single configuration,
+    so its draft is the final.
+    """
+    seed = request.seed if request.seed is not None else secrets.randbelow(2 ** 31)
+    final = replace(request, seed=seed)
+    if request.mode == "a2v":
+        return final, final
+    best = None
+    for (model, resolution, fps), (low, high) in SUPPORTED_CONFIGS.items():
+        duration = min(max(request.duration, low), high)
+        rank = (estimated_cost(model, resolution, duration), fps, duration)
+        if best is None or rank < best[0]:
+            best = (rank, model, resolution, fps, duration)
+    _, model, resolution, fps, duration = best
+    draft = replace(final, model=model, resolution=resolution, fps=fps, duration=duration)
+    return draft, final
+
+
+# Histogram buckets (seconds) for the per-phase latency metric
+PHASE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+                 60.0, 120.0, 300.0, 600.0)
+
+# Metrics exposed for Prometheus: name -> (type, help)
+METRICS = {
+    "cineclaw_http_requests_total": ("counter", "HTTP requests by endpoint, method and status."),
+    "cineclaw_errors_total": ("counter", "Failed phases by phase and error code."),
+    "cineclaw_bytes_total": ("counter", "Request and video bytes by direction."),
+    "cineclaw_jobs_total": ("counter", "Finished jobs by outcome, model and resolution."),
+    "cineclaw_phase_seconds": ("histogram", "Time per phase by model and resolution."),
+}
+
+
+def _label_value(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Metrics:
+    """Counters and histograms in the Prometheus text format.
+
+    write() leaves them in a textfile (for node_exporter's textfile
+    collector); serve() answers GET /metrics over HTTP.
+    """
+
+    def __init__(self, buckets=PHASE_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._counters = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+        self._server = None
+
+    def inc(self, name, labels, amount=1):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name, labels, value):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            row = self._histograms.get(key)
+            if row is None:
+                # One count per bucket plus +Inf, then the sum
+                row = self._histograms[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            row[bisect.bisect_left(self.buckets, value)] += 1
+            row[-1] += value
+
+    def render(self):
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted((key, list(row)) for key, row in self._histograms.items())
+        lines = []
+        for name, (kind, text) in METRICS.items():
+            lines += [f"# HELP {name} {text}", f"# TYPE {name} {kind}"]
+            for (metric, labels), value in counters:
+                if metric == name:
+                    lines.append(f"{name}{self._labels(labels)} {value}")
+            for (metric, labels), row in histograms:
+                if metric != name:
+                    continue
+                total = 0
+                for bound, count in zip(self.buckets + (float("inf"),), row):
+                    total += count
+                    le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                    lines.append(f"{name}_bucket{self._labels(labels + (('le', le),))} {total}")
+                lines.append(f"{name}_sum{self._labels(labels)} {row[-1]:.6f}")
+                lines.append(f"{name}_count{self._labels(labels)} {total}")
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _labels(labels):
+        if not labels:
+            return ""
+        return "{" + ",".join(f'{k}="{_label_value(v)}"' for k, v in labels) + "}"
+
+    def write(self, path):
+        """Replace path with the current metrics, atomically."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        tmp.write_text(self.render(), encoding="utf-8")
+        os.replace(tmp, path)
+
+    def serve(self, host="127.0.0.1", port=0):
+        """Answer GET /metrics on host:port from a background thread; returns the server."""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.split("?", 1)[0] != "/metrics":
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                body = metrics.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="cineclaw-metrics",
+                         daemon=True).start()
+        return self._server
+
+
+def error_code(exc):
+    """Short label for an exception: the HTTP status, or the error's class name."""
+    status = getattr(exc, "code", None) or getattr(exc, "status", None)
+    if isinstance(status, int):
+        return str(status)
+    reason = getattr(exc, "reason", None)
+    return type(reason if isinstance(reason, BaseException) else exc).__name__
+
+
+def endpoint_label(url):
+    """API path of url with ids replaced ("/generations/{id}"), or the host for other URLs."""
+    if "://" not in url:
+        url = BASE_URL + url
+    parts = urllib.parse.urlsplit(url)
+    base = urllib.parse.urlsplit(BASE_URL)
+    if parts.netloc != base.netloc or not parts.path.startswith(base.path.rstrip("/") + "/"):
+        return parts.hostname or ""
+    segments = parts.path[len(base.path.rstrip("/")):].strip("/").split("/")
+    return "/" + "/".join(s if i == 0 or s.endswith("-to-video") else "{id}"
+                          for i, s in enumerate(segments))
+
+
+class _NoSpan:
+    """What Tracer.span() hands out while tracing is off."""
+
+    phases = {}
+
+    def tag(self, **tags):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NO_SPAN = _NoSpan()
+
+
+class Span:
+    """One timed phase of a job. Use as a context manager; an exception
+    leaving it is recorded as the span's error."""
+
+    def __init__(self, tracer, name, tags, parent):
+        self.tracer = tracer
+        self.name = name
+        self.tags = tags
+        self.parent = parent
+        self.job = parent.job if parent is not None else None
+        self.id = next(tracer._ids)
+        self.start = self.wall = None
+        self._previous = None
+
+    def tag(self, **tags):
+        self.tags.update(tags)
+
+    def __enter__(self):
+        local = self.tracer._local
+        self._previous = getattr(local, "span", None)
+        local.span = self
+        self.wall = time.time()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self.start
+        self.tracer._local.span = self._previous
+        self.tracer.record(self, seconds, exc)
+        return False
+
+
+class JobSpan(Span):
+    """The root span of one generation; its tags are shared with every span
+    under it, and it totals their time per phase."""
+
+    def __init__(self, tracer, tags):
+        super().__init__(tracer, "job", tags, None)
+        self.job = self
+        self.trace = secrets.token_hex(8)
+        self.phases = {}
+
+
+class Tracer:
+    """Per-phase timing of every job, as JSONL spans and/or Metrics.
+
+    Each generation is a "job" span; the phases under it (scheduler and
+    rate-limit waits, DNS, connect, TLS, send, time to first byte, polls,
+    download, retries) are child spans carrying the job's request id,
+    model, resolution and endpoint. Spans started on another thread (the
+    poller's) name their parent explicitly. While disabled, span() returns
+    a shared no-op object, so instrumented code pays one call per phase.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.path = None
+        self.metrics = None
+        self.metrics_path = None
+        self._file = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._ids = itertools.count(1)
+
+    def configure(self, trace=None, metrics=None):
+        """Write spans to trace (a JSONL path) and/or count them into metrics:
+        a textfile path, or "[HOST]:PORT" to serve /metrics. Raises OSError."""
+        if trace:
+            self._file = open(trace, "a", encoding="utf-8", buffering=1)
+            self.path = trace
+        if metrics:
+            self.metrics = self.metrics or Metrics()
+            host, _, port = metrics.rpartition(":")
+            if port.isdigit() and "/" not in metrics:
+                self.metrics.serve(host or "127.0.0.1", int(port))
+            else:
+                self.metrics_path = metrics
+                self.metrics.write(metrics)
+                atexit.register(self.flush)
+        self.enabled = bool(self._file or self.metrics)
+
+    def job(self, **tags):
+        """Root span for one generation."""
+        if not self.enabled:
+            return NO_SPAN
+        return JobSpan(self, tags)
+
+    def span(self, name, parent=None, **tags):
+        """Span for one phase, under parent or else the thread's current span."""
+        if not self.enabled:
+            return NO_SPAN
+        return Span(self, name, tags, parent or getattr(self._local, "span", None))
+
+    def current(self):
+        """The span open on this thread, to parent spans started elsewhere."""
+        return getattr(self._local, "span", None) if self.enabled else None
+
+    def tag(self, **tags):
+        """Add tags to the current job, and so to every span recorded under it from now."""
+        span = self.current()
+        if span is not None and span.job is not None:
+            span.job.tags.update(tags)
+
+    def record(self, span, seconds, exc=None):
+        job = span.job
+        tags = dict(span.tags) if span is job else dict(job.tags if job else {}, **span.tags)
+        if "url" in tags:
+            # Never log URLs: presigned ones carry credentials
+            tags["endpoint"] = endpoint_label(tags.pop("url"))
+        error = error_code(exc) if exc is not None else tags.pop("error", None)
+        line = {"trace": job.trace if job else None, "span": span.id,
+                "parent": span.parent.id if span.parent else None, "name": span.name,
+                "start": round(span.wall, 6), "seconds": round(seconds, 6),
+                "thread": threading.current_thread().name, "tags": tags}
+        if error:
+            line["error"] = error
+        with self._lock:
+            if job is not None and span is not job:
+                job.phases[span.name] = job.phases.get(span.name, 0.0) + seconds
+            if span is job:
+                line["phases"] = {name: round(total, 6) for name, total in job.phases.items()}
+            if self._file:
+                self._file.write(json.dumps(line, default=str) + "\n")
+        if self.metrics:
+            self._count(span, tags, seconds, error)
+
+    def _count(self, span, tags, seconds, error):
+        metrics = self.metrics
+        config = {"model": tags.get("model", ""), "resolution": tags.get("resolution", "")}
+        metrics.observe("cineclaw_phase_seconds", dict(config, phase=span.name), seconds)
+        if error:
+            metrics.inc("cineclaw_errors_total", {"phase": span.name, "code": error})
+        if span.name == "http":
+            metrics.inc("cineclaw_http_requests_total", {
+                "endpoint": tags.get("endpoint", ""), "method": tags.get("method", ""),
+                "code": str(tags.get("status") or error or "")})
+        for direction in ("up", "down"):
+            count = tags.get(f"bytes_{direction}")
+            if count:
+                metrics.inc("cineclaw_bytes_total", {"direction": direction}, int(count))
+        if span is span.job:
+            outcome = tags.get("outcome") or ("error" if error else "ok")
+            metrics.inc("cineclaw_jobs_total", dict(config, outcome=outcome))
+            self.flush()
+
+    def flush(self):
+        """Rewrite the metrics textfile, if there is one."""
+        if self.metrics_path:
+            try:
+                self.metrics.write(self.metrics_path)
+            except OSError as e:
+                print(f"WARNING: Could not write metrics to {self.metrics_path}: {e}",
+                      file=sys.stderr)
+
+
+TRACER = Tracer()
+try:
+    TRACER.configure(os.environ.get("CINECLAW_TRACE"), os.environ.get("CINECLAW_METRICS"))
+except OSError as e:
+    print(f"WARNING: Tracing disabled (CINECLAW_TRACE/CINECLAW_METRICS: {e})", file=sys.stderr)
+
+
+@contextlib.contextmanager
+def profiled(prefix):
+    """Run the body under cProfile (on every thread it starts) and tracemalloc.
+
+    Leaves prefix.prof (pstats data, e.g. for snakeviz) and prefix.txt (top
+    functions by cumulative time, top allocation sites, peak traced memory).
+    """
+    prefix = Path(prefix)
+    prefix.parent.mkdir(parents=True, exist_ok=True)
+    profilers = [cProfile.Profile()]
+
+    def profile_thread(frame, event, arg):
+        # First event in a new thread: replace this hook with a profiler of its own
+        profiler = cProfile.Profile()
+        profilers.append(profiler)
+        profiler.enable()
+
+    tracemalloc.start(25)
+    threading.setprofile(profile_thread)
+    profilers[0].enable()
+    try:
+        yield prefix
+    finally:
+        profilers[0].disable()
+        threading.setprofile(None)
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        stats = pstats.Stats(profilers[0])
+        for profiler in profilers[1:]:
+            stats.add(profiler)
+        stats.dump_stats(str(prefix) + ".prof")
+        report = io.StringIO()
+        report.write(f"Peak traced memory: {peak / (1024 * 1024):.1f} MB "
+                     f"(still allocated at exit: {current / (1024 * 1024):.1f} MB), "
+                     f"{len(profilers)} thread(s) profiled\n\n")
+        pstats.Stats(str(prefix) + ".prof", stream=report).sort_stats("cumulative").print_stats(40)
+        report.write("Top allocation sites:\n")
+        for stat in snapshot.statistics("lineno")[:25]:
+            report.write(f"  {stat}\n")
+        Path(str(prefix) + ".txt").write_text(report.getvalue(), encoding="utf-8")
+        print(f"Profile: {prefix}.txt ({prefix}.prof for pstats/snakeviz)", file=sys.stderr)
+
+
+def instrument(args):
+    """Act on --trace FILE, --metrics FILE|[HOST]:PORT and --profile in a command line.
+
+    Returns (the other arguments, a context manager to run the command in).
+    Raises ValueError for a missing value and OSError if a file can't be opened.
+    """
+    rest = []
+    trace = metrics = None
+    profile = False
+    i = 0
+    while i < len(args):
+        if args[i] in ("--trace", "--metrics"):
+            if i + 1 >= len(args):
+                raise ValueError(f"{args[i]} needs a value")
+            if args[i] == "--trace":
+                trace = args[i + 1]
+            else:
+                metrics = args[i + 1]
+            i += 2
+        elif args[i] == "--profile":
+            profile = True
+            i += 1
+        else:
+            rest.append(args[i])
+            i += 1
+    if trace or metrics:
+        TRACER.configure(trace, metrics)
+    if not profile:
+        return rest, contextlib.nullcontext()
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    return rest, profiled(STATE_DIR / "profiles" / f"{stamp}-{os.getpid()}")
+
+
+class PooledResponse:
+    """File-like wrapper that hands its connection back to the pool once the
+    body has been read to the end."""
+
+    def __init__(self, pool, key, conn, resp, url):
+        self._pool = pool
+        self._key = key
+        self._conn = conn
+        self._resp = resp
+        self.url = url
+        self.status = resp.status
+        self.reason = resp.reason
+        self.headers = resp.headers
+
+    def geturl(self):
+        return self.url
+
+    def read(self, amt=None):
+        data = self._resp.read(amt)
+        if self._resp.isclosed():
+            self.close()
+        return data
+
+    def readinto(self, b):
+        n = self._resp.readinto(b)
+        if self._resp.isclosed():
+            self.close()
+        return n
+
+    def close(self):
+        if self._conn is None:
+            return
+        conn, self._conn = self._conn, None
+        if self._resp.isclosed() and not self._resp.will_close:
+            self._pool._release(self._key, conn)
+        else:
+            # Unread body or server asked to close — the socket can't be reused
+            self._resp.close()
+            conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ConnectionPool:
+    """Keep-alive HTTP(S) connections reused per host.
+
+    Idle connections are capped per host and evicted after idle_timeout
+    seconds. A request that fails because the server silently dropped a
+    reused connection is retried once on a fresh one. HTTP errors are raised
+    as urllib.error.HTTPError and network failures as URLError, so callers
+    handle them exactly as they would with urlopen().
+    """
+
+    def __init__(self, max_idle_per_host=4, idle_timeout=30.0, timeout=60):
+        self.max_idle_per_host = max_idle_per_host
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        # One TLS context for every connection, and for the traced handshake in _connect()
+        self.ssl_context = ssl.create_default_context()
+        self._idle = {}
+        self._lock = threading.Lock()
+        self.handshakes = 0
+        self.requests = 0
+        self.reused = 0
+        self.stale_retries = 0
+        self.evicted = 0
+
+    def _acquire(self, key):
+        now = time.monotonic()
+        with self._lock:
+            idle = self._idle.get(key, [])
+            while idle:
+                conn, last_used = idle.pop()
+                if now - last_used > self.idle_timeout or self._is_dropped(conn):
+                    conn.close()
+                    self.evicted += 1
+                    continue
+                self.reused += 1
+                return conn, True
+            self.handshakes += 1
+        scheme, host, port = key
+        if scheme == "https":
+            return http.client.HTTPSConnection(host, port, timeout=self.timeout,
+                                               context=self.ssl_context), False
+        return http.client.HTTPConnection(host, port, timeout=self.timeout), False
+
+    def _release(self, key, conn):
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_idle_per_host:
+                idle.append((conn, time.monotonic()))
+                return
+        conn.close()
+
+    @staticmethod
+    def _is_dropped(conn):
+        # An idle keep-alive socket should have nothing to read; if it does,
+        # the server has closed it (EOF) or sent something we can't use
+        if conn.sock is None:
+            return True
+        try:
+            readable, _, _ = select.select([conn.sock], [], [], 0)
+        except (OSError, ValueError):
+            return True
+        return bool(readable)
+
+    def request(self, method, url, body=None, headers=None, timeout=None, max_redirects=5):
+        """Send a request and return a PooledResponse.
+
+        body may be bytes, or a zero-argument callable returning an iterable
+        of chunks so a streamed body can be replayed on a stale-retry.
+        """
+        for _ in range(max_redirects + 1):
+            with TRACER.span("http", method=method, url=url) as span:
+                resp = self._send(method, url, body, headers or {}, timeout)
+                span.tag(status=resp.status)
+                if resp.status in (301, 302, 303, 307, 308) and method in ("GET", "HEAD"):
+                    location = resp.headers.get("Location")
+                    resp.read()
+                    resp.close()
+                    if location:
+                        url = urllib.parse.urljoin(url, location)
+                        continue
+                if resp.status >= 400:
+                    error_body = resp.read()
+                    resp.close()
+                    raise urllib.error.HTTPError(
+                        url, resp.status, resp.reason, resp.headers, io.BytesIO(error_body))
+            return resp
+        raise urllib.error.URLError(f"too many redirects for {url}")
+
+    def _send(self, method, url, body, headers, timeout):
+        parts = urllib.parse.urlsplit(url)
+        scheme = parts.scheme.lower()
+        port = parts.port or (443 if scheme == "https" else 80)
+        key = (scheme, parts.hostname, port)
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+
+        with self._lock:
+            self.requests += 1
+        for attempt in range(2):
+            conn, reused = self._acquire(key)
+            conn.timeout = timeout or self.timeout
+            if conn.sock is not None:
+                conn.sock.settimeout(conn.timeout)
+            try:
+                if not reused and TRACER.enabled:
+                    self._connect(conn, key)
+                with TRACER.span("send", bytes_up=len(body) if isinstance(body, bytes)
+                                 else headers.get("Content-Length")):
+                    conn.request(method, path, body=body() if callable(body) else body,
+                                 headers=headers)
+                with TRACER.span("ttfb"):
+                    resp = conn.getresponse()
+            except (http.client.RemoteDisconnected, ConnectionResetError,
+                    BrokenPipeError, http.client.BadStatusLine) as e:
+                conn.close()
+                if reused and attempt == 0:
+                    with self._lock:
+                        self.stale_retries += 1
+                    continue
+                raise urllib.error.URLError(e)
+            except (OSError, http.client.HTTPException) as e:
+                conn.close()
+                raise urllib.error.URLError(e)
+            return PooledResponse(self, key, conn, resp, url)
+
+    def _connect(self, conn, key):
+        """Open conn's socket in separately traced steps: DNS, TCP connect, TLS."""
+        scheme, host, port = key
+        with TRACER.span("dns", host=host):
+            addresses = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        sock = None
+        error = OSError(f"no address for {host}")
+        with TRACER.span("connect", host=host):
+            for family, kind, proto, _, address in addresses:
+                sock = socket.socket(family, kind, proto)
+                try:
+                    sock.settimeout(conn.timeout)
+                    sock.connect(address)
+                    break
+                except OSError as e:
+                    sock.close()
+                    sock, error = None, e
+            if sock is None:
+                raise error
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        if scheme == "https":
+            with TRACER.span("tls", host=host):
+                sock = self.ssl_context.wrap_socket(sock, server_hostname=host)
+        conn.sock = sock
+
+    def stats(self):
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "handshakes": self.handshakes,
+                "reused": self.reused,
+                "reuse_ratio": self.reused / self.requests if self.requests else 0.0,
+                "stale_retries": self.stale_retries,
+                "evicted": self.evicted,
+            }
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for conns in idle.values():
+            for conn, _ in conns:
+                conn.close()
+
+
+POOL = ConnectionPool()
+
+# Shared on-disk state (rate limiter, ...) for every CineClaw process on this host
+STATE_DIR = Path(os.environ.get("CINECLAW_HOME") or Path.home() / ".cineclaw")
+
+# Token buckets as {key: {"per_minute": N, "burst": N}}. Keys are "endpoint:model",
+# "endpoint" or "*"; a request uses the most specific key configured, and all
+# requests without their own entry share the "*" budget. Each API key has its
+# own set of buckets. Override with a JSON object in CINECLAW_RATE_LIMITS, or
+# set it to "off" to disable limiting.
+RATE_LIMITS = {"*": {"per_minute": 100, "burst": 10}}
+
+
+class RateLimiter:
+    """Token-bucket limiter whose buckets live in SQLite, so every process on
+    the host draws from the same budget.
+
+    The bucket learns from 429s: each one halves its refill rate and empties
+    it until Retry-After has passed; every success then recovers a twentieth
+    of the configured rate.
+    """
+
+    def __init__(self, path, limits=None):
+        self.path = Path(path)
+        self.limits = limits or RATE_LIMITS
+        self._local = threading.local()
+
+    def _db(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS buckets ("
+                " key TEXT PRIMARY KEY, tokens REAL, rate REAL, updated REAL,"
+                " blocked_until REAL)"
+            )
+            self._local.db = db
+        return db
+
+    def bucket(self, key):
+        """Row for key: "[api key id/]" plus its most specific configured limit."""
+        owner, _, key = key.rpartition("/")
+        if key not in self.limits:
+            endpoint = key.split(":", 1)[0]
+            key = endpoint if endpoint in self.limits else "*"
+        return f"{owner}/{key}" if owner else key
+
+    def _config(self, bucket):
+        bucket = bucket.rpartition("/")[2]
+        conf = self.limits.get(bucket) or self.limits.get("*") or {"per_minute": 100, "burst": 10}
+        return conf["per_minute"] / 60.0, float(conf["burst"])
+
+    def _update(self, key, change):
+        """Run change(row, now, max_rate, burst) inside a write transaction.
+
+        row is [tokens, rate, updated, blocked_until] after refilling; the
+        callback mutates it and returns a value passed back to the caller.
+        """
+        bucket = self.bucket(key)
+        max_rate, burst = self._config(bucket)
+        db = self._db()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            now = time.time()
+            found = db.execute(
+                "SELECT tokens, rate, updated, blocked_until FROM buckets WHERE key = ?",
+                (bucket,)).fetchone()
+            if found:
+                tokens, rate, updated, blocked_until = found
+                tokens = min(burst, tokens + max(0.0, now - updated) * rate)
+            else:
+                tokens, rate, blocked_until = burst, max_rate, 0.0
+            row = [tokens, rate, now, blocked_until]
+            result = change(row, now, max_rate, burst)
+            db.execute(
+                "INSERT OR REPLACE INTO buckets (key, tokens, rate, updated, blocked_until)"
+                " VALUES (?, ?, ?, ?, ?)", (bucket, *row))
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        return result
+
+    def acquire(self, key, timeout=None):
+        """Block until a token for key is available. Returns seconds waited."""
+        def take(row, now, max_rate, burst):
+            if now < row[3]:
+                return row[3] - now
+            if row[0] >= 1:
+                row[0] -= 1
+                return 0.0
+            return (1 - row[0]) / max(row[1], 1e-6)
+
+        waited = 0.0
+        while True:
+            wait = self._update(key, take)
+            if wait <= 0:
+                return waited
+            if timeout is not None and waited + wait > timeout:
+                raise TimeoutError(f"rate limiter: no token for {key} within {timeout}s")
+            # Small jitter so processes woken together don't collide again
+            wait += random.uniform(0, 0.05)
+            time.sleep(wait)
+            waited += wait
+
+    def penalize(self, key, retry_after=None):
+        """Record a 429: halve the refill rate and block until Retry-After."""
+        def slow_down(row, now, max_rate, burst):
+            row[0] = 0.0
+            row[1] = max(max_rate / 32, row[1] / 2)
+            row[3] = max(row[3], now + (retry_after or 0))
+        self._update(key, slow_down)
+
+    def reward(self, key):
+        """Record a success: creep the refill rate back toward the configured one."""
+        def recover(row, now, max_rate, burst):
+            row[1] = min(max_rate, row[1] + max_rate / 20)
+        self._update(key, recover)
+
+
+def load_rate_limiter():
+    """Build the host-wide limiter, or None if limiting is disabled."""
+    raw = os.environ.get("CINECLAW_RATE_LIMITS", "")
+    if raw.strip().lower() == "off":
+        return None
+    limits = dict(RATE_LIMITS)
+    if raw:
+        try:
+            limits.update(json.loads(raw))
+        except json.JSONDecodeError as e:
+            print(f"WARNING: Ignoring invalid CINECLAW_RATE_LIMITS: {e}", file=sys.stderr)
+    return RateLimiter(STATE_DIR / "ratelimit.sqlite3", limits)
+
+
+def rate_limit_key(endpoint, model=None, api_key=None):
+    """Limiter key for an API endpoint, e.g. "key-1a2b3c4d/text-to-video:ltx-2-pro"."""
+    name = endpoint.rstrip("/").rsplit("/", 1)[-1]
+    name = f"{name}:{model}" if model else name
+    return f"{key_id(api_key)}/{name}" if api_key else name
+
+
+# Retries allowed per error class before giving up
+RETRY_BUDGETS = {"rate_limit": 5, "server": 3, "connect": 3, "network": 2}
+
+
+class CircuitOpenError(urllib.error.URLError):
+    """Raised without touching the network while a host's breaker is open."""
+
+
+class CircuitBreaker:
+    """Fail fast while a host keeps answering 502/503 or can't be reached.
+
+    After failure_threshold consecutive failures the breaker opens for
+    cooldown seconds. Once that passes a single probe request is let through;
+    success closes the breaker, failure opens it again.
+    """
+
+    def __init__(self, failure_threshold=3, cooldown=30.0):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._state = {}
+        self._lock = threading.Lock()
+
+    def before(self, url):
+        host = urllib.parse.urlsplit(url).netloc
+        with self._lock:
+            state = self._state.get(host)
+            if not state or state["opened_at"] is None:
+                return
+            remaining = state["opened_at"] + self.cooldown - time.monotonic()
+            if remaining > 0 or state["probing"]:
+                raise CircuitOpenError(
+                    f"circuit open for {host} after repeated failures "
+                    f"(retry in {max(remaining, 0):.0f}s)")
+            state["probing"] = True
+
+    def record(self, url, ok):
+        host = urllib.parse.urlsplit(url).netloc
+        with self._lock:
+            state = self._state.setdefault(
+                host, {"failures": 0, "opened_at": None, "probing": False})
+            state["probing"] = False
+            if ok:
+                state["failures"] = 0
+                state["opened_at"] = None
+                return
+            state["failures"] += 1
+            if state["failures"] >= self.failure_threshold:
+                state["opened_at"] = time.monotonic()
+
+
+def retry_after_seconds(headers):
+    """Parse a Retry-After header given as seconds or an HTTP date."""
+    value = headers.get("Retry-After") if headers else None
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+class RetryPolicy:
+    """Retry transient API failures with jittered exponential backoff.
+
+    Each error class draws on its own budget (RETRY_BUDGETS). Only requests
+    that are safe to repeat are retried: 429 and 502/503 mean the
+    generation was not started, and a refused connection never reached the
+    server, so those are retried for any method. 500s, 504s and dropped
+    connections may have started a paid generation, so they are retried only
+    for idempotent requests such as status polls.
+    """
+
+    def __init__(self, budgets=None, base_delay=1.0, max_delay=60.0, breaker=None,
+                 limiter=None):
+        self.budgets = dict(RETRY_BUDGETS, **(budgets or {}))
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.breaker = breaker or CircuitBreaker()
+        self.limiter = limiter
+        # Callables notified as listener(error_class, exc) on every failed attempt
+        self.listeners = []
+
+    def classify(self, exc, idempotent):
+        if isinstance(exc, CircuitOpenError):
+            return None
+        if isinstance(exc, urllib.error.HTTPError):
+            if exc.code == 429:
+                return "rate_limit"
+            if exc.code in (502, 503):
+                return "server"
+            if exc.code in (500, 504) and idempotent:
+                return "server"
+            return None
+        reason = getattr(exc, "reason", exc)
+        if isinstance(reason, (ConnectionRefusedError, socket.gaierror)):
+            return "connect"
+        return "network" if idempotent else None
+
+    def _limit(self, action, key, *args):
+        """Call a limiter method, disabling the limiter if its store is unusable."""
+        if self.limiter is None or key is None:
+            return 0.0
+        try:
+            return getattr(self.limiter, action)(key, *args) or 0.0
+        except (OSError, sqlite3.Error) as e:
+            print(f"WARNING: Rate limiter disabled ({self.limiter.path}: {e})", file=sys.stderr)
+            self.limiter = None
+            return 0.0
+
+    def backoff(self, retries):
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** retries))
+
+    def request(self, method, url, body=None, headers=None, timeout=None,
+                idempotent=None, pool=POOL, rate_key=None):
+        """POOL.request() with retries. Raises the last error once the
+        budget for its class is spent.
+
+        With a rate_key, every attempt first takes a token from the shared
+        rate limiter, and 429s/successes are fed back to it.
+        """
+        if idempotent is None:
+            idempotent = method in ("GET", "HEAD", "OPTIONS", "PUT", "DELETE")
+        used = {}
+        attempt = 0
+        while True:
+            attempt += 1
+            self.breaker.before(url)
+            with TRACER.span("rate_limit"):
+                waited = self._limit("acquire", rate_key)
+            if waited >= 1:
+                print(f"  Rate limiter: waited {waited:.1f}s for {rate_key}", file=sys.stderr)
+            try:
+                resp = pool.request(method, url, body=body, headers=headers, timeout=timeout)
+            except urllib.error.URLError as e:
+                if isinstance(e, urllib.error.HTTPError):
+                    self.breaker.record(url, e.code not in (502, 503))
+                    what = f"HTTP {e.code}"
+                    wait = retry_after_seconds(e.headers)
+                    if e.code == 429:
+                        self._limit("penalize", rate_key, wait)
+                else:
+                    self.breaker.record(url, False)
+                    what = f"{getattr(e, 'reason', e)}"
+                    wait = None
+                error_class = self.classify(e, idempotent)
+                for listener in list(self.listeners):
+                    listener(error_class, e)
+                if error_class is None or used.get(error_class, 0) >= self.budgets.get(error_class, 0):
+                    raise
+                used[error_class] = used.get(error_class, 0) + 1
+                if wait is None:
+                    wait = self.backoff(used[error_class])
+                wait = min(wait, self.max_delay)
+                print(f"  Attempt {attempt} failed ({what}); retry "
+                      f"{used[error_class]}/{self.budgets[error_class]} for {error_class} "
+                      f"in {wait:.1f}s", file=sys.stderr)
+                with TRACER.span("backoff", error_class=error_class, attempt=attempt):
+                    time.sleep(wait)
+                continue
+            self.breaker.record(url, True)
+            self._limit("reward", rate_key)
+            return resp
+
+
+RETRY = RetryPolicy(limiter=load_rate_limiter())
+
+# Seconds a key sits out after the API refuses it: invalid, payment required,
+# no credits, rate limited (a 429's Retry-After wins when longer)
+KEY_COOLDOWNS = {401: 3600.0, 402: 900.0, 403: 900.0, 429: 30.0}
+
+# Longest acquire() waits for a cooling key before giving up
+KEY_WAIT_MAX = 60.0
+
+
+def key_id(api_key):
+    """Short, stable name for an API key that is safe to log and store."""
+    return "key-" + hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:8]
+
+
+class KeyPool:
+    """API keys sharing one process's jobs, each with its own health.
+
+    acquire() hands out the usable key with the fewest jobs in flight (ties
+    go to the one used least). A key the API refuses with 401, 402, 403 or
+    429 sits out for KEY_COOLDOWNS[status]; if every key is sitting out,
+    acquire() waits for the first to come back, up to KEY_WAIT_MAX seconds.
+    Rate-limiter buckets are already per key (see rate_limit_key()).
+    """
+
+    def __init__(self, keys, labels=None):
+        self._keys = {}
+        for position, api_key in enumerate(keys):
+            if api_key and api_key not in self._keys:
+                label = labels[position] if labels else f"key {position + 1}"
+                self._keys[api_key] = {
+                    "label": label, "id": key_id(api_key), "in_flight": 0, "jobs": 0,
+                    "ok": 0, "failed": 0, "cost": 0.0, "until": 0.0, "state": "ok",
+                    "error": None,
+                }
+        self._cond = threading.Condition()
+
+    def __len__(self):
+        return len(self._keys)
+
+    @property
+    def keys(self):
+        return list(self._keys)
+
+    def label(self, api_key):
+        entry = self._keys.get(api_key)
+        return f"{entry['label']} ({entry['id']})" if entry else key_id(api_key)
+
+    def get(self, wanted_id):
+        """The key whose key_id() is wanted_id, or None."""
+        return next((k for k, entry in self._keys.items() if entry["id"] == wanted_id), None)
+
+    def available(self, exclude=()):
+        """Whether any key outside exclude could be handed out (now or soon)."""
+        now = time.monotonic()
+        return any(k not in exclude and entry["until"] - now <= KEY_WAIT_MAX
+                   for k, entry in self._keys.items())
+
+    def acquire(self, exclude=()):
+        """Take the least-loaded usable key; release() it when the job ends."""
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                usable = [(entry["in_flight"], entry["jobs"], k)
+                          for k, entry in self._keys.items()
+                          if k not in exclude and entry["until"] <= now]
+                if usable:
+                    api_key = min(usable)[2]
+                    entry = self._keys[api_key]
+                    entry["in_flight"] += 1
+                    entry["state"] = "ok"
+                    return api_key
+                waits = [entry["until"] - now for k, entry in self._keys.items()
+                         if k not in exclude]
+                if not waits or min(waits) > KEY_WAIT_MAX:
+                    states = "; ".join(f"{entry['label']}: {entry['state']}"
+                                       for entry in self._keys.values())
+                    raise LTXError(f"No usable API key ({states or 'none configured'})")
+                self._cond.wait(min(waits))
+
+    def release(self, api_key, error=None, cost=None):
+        """Return a key, putting it in cooldown if error shows the API refused it."""
+        with self._cond:
+            entry = self._keys.get(api_key)
+            if entry is None:
+                return
+            entry["in_flight"] -= 1
+            entry["jobs"] += 1
+            if error is None:
+                entry["ok"] += 1
+                entry["cost"] += cost or 0.0
+            else:
+                entry["failed"] += 1
+                status = getattr(error, "status", None)
+                if status in KEY_COOLDOWNS:
+                    pause = max(KEY_COOLDOWNS[status], getattr(error, "retry_after", 0) or 0)
+                    entry["until"] = time.monotonic() + pause
+                    entry["state"] = {401: "invalid", 402: "payment required",
+                                      403: "no credits", 429: "rate limited"}[status]
+                    entry["error"] = str(error)
+                    print(f"WARNING: {self.label(api_key)} {entry['state']}; "
+                          f"resting it for {pause:.0f}s", file=sys.stderr)
+            self._cond.notify_all()
+
+    def report(self):
+        """Per-key usage and health, as a list of dicts."""
+        with self._cond:
+            now = time.monotonic()
+            return [{"label": entry["label"], "id": entry["id"],
+                     "state": entry["state"] if entry["until"] > now else "ok",
+                     "cooldown": max(0.0, entry["until"] - now),
+                     **{name: entry[name] for name in ("in_flight", "jobs", "ok", "failed",
+                                                       "cost", "error")}}
+                    for entry in self._keys.values()]
+
+
+def load_keys(environ=None):
+    """The KeyPool configured in the environment (possibly empty).
+
+    Keys are read from the file named by LTX_API_KEYS_FILE (one per line,
+    # comments allowed), LTX_API_KEYS (comma- or space-separated),
+    LTX_API_KEY_1, LTX_API_KEY_2, ... and LTX_API_KEY, in that order.
+    """
+    environ = os.environ if environ is None else environ
+    keys, labels = [], []
+    path = environ.get("LTX_API_KEYS_FILE")
+    if path:
+        try:
+            with open(os.path.expanduser(path), encoding="utf-8") as lines:
+                for line_no, line in enumerate(lines, 1):
+                    line = line.split("#", 1)[0].strip()
+                    if line:
+                        keys.append(line)
+                        labels.append(f"{os.path.basename(path)}:{line_no}")
+        except OSError as e:
+            raise LTXError(f"Can't read LTX_API_KEYS_FILE: {e}") from e
+    for position, api_key in enumerate(environ.get("LTX_API_KEYS", "").replace(",", " ").split()):
+        keys.append(api_key)
+        labels.append(f"LTX_API_KEYS[{position + 1}]")
+    numbered = sorted((int(name.rpartition("_")[2]), name) for name in environ
+                      if name.startswith("LTX_API_KEY_") and name.rpartition("_")[2].isdigit())
+    for _, name in numbered:
+        keys.append(environ[name].strip())
+        labels.append(name)
+    if environ.get("LTX_API_KEY", "").strip():
+        keys.append(environ["LTX_API_KEY"].strip())
+        labels.append("LTX_API_KEY")
+    return KeyPool(keys, labels)
+
+# Result cache quotas; override with CINECLAW_CACHE_MAX_GB / CINECLAW_CACHE_MAX_DAYS
+CACHE_MAX_BYTES = int(float(os.environ.get("CINECLAW_CACHE_MAX_GB", "10")) * 1024 ** 3)
+
+CACHE_MAX_AGE = float(os.environ.get("CINECLAW_CACHE_MAX_DAYS", "30")) * 86400
+
+# Bump to invalidate every cached result when the key format changes
+CACHE_VERSION = 1
+
+
+def cache_key(endpoint, payload):
+    """Content address of a generation request.
+
+    Prompt whitespace is collapsed and resolution aliases resolved, so
+    requests that would produce the same video hash the same.
+    """
+    canonical = dict(payload)
+    if "prompt" in canonical:
+        canonical["prompt"] = " ".join(str(canonical["prompt"]).split())
+    if "resolution" in canonical:
+        res = str(canonical["resolution"]).lower().strip()
+        canonical["resolution"] = RESOLUTIONS.get(res, res)
+    canonical["_endpoint"] = endpoint.rstrip("/").rsplit("/", 1)[-1]
+    canonical["_v"] = CACHE_VERSION
+    blob = json.dumps(canonical, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def link_or_copy(src, dst):
+    """Hardlink src to dst (atomically replacing dst), copying across filesystems."""
+    dst = str(dst)
+    tmp = f"{dst}.{secrets.token_hex(4)}.tmp"
+    try:
+        os.link(src, tmp)
+    except OSError:
+        shutil.copyfile(src, tmp)
+    os.replace(tmp, dst)
+
+
+class ResultCache:
+    """On-disk cache of generated videos keyed by cache_key().
+
+    Videos live under objects/ and an SQLite index tracks size and last use,
+    so the cache survives restarts and is shared between processes. Entries
+    past max_age are dropped and the least recently used are evicted once
+    the cache exceeds max_bytes.
+    """
+
+    def __init__(self, root, max_bytes=CACHE_MAX_BYTES, max_age=CACHE_MAX_AGE):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._local = threading.local()
+
+    def _db(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            (self.root / "objects").mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(self.root / "index.sqlite3", timeout=30, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " key TEXT PRIMARY KEY, path TEXT, bytes INTEGER, sha256 TEXT,"
+                " request_id TEXT, created REAL, last_used REAL, meta TEXT)"
+            )
+            self._local.db = db
+        return db
+
+    def get(self, key, output_path):
+        """Materialise a cached video at output_path. Returns the index row as a
+        dict, or None on a miss."""
+        db = self._db()
+        row = db.execute(
+            "SELECT path, bytes, sha256, request_id, created, meta FROM entries WHERE key = ?",
+            (key,)).fetchone()
+        if row is None:
+            return None
+        path, size, sha256, request_id, created, meta = row
+        now = time.time()
+        try:
+            if now - created > self.max_age or os.path.getsize(path) != size:
+                raise FileNotFoundError(path)
+            link_or_copy(path, output_path)
+        except FileNotFoundError:
+            # Expired, or evicted by another process between lookup and link
+            self._drop(key, path)
+            return None
+        db.execute("UPDATE entries SET last_used = ? WHERE key = ?", (now, key))
+        return {"path": str(output_path), "bytes": size, "sha256": sha256,
+                "request_id": request_id, "meta": json.loads(meta or "{}")}
+
+    def put(self, key, video_path, sha256=None, request_id=None, meta=None):
+        """Add a finished video to the cache and enforce the quotas."""
+        obj = self.root / "objects" / key[:2] / f"{key}.mp4"
+        obj.parent.mkdir(parents=True, exist_ok=True)
+        link_or_copy(video_path, obj)
+        now = time.time()
+        self._db().execute(
+            "INSERT OR REPLACE INTO entries"
+            " (key, path, bytes, sha256, request_id, created, last_used, meta)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (key, str(obj), obj.stat().st_size, sha256, request_id, now, now,
+             json.dumps(meta or {})))
+        self.evict()
+
+    def contains(self, key):
+        """Whether key has a live entry, without touching it."""
+        row = self._db().execute("SELECT created FROM entries WHERE key = ?",
+                                 (key,)).fetchone()
+        return row is not None and time.time() - row[0] <= self.max_age
+
+    def evict(self):
+        db = self._db()
+        cutoff = time.time() - self.max_age
+        for key, path in db.execute(
+                "SELECT key, path FROM entries WHERE created < ?", (cutoff,)).fetchall():
+            self._drop(key, path)
+        total = db.execute("SELECT COALESCE(SUM(bytes), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, path, size in db.execute(
+                "SELECT key, path, bytes FROM entries ORDER BY last_used").fetchall():
+            if total <= self.max_bytes:
+                break
+            self._drop(key, path)
+            total -= size
+
+    def _drop(self, key, path):
+        self._db().execute("DELETE FROM entries WHERE key = ?", (key,))
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+
+CACHE = ResultCache(STATE_DIR / "cache")
+
+
+class SingleFlight:
+    """Coalesce identical in-flight generations across threads and processes.
+
+    The first caller for a key becomes the leader and makes the API call;
+    later callers wait on its row in a shared SQLite table and receive the
+    same result. The leader heartbeats while it works, so if it crashes the
+    heartbeat goes stale and one waiter takes over. A finished flight's
+    result or error only goes to callers that were already waiting on it;
+    a caller arriving after it finished leads a fresh request (the result
+    cache, not coalescing, decides whether an earlier video may be reused).
+    Finished rows are kept for linger seconds so slow waiters still see them.
+    """
+
+    def __init__(self, path, lease=15.0, linger=30.0, poll_interval=0.25):
+        self.path = Path(path)
+        self.lease = lease
+        self.linger = linger
+        self.poll_interval = poll_interval
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._local = threading.local()
+        self._beats = {}
+
+    def _db(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS flights ("
+                " key TEXT PRIMARY KEY, owner TEXT, heartbeat REAL, status TEXT,"
+                " result TEXT, finished REAL)"
+            )
+            self._local.db = db
+        return db
+
+    def _claim(self, key, waiting_since=None):
+        """Become leader for key if nobody live holds it. Returns (leader, row).
+
+        A finished flight only counts for a caller that has been waiting
+        since before it finished (waiting_since); anyone else replaces it.
+        """
+        db = self._db()
+        owner = f"{self.owner}:{threading.get_ident()}"
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            now = time.time()
+            db.execute("DELETE FROM flights WHERE status != 'running' AND finished < ?",
+                       (now - self.linger,))
+            row = db.execute("SELECT owner, heartbeat, status, result, finished FROM flights"
+                             " WHERE key = ?", (key,)).fetchone()
+            live = row and (
+                (row[2] in ("done", "failed") and waiting_since is not None
+                 and row[4] >= waiting_since)
+                or (row[2] == "running" and now - row[1] < self.lease))
+            if live:
+                db.execute("COMMIT")
+                return False, row
+            db.execute(
+                "INSERT OR REPLACE INTO flights (key, owner, heartbeat, status, result, finished)"
+                " VALUES (?, ?, ?, 'running', NULL, NULL)", (key, owner, now))
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        if row and row[2] == "running":
+            print(f"  Previous leader {row[0]} stopped responding — taking over.",
+                  file=sys.stderr)
+        stop = threading.Event()
+        self._beats[key] = (stop, owner)
+        threading.Thread(target=self._heartbeat, args=(key, owner, stop), daemon=True).start()
+        return True, None
+
+    def _heartbeat(self, key, owner, stop):
+        # Never wait on a lock for long: a missed beat is retried next round,
+        # but one blocked past the lease would hand the flight to a waiter
+        db = sqlite3.connect(self.path, timeout=self.lease / 10, isolation_level=None)
+        try:
+            while not stop.wait(self.lease / 3):
+                try:
+                    db.execute("UPDATE flights SET heartbeat = ? WHERE key = ? AND owner = ?",
+                               (time.time(), key, owner))
+                except sqlite3.Error:
+                    continue
+        finally:
+            db.close()
+
+    def join(self, key):
+        """Return None if the caller should make the request itself, or the
+        leader's result dict once the identical request it waited on finishes.
+
+        Raises RuntimeError if that leader failed.
+        """
+        started = time.time()
+        announced = False
+        while True:
+            leader, row = self._claim(key, started if announced else None)
+            if leader:
+                return None
+            owner, _, status, result, _ = row
+            if status == "failed":
+                raise RuntimeError(json.loads(result)["error"])
+            if status == "done":
+                result = json.loads(result)
+                if os.path.exists(result.get("output_path", "")):
+                    return result
+                # Leader's file is gone — nothing to share; start fresh
+                self._db().execute("DELETE FROM flights WHERE key = ? AND status = 'done'",
+                                   (key,))
+                continue
+            if not announced:
+                print(f"  Identical request already running ({owner}) — waiting for it...",
+                      file=sys.stderr)
+                announced = True
+            time.sleep(self.poll_interval)
+
+    def finish(self, key, result=None, error=None):
+        """Publish the leader's outcome to waiters."""
+        beat = self._beats.pop(key, None)
+        if beat is None:
+            return
+        stop, owner = beat
+        stop.set()
+        status, payload = "done", dict(result or {})
+        if error or not result:
+            status, payload = "failed", {"error": error or "leader request failed"}
+        self._db().execute(
+            "UPDATE flights SET status = ?, result = ?, finished = ?"
+            " WHERE key = ? AND owner = ?",
+            (status, json.dumps(payload), time.time(), key, owner))
+
+
+FLIGHTS = SingleFlight(STATE_DIR / "flights.sqlite3")
+
+
+class JobJournal:
+    """Write-ahead journal of generation jobs (SQLite in WAL mode).
+
+    Every step of a job — submitted, accepted (with the generation id),
+    completed (with the video URL), downloaded (with the output path) or
+    failed — is committed before the next one starts, so a paid generation
+    is never orphaned by a crash or Ctrl-C. Rows record the process that owns
+    them; resume only picks up jobs whose owner is gone. If the journal
+    can't be written the job still runs, just without crash recovery.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self.disabled = False
+        self._active = set()
+        self._local = threading.local()
+
+    def _db(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            # Durable across process crashes without an fsync per write, which
+            # keeps thousands of transitions a minute cheap
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " job_id TEXT PRIMARY KEY, state TEXT, mode TEXT, endpoint TEXT,"
+                " request TEXT, gen_id TEXT, video_url TEXT, output_path TEXT,"
+                " cost REAL, error TEXT, owner TEXT, created REAL, updated REAL,"
+                " key_id TEXT)"
+            )
+            add_column(db, "jobs", "key_id TEXT")
+            db.execute("CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state)")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS events ("
+                " job_id TEXT, state TEXT, at REAL, detail TEXT)"
+            )
+            self._local.db = db
+        return db
+
+    def _write(self, statements):
+        if self.disabled:
+            return False
+        try:
+            db = self._db()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                for sql, params in statements:
+                    db.execute(sql, params)
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+            db.execute("COMMIT")
+            return True
+        except (OSError, sqlite3.Error) as e:
+            print(f"WARNING: Job journal unavailable, resume disabled: {e}", file=sys.stderr)
+            self.disabled = True
+            return False
+
+    def _transition(self, job_id, state, detail=None, **fields):
+        if job_id is None:
+            return
+        now = time.time()
+        columns = "".join(f", {name} = ?" for name in fields)
+        self._write([
+            (f"UPDATE jobs SET state = ?, updated = ?{columns} WHERE job_id = ?",
+             (state, now, *fields.values(), job_id)),
+            ("INSERT INTO events (job_id, state, at, detail) VALUES (?, ?, ?, ?)",
+             (job_id, state, now, detail)),
+        ])
+        if state in ("downloaded", "failed"):
+            self._active.discard(job_id)
+
+    def submitted(self, mode, endpoint, data, files, output_path, key=None):
+        """Record a job before its request is sent. Returns the job id (or None).
+
+        key is the key_id() of the API key sending it, which resume must use.
+        """
+        job_id = secrets.token_hex(8)
+        now = time.time()
+        request = json.dumps({"data": data, "files": files or {}})
+        ok = self._write([
+            ("INSERT INTO jobs (job_id, state, mode, endpoint, request, output_path,"
+             " owner, created, updated, key_id) VALUES (?, 'submitted', ?, ?, ?, ?, ?, ?, ?, ?)",
+             (job_id, mode, endpoint, request, output_path, self.owner, now, now, key)),
+            ("INSERT INTO events (job_id, state, at) VALUES (?, 'submitted', ?)",
+             (job_id, now)),
+        ])
+        if not ok:
+            return None
+        self._active.add(job_id)
+        return job_id
+
+    def accepted(self, job_id, gen_id):
+        self._transition(job_id, "accepted", gen_id=gen_id)
+
+    def completed(self, job_id, video_url, cost=None):
+        self._transition(job_id, "completed", video_url=video_url, cost=cost)
+
+    def downloaded(self, job_id, output_path):
+        self._transition(job_id, "downloaded", output_path=output_path)
+
+    def failed(self, job_id, error):
+        self._transition(job_id, "failed", detail=error, error=error)
+
+    def claim(self, job_id):
+        """Take over a job for resuming. False if its owner is still running."""
+        try:
+            db = self._db()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                row = db.execute("SELECT owner, updated FROM jobs WHERE job_id = ?",
+                                 (job_id,)).fetchone()
+                if row is None or (row[0] != self.owner and owner_alive(row[0], row[1])):
+                    return False
+                db.execute("UPDATE jobs SET owner = ?, updated = ? WHERE job_id = ?",
+                           (self.owner, time.time(), job_id))
+            finally:
+                db.execute("COMMIT")
+        except (OSError, sqlite3.Error) as e:
+            print(f"WARNING: Job journal unavailable: {e}", file=sys.stderr)
+            return False
+        self._active.add(job_id)
+        return True
+
+    def unfinished(self, job_ids=None):
+        """Jobs that were neither downloaded nor failed, oldest first."""
+        names = ("job_id", "state", "mode", "endpoint", "request", "gen_id",
+                 "video_url", "output_path", "owner", "created", "updated", "key_id")
+        rows = self._db().execute(
+            f"SELECT {', '.join(names)} FROM jobs"
+            " WHERE state NOT IN ('downloaded', 'failed') ORDER BY created").fetchall()
+        jobs = [dict(zip(names, row)) for row in rows]
+        if job_ids:
+            jobs = [job for job in jobs if job["job_id"] in job_ids]
+        return jobs
+
+    def close(self, reason=None):
+        """Note interrupted jobs, checkpoint the WAL and close.
+
+        Returns the number of jobs recorded as interrupted.
+        """
+        interrupted = 0
+        if reason and self._active and not self.disabled:
+            now = time.time()
+            if self._write([
+                ("INSERT INTO events (job_id, state, at, detail) VALUES (?, 'interrupted', ?, ?)",
+                 (job_id, now, reason))
+                for job_id in sorted(self._active)
+            ]):
+                interrupted = len(self._active)
+        db = getattr(self._local, "db", None)
+        if db is not None:
+            try:
+                db.execute("PRAGMA wal_checkpoint(PASSIVE)")
+            except sqlite3.Error:
+                pass
+            db.close()
+            self._local.db = None
+        return interrupted
+
+
+def add_column(db, table, column):
+    """Add a column to a table created by an older version, if it is missing."""
+    name = column.split()[0]
+    if name not in [row[1] for row in db.execute(f"PRAGMA table_info({table})")]:
+        try:
+            db.execute(f"ALTER TABLE {table} ADD COLUMN {column}")
+        except sqlite3.OperationalError as e:
+            # Another process added it first
+            if "duplicate column" not in str(e):
+                raise
+
+
+def owner_alive(owner, updated, lease=900.0):
+    """Best-effort check whether the process owning a journal row still runs."""
+    host, _, pid = (owner or "").rpartition(":")
+    if host != socket.gethostname() or not pid.isdigit() or os.name == "nt":
+        # Can't signal the process (other host, or Windows where os.kill()
+        # terminates it) — treat the row as owned until its lease runs out
+        return time.time() - (updated or 0) < lease
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+JOURNAL = JobJournal(STATE_DIR / "journal.sqlite3")
+
+# Spending caps in USD as {"daily": N, "projects": {"name": N}}. A job whose
+# estimate would take today's (or its project's) spend past a cap is refused
+# before it is sent. Override with a JSON object in CINECLAW_BUDGETS.
+BUDGETS = {}
+
+# Columns the cost report can group by
+REPORT_GROUPS = ("day", "model", "resolution", "project", "mode", "key_id")
+
+# SQL for what a ledger row counts against a budget
+_CHARGED = ("COALESCE(SUM(CASE WHEN state IN ('reserved', 'settled')"
+            " THEN COALESCE(actual, estimated) END), 0)")
+
+
+class CostLedger:
+    """Estimated and actual cost of every generation, with budget reservations.
+
+    A job reserves its estimated cost before it is sent. The caps are checked
+    inside the same SQLite write transaction that records the reservation,
+    so concurrent workers and processes can never overspend together. When
+    the job ends the reservation is settled with the API's actual cost, or
+    released if the API never accepted it. Reservations left behind by a
+    process that died are settled at their estimate.
+
+    With a cap configured an unusable ledger refuses jobs; without one it
+    only warns and stops recording.
+    """
+
+    def __init__(self, path, budgets=None):
+        self.path = Path(path)
+        self.budgets = BUDGETS if budgets is None else budgets
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self.disabled = False
+        self._local = threading.local()
+
+    def _db(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS charges ("
+                " charge_id TEXT PRIMARY KEY, request_id TEXT, project TEXT, day TEXT,"
+                " mode TEXT, model TEXT, resolution TEXT, duration REAL, estimated REAL,"
+                " actual REAL, state TEXT, owner TEXT, created REAL, updated REAL, key_id TEXT)"
+            )
+            add_column(db, "charges", "key_id TEXT")
+            db.execute("CREATE INDEX IF NOT EXISTS charges_day ON charges (day)")
+            db.execute("CREATE INDEX IF NOT EXISTS charges_project ON charges (project)")
+            db.execute("CREATE INDEX IF NOT EXISTS charges_request ON charges (request_id)")
+            self._local.db = db
+        return db
+
+    def _caps(self, project):
+        caps = []
+        if self.budgets.get("daily") is not None:
+            caps.append(("daily", float(self.budgets["daily"])))
+        limit = (self.budgets.get("projects") or {}).get(project) if project else None
+        if limit is not None:
+            caps.append((f"project '{project}'", float(limit)))
+        return caps
+
+    def reserve(self, estimate, mode, model, resolution, duration, project=None):
+        """Reserve estimate against the caps. Returns a charge id (or None).
+
+        Raises BudgetExceeded if the job doesn't fit.
+        """
+        caps = self._caps(project)
+        if self.disabled and not caps:
+            return None
+        charge_id = secrets.token_hex(8)
+        day = datetime.now().strftime("%Y-%m-%d")
+        try:
+            db = self._db()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                for owner, updated in db.execute(
+                        "SELECT owner, MAX(updated) FROM charges"
+                        " WHERE state = 'reserved' AND owner != ? GROUP BY owner",
+                        (self.owner,)).fetchall():
+                    if not owner_alive(owner, updated):
+                        db.execute("UPDATE charges SET state = 'settled', updated = ?"
+                                   " WHERE owner = ? AND state = 'reserved'", (now, owner))
+                for scope, limit in caps:
+                    if scope == "daily":
+                        where, params = "day = ?", (day,)
+                    else:
+                        where, params = "project = ?", (project,)
+                    spent = db.execute(f"SELECT {_CHARGED} FROM charges WHERE {where}",
+                                       params).fetchone()[0]
+                    if spent + estimate > limit + 1e-9:
+                        raise BudgetExceeded(scope, limit, spent, estimate)
+                db.execute(
+                    "INSERT INTO charges (charge_id, project, day, mode, model, resolution,"
+                    " duration, estimated, state, owner, created, updated)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, 'reserved', ?, ?, ?)",
+                    (charge_id, project, day, mode, model, resolution, duration, estimate,
+                     self.owner, now, now))
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+            db.execute("COMMIT")
+        except (OSError, sqlite3.Error) as e:
+            if caps:
+                raise LTXError(f"Cost ledger unavailable, can't enforce budget: {e}") from e
+            print(f"WARNING: Cost ledger unavailable, spend not recorded: {e}", file=sys.stderr)
+            self.disabled = True
+            return None
+        return charge_id
+
+    def _update(self, sql, params):
+        if self.disabled:
+            return
+        try:
+            self._db().execute(sql, params)
+        except (OSError, sqlite3.Error) as e:
+            print(f"WARNING: Could not update cost ledger: {e}", file=sys.stderr)
+
+    def attach(self, charge_id, request_id, key=None):
+        """Note the API's request id (and the key_id() billed) once the job is accepted."""
+        if charge_id:
+            self._update("UPDATE charges SET request_id = ?, key_id = COALESCE(?, key_id),"
+                         " updated = ? WHERE charge_id = ?",
+                         (request_id, key, time.time(), charge_id))
+
+    def settle(self, charge_id, actual=None, request_id=None):
+        """Close a reservation as billed; without actual the estimate stands."""
+        if charge_id:
+            self._update(
+                "UPDATE charges SET state = 'settled', actual = ?,"
+                " request_id = COALESCE(?, request_id), updated = ? WHERE charge_id = ?",
+                (actual, request_id, time.time(), charge_id))
+
+    def release(self, charge_id):
+        """Drop a reservation for a job the API never billed."""
+        if charge_id:
+            self._update("UPDATE charges SET state = 'released', updated = ?"
+                         " WHERE charge_id = ?", (time.time(), charge_id))
+
+    def record_actual(self, request_id, actual):
+        """Reconcile a job finished later (e.g. by resume) with its actual cost."""
+        if request_id and actual is not None:
+            self._update("UPDATE charges SET state = 'settled', actual = ?, updated = ?"
+                         " WHERE request_id = ? AND state != 'released'",
+                         (actual, time.time(), request_id))
+
+    def report(self, by=("day", "model", "resolution"), since=None, project=None):
+        """Spend grouped by REPORT_GROUPS columns, as a list of dicts.
+
+        Each row has jobs, estimated (what the estimates said), actual (the
+        sum of known actual costs), charged (actual where known, otherwise
+        the estimate) and reserved (still in flight). since is a YYYY-MM-DD
+        day.
+        """
+        unknown = set(by) - set(REPORT_GROUPS)
+        if unknown:
+            raise ValueError(f"can't group by {', '.join(sorted(unknown))} "
+                             f"(use {', '.join(REPORT_GROUPS)})")
+        where, params = ["state != 'released'"], []
+        if since:
+            where.append("day >= ?")
+            params.append(since)
+        if project:
+            where.append("project = ?")
+            params.append(project)
+        columns = ", ".join(by)
+        rows = self._db().execute(
+            f"SELECT {columns}{', ' if by else ''}COUNT(*), COALESCE(SUM(estimated), 0),"
+            f" SUM(actual), {_CHARGED},"
+            f" COALESCE(SUM(CASE WHEN state = 'reserved' THEN estimated END), 0)"
+            f" FROM charges WHERE {' AND '.join(where)}"
+            f"{f' GROUP BY {columns} ORDER BY {columns}' if by else ''}",
+            params).fetchall()
+        names = (*by, "jobs", "estimated", "actual", "charged", "reserved")
+        return [dict(zip(names, row)) for row in rows]
+
+
+def load_budgets():
+    """Spending caps from CINECLAW_BUDGETS, falling back to BUDGETS."""
+    raw = os.environ.get("CINECLAW_BUDGETS", "")
+    budgets = dict(BUDGETS)
+    if raw:
+        try:
+            budgets.update(json.loads(raw))
+        except (json.JSONDecodeError, TypeError, ValueError) as e:
+            print(f"WARNING: Ignoring invalid CINECLAW_BUDGETS: {e}", file=sys.stderr)
+    return budgets
+
+
+LEDGER = CostLedger(STATE_DIR / "ledger.sqlite3", load_budgets())
+
+
+def print_costs(by=("day", "model", "resolution"), since=None, project=None):
+    """Print the cost ledger grouped by columns, then budget headroom.
+
+    Raises LTXError if the ledger can't be read or by names an unknown column.
+    """
+    try:
+        rows = LEDGER.report(by, since, project)
+    except (OSError, sqlite3.Error) as e:
+        raise LTXError(f"Can't read cost ledger {LEDGER.path}: {e}") from e
+    except ValueError as e:
+        raise LTXError(str(e)) from e
+    if not rows or not rows[0]["jobs"]:
+        print("No spend recorded.")
+        return rows
+
+    def money(value):
+        return "—" if value is None else f"${value:.2f}"
+
+    for row in rows:
+        for name in by:
+            row[name] = "—" if row[name] is None else str(row[name])
+    widths = [max(len(name), *(len(row[name]) for row in rows)) for name in by]
+    header = "  ".join(name.ljust(width) for name, width in zip(by, widths))
+    print(f"{header}  {'jobs':>5}  {'estimated':>10}  {'actual':>10}  {'charged':>10}")
+    total = {"jobs": 0, "estimated": 0.0, "charged": 0.0, "reserved": 0.0}
+    for row in rows:
+        cells = "  ".join(row[name].ljust(width) for name, width in zip(by, widths))
+        print(f"{cells}  {row['jobs']:>5}  {money(row['estimated']):>10}  "
+              f"{money(row['actual']):>10}  {money(row['charged']):>10}")
+        for name in total:
+            total[name] += row[name]
+    if len(rows) > 1:
+        label = "TOTAL".ljust(len(header))
+        print(f"{label}  {total['jobs']:>5}  {money(total['estimated']):>10}  "
+              f"{'':>10}  {money(total['charged']):>10}")
+    if total["reserved"]:
+        print(f"In flight: {money(total['reserved'])} reserved")
+
+    today = datetime.now().strftime("%Y-%m-%d")
+    if LEDGER.budgets.get("daily") is not None:
+        spent = LEDGER.report((), today)[0]["charged"]
+        limit = float(LEDGER.budgets["daily"])
+        print(f"Daily budget: {money(spent)} of {money(limit)} used today "
+              f"({money(max(0.0, limit - spent))} left)")
+    for name, limit in sorted((LEDGER.budgets.get("projects") or {}).items()):
+        if project in (None, name):
+            spent = LEDGER.report((), project=name)[0]["charged"]
+            print(f"Project '{name}': {money(spent)} of {money(float(limit))} used")
+    return rows
+
+
+def print_keys(pool):
+    """Print each key's health and use in this process, and its recorded spend."""
+    try:
+        spend = {row["key_id"]: row for row in LEDGER.report(("key_id",))}
+    except (OSError, sqlite3.Error) as e:
+        print(f"WARNING: Can't read cost ledger {LEDGER.path}: {e}", file=sys.stderr)
+        spend = {}
+    rows = pool.report()
+    for row in rows:
+        row["name"] = f"{row['label']} ({row['id']})"
+        if row["cooldown"]:
+            row["state"] += f" {row['cooldown']:.0f}s"
+    width = max(len("key"), *(len(row["name"]) for row in rows))
+    print(f"{'key'.ljust(width)}  {'state':<16}  {'running':>7}  {'jobs':>5}  {'failed':>6}  "
+          f"{'all jobs':>8}  {'charged':>9}")
+    for row in rows:
+        recorded = spend.get(row["id"], {"jobs": 0, "charged": 0.0})
+        print(f"{row['name'].ljust(width)}  {row['state']:<16}  {row['in_flight']:>7}  "
+              f"{row['jobs']:>5}  {row['failed']:>6}  {recorded['jobs']:>8}  "
+              f"${recorded['charged']:>8.2f}")
+
+
+class DraftIndex:
+    """Lineage of draft renders and the finals promoted from them (SQLite).
+
+    A draft row holds the request it was rendered with and the final request
+    it stands in for. promote() queues a final that points back at its
+    draft; claim() hands each queued final to exactly one worker, in any
+    process, and picks up finals whose worker died mid-render.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._local = threading.local()
+
+    def _db(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS renders ("
+                " render_id TEXT PRIMARY KEY, parent_id TEXT, kind TEXT, state TEXT,"
+                " request TEXT, final TEXT, output_path TEXT, request_id TEXT, cost REAL,"
+                " error TEXT, owner TEXT, created REAL, updated REAL)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS renders_parent ON renders (parent_id)")
+            db.execute("CREATE INDEX IF NOT EXISTS renders_state ON renders (state)")
+            self._local.db = db
+        return db
+
+    @staticmethod
+    def _row(row):
+        names = ("render_id", "parent_id", "kind", "state", "request", "final", "output_path",
+                 "request_id", "cost", "error", "owner", "created", "updated")
+        render = dict(zip(names, row))
+        for name in ("request", "final"):
+            if render[name]:
+                render[name] = GenerationRequest(**json.loads(render[name]))
+        return render
+
+    def add_draft(self, draft, final, output_path, request_id=None, cost=None):
+        """Record a finished draft render. Returns its id."""
+        render_id = secrets.token_hex(4)
+        now = time.time()
+        self._db().execute(
+            "INSERT INTO renders (render_id, kind, state, request, final, output_path,"
+            " request_id, cost, owner, created, updated)"
+            " VALUES (?, 'draft', 'done', ?, ?, ?, ?, ?, ?, ?, ?)",
+            (render_id, json.dumps(asdict(draft)), json.dumps(asdict(final)), output_path,
+             request_id, cost, self.owner, now, now))
+        return render_id
+
+    def get(self, render_id):
+        """A render by id or unique id prefix, or None."""
+        if not render_id or any(c not in "0123456789abcdef" for c in render_id):
+            return None
+        rows = self._db().execute(
+            "SELECT * FROM renders WHERE render_id LIKE ? ORDER BY created",
+            (f"{render_id}%",)).fetchall()
+        return self._row(rows[0]) if len(rows) == 1 else None
+
+    def promote(self, draft_id, **overrides):
+        """Queue the final render of a draft. Returns (final id, queued).
+
+        overrides (model, resolution, fps, duration) replace fields of the
+        final request recorded with the draft; the prompt and seed never
+        change. queued is False when an identical final is already queued,
+        running or done. Raises KeyError for an unknown draft and
+        InvalidRequestError for an unsupported final configuration.
+        """
+        draft = self.get(draft_id)
+        if draft is None or draft["kind"] != "draft":
+            raise KeyError(draft_id)
+        final = replace(draft["final"], **{k: v for k, v in overrides.items() if v is not None})
+        check_request(final)
+        request = json.dumps(asdict(final))
+        db = self._db()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            found = db.execute(
+                "SELECT render_id FROM renders WHERE parent_id = ? AND request = ?"
+                " AND state != 'failed'", (draft["render_id"], request)).fetchone()
+            if found:
+                db.execute("COMMIT")
+                return found[0], False
+            render_id = secrets.token_hex(4)
+            now = time.time()
+            db.execute(
+                "INSERT INTO renders (render_id, parent_id, kind, state, request, created,"
+                " updated) VALUES (?, ?, 'final', 'queued', ?, ?, ?)",
+                (render_id, draft["render_id"], request, now, now))
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("COMMIT")
+        return render_id, True
+
+    def claim(self):
+        """Take the oldest queued final for this process, or None."""
+        db = self._db()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            for row in db.execute(
+                    "SELECT * FROM renders WHERE kind = 'final' AND state IN ('queued', 'running')"
+                    " ORDER BY created").fetchall():
+                render = self._row(row)
+                if render["state"] == "running" and owner_alive(render["owner"],
+                                                                render["updated"]):
+                    continue
+                db.execute("UPDATE renders SET state = 'running', owner = ?, updated = ?"
+                           " WHERE render_id = ?", (self.owner, time.time(), render["render_id"]))
+                db.execute("COMMIT")
+                return render
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("COMMIT")
+        return None
+
+    def finish(self, render_id, output_path, request_id=None, cost=None):
+        self._db().execute(
+            "UPDATE renders SET state = 'done', output_path = ?, request_id = ?, cost = ?,"
+            " error = NULL, updated = ? WHERE render_id = ?",
+            (output_path, request_id, cost, time.time(), render_id))
+
+    def fail(self, render_id, error):
+        self._db().execute("UPDATE renders SET state = 'failed', error = ?, updated = ?"
+                           " WHERE render_id = ?", (error, time.time(), render_id))
+
+    def lineage(self, limit=20):
+        """The newest drafts, each with a "finals" list of its promotions."""
+        db = self._db()
+        drafts = [self._row(row) for row in db.execute(
+            "SELECT * FROM renders WHERE kind = 'draft' ORDER BY created DESC LIMIT ?",
+            (limit,)).fetchall()]
+        for draft in drafts:
+            draft["finals"] = [self._row(row) for row in db.execute(
+                "SELECT * FROM renders WHERE parent_id = ? ORDER BY created",
+                (draft["render_id"],)).fetchall()]
+        return drafts
+
+
+DRAFTS = DraftIndex(STATE_DIR / "drafts.sqlite3")
+
+
+def unique_output_path(output_dir, mode, model):
+    """Build an output filename that can't collide with a concurrent job."""
+    timestamp = datetime.now().strftime("%Y-%m-%d-%H%M%S-%f")
+    filename = f"output-{mode}-{model}-{timestamp}-{secrets.token_hex(3)}.mp4"
+    return os.path.join(output_dir, filename)
+
+
+def check_mp4(path):
+    """Walk the top-level MP4 boxes of path.
+
+    Returns None if the file looks complete, otherwise a short reason.
+    A truncated download shows up as a box running past end of file.
+    """
+    file_size = os.path.getsize(path)
+    seen = set()
+    offset = 0
+    with open(path, "rb") as f:
+        while offset < file_size:
+            f.seek(offset)
+            header = f.read(8)
+            if len(header) < 8:
+                return f"truncated box header at byte {offset}"
+            size, box_type = struct.unpack(">I4s", header)
+            if size == 1:
+                large = f.read(8)
+                if len(large) < 8:
+                    return f"truncated box header at byte {offset}"
+                size = struct.unpack(">Q", large)[0]
+                min_size = 16
+            elif size == 0:
+                size = file_size - offset
+                min_size = 8
+            else:
+                min_size = 8
+            if size < min_size:
+                return f"invalid box size {size} at byte {offset}"
+            if offset + size > file_size:
+                return (f"'{box_type.decode('latin-1')}' box needs {offset + size} bytes, "
+                        f"file has {file_size}")
+            seen.add(box_type)
+            offset += size
+    missing = [name for name in ("ftyp", "moov", "mdat") if name.encode() not in seen]
+    if missing:
+        return f"missing {', '.join(missing)} box"
+    return None
+
+
+def copy_stream(resp, f, digest, chunk_size=CHUNK_SIZE):
+    """Copy resp into f in fixed-size chunks. Returns the byte count."""
+    buf = bytearray(chunk_size)
+    view = memoryview(buf)
+    total = 0
+    while True:
+        n = resp.readinto(buf)
+        if not n:
+            break
+        f.write(view[:n])
+        digest.update(view[:n])
+        total += n
+    return total
+
+
+def hash_file(path, chunk_size=CHUNK_SIZE):
+    """SHA-256 of an existing file, used to seed the digest when resuming."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest
+
+
+def save_video(resp, out_file, max_attempts=DOWNLOAD_ATTEMPTS, emit=None):
+    """Stream a video response to out_file, resuming if the connection drops.
+
+    Bytes land in out_file + ".part" and are renamed into place only after the
+    MP4 structure checks out. The sync endpoints return the video as the POST
+    body, so a resume is only possible when the response also names a GET-able
+    copy (Content-Location/Location) on a host that advertises byte ranges.
+
+    Returns a dict with the byte count, SHA-256 and transfer timing; raises
+    DownloadError once attempts run out.
+    """
+    emit = emit or _ignore_event
+    out_file = Path(out_file)
+    out_file.parent.mkdir(parents=True, exist_ok=True)
+    part_file = out_file.with_name(out_file.name + ".part")
+
+    resume_url = resp.headers.get("Content-Location") or resp.headers.get("Location")
+    if resume_url:
+        resume_url = urllib.parse.urljoin(resp.geturl(), resume_url)
+    if resp.headers.get("Accept-Ranges", "").lower() != "bytes":
+        resume_url = None
+
+    digest = hashlib.sha256()
+    offset = 0
+    transferred = 0
+    length = resp.headers.get("Content-Length")
+    expected = int(length) if length and length.isdigit() else None
+    start = time.monotonic()
+    last_error = None
+
+    for attempt in range(1, max_attempts + 1):
+        if attempt > 1:
+            if not resume_url:
+                break
+            delay = min(2 ** (attempt - 2), 10)
+            emit("download_retry", error=last_error, offset=offset, delay=delay,
+                 attempt=attempt, max_attempts=max_attempts)
+            time.sleep(delay)
+            headers = {"User-Agent": "CineClaw/1.0"}
+            if offset:
+                headers["Range"] = f"bytes={offset}-"
+            try:
+                resp = POOL.request("GET", resume_url, headers=headers, timeout=60)
+            except urllib.error.HTTPError as e:
+                if e.code == 416 and offset:
+                    resp = None
+                else:
+                    last_error = f"HTTP {e.code}"
+                    continue
+            except (urllib.error.URLError, http.client.HTTPException, OSError) as e:
+                last_error = getattr(e, "reason", None) or e.__class__.__name__
+                continue
+            if resp is not None:
+                if offset and resp.status != 206:
+                    # Host ignored the Range header — start over from byte 0
+                    offset = 0
+                    digest = hashlib.sha256()
+                length = resp.headers.get("Content-Length")
+                expected = offset + int(length) if length and length.isdigit() else None
+
+        if resp is not None:
+            try:
+                with resp, open(part_file, "r+b" if offset else "wb") as f, \
+                        TRACER.span("download", attempt=attempt) as span:
+                    f.seek(offset)
+                    f.truncate()
+                    try:
+                        copy_stream(resp, f, digest)
+                    finally:
+                        f.flush()
+                        os.fsync(f.fileno())
+                        transferred += f.tell() - offset
+                        span.tag(bytes_down=f.tell() - offset)
+                        if expected is not None and f.tell() < expected:
+                            span.tag(error="short_read")
+                        offset = f.tell()
+            except (http.client.HTTPException, OSError) as e:
+                last_error = e.__class__.__name__
+                continue
+            resp = None
+
+        if expected is not None and offset < expected:
+            last_error = f"short read, {offset}/{expected} bytes"
+            continue
+
+        problem = check_mp4(part_file)
+        if problem:
+            last_error = f"corrupt MP4: {problem}"
+            part_file.unlink()
+            offset = 0
+            digest = hashlib.sha256()
+            continue
+
+        os.chmod(part_file, 0o644)
+        os.replace(part_file, out_file)
+        return download_stats(str(out_file), offset, digest, transferred, start, emit)
+
+    message = f"Video download failed: {last_error}"
+    if not resume_url:
+        message += " (the API did not offer a resumable copy of this video)"
+    raise DownloadError(message, str(part_file) if part_file.exists() else None)
+
+
+def download_stats(path, size, digest, transferred, start, emit):
+    elapsed = time.monotonic() - start
+    stats = {
+        "path": path,
+        "bytes": size,
+        "sha256": digest.hexdigest(),
+        "seconds": elapsed,
+        "mb_per_sec": (transferred / (1024 * 1024)) / elapsed if elapsed > 0 else 0.0,
+    }
+    emit("downloaded", **stats)
+    return stats
+
+
+def download_video(video_url, output_path, max_attempts=DOWNLOAD_ATTEMPTS, emit=None,
+                   timeout=60):
+    """Download the generated video, streaming it to disk.
+
+    Bytes land in output_path + ".part" and are renamed into place only after
+    the MP4 structure checks out. A dropped connection resumes from the last
+    byte written with a Range request when the host supports it; a leftover
+    .part file from an earlier run is resumed the same way. Returns the same
+    stats dict as save_video(); raises DownloadError once attempts run out.
+    """
+    emit = emit or _ignore_event
+    output_dir = os.path.dirname(os.path.abspath(output_path))
+    os.makedirs(output_dir, exist_ok=True)
+    part_path = output_path + ".part"
+
+    if os.path.exists(part_path):
+        offset = os.path.getsize(part_path)
+        digest = hash_file(part_path)
+    else:
+        offset = 0
+        digest = hashlib.sha256()
+
+    start = time.monotonic()
+    transferred = 0
+    last_error = None
+
+    for attempt in range(1, max_attempts + 1):
+        if attempt > 1:
+            delay = min(2 ** (attempt - 2), 10)
+            emit("download_retry", error=last_error, offset=offset, delay=delay,
+                 attempt=attempt, max_attempts=max_attempts)
+            time.sleep(delay)
+
+        headers = {"User-Agent": "CineClaw/1.0"}
+        if offset:
+            headers["Range"] = f"bytes={offset}-"
+        try:
+            with POOL.request("GET", video_url, headers=headers, timeout=timeout) as resp:
+                if offset and resp.status != 206:
+                    # Host ignored the Range header — start over from byte 0
+                    offset = 0
+                    digest = hashlib.sha256()
+                length = resp.headers.get("Content-Length")
+                expected = offset + int(length) if length and length.isdigit() else None
+                with open(part_path, "r+b" if offset else "wb") as f, \
+                        TRACER.span("download", attempt=attempt) as span:
+                    f.seek(offset)
+                    f.truncate()
+                    try:
+                        copy_stream(resp, f, digest)
+                    finally:
+                        f.flush()
+                        os.fsync(f.fileno())
+                        transferred += f.tell() - offset
+                        span.tag(bytes_down=f.tell() - offset)
+                        if expected is not None and f.tell() < expected:
+                            span.tag(error="short_read")
+                        offset = f.tell()
+        except urllib.error.HTTPError as e:
+            if e.code == 416 and offset:
+                # Nothing left to send — fall through to the integrity check
+                expected = offset
+            elif e.code in (408, 429, 500, 502, 503, 504):
+                last_error = f"HTTP {e.code}"
+                continue
+            else:
+                raise DownloadError(f"Download failed: HTTP {e.code}",
+                                    part_path if os.path.exists(part_path) else None) from e
+        except (urllib.error.URLError, http.client.HTTPException, OSError) as e:
+            last_error = getattr(e, "reason", None) or e.__class__.__name__
+            continue
+
+        if expected is not None and offset < expected:
+            last_error = f"short read, {offset}/{expected} bytes"
+            continue
+
+        problem = check_mp4(part_path)
+        if problem:
+            # Either the body was cut short without the server noticing or
+            # the .part file is unusable — discard it and fetch again
+            last_error = f"corrupt MP4: {problem}"
+            os.unlink(part_path)
+            offset = 0
+            digest = hashlib.sha256()
+            continue
+
+        os.chmod(part_path, 0o644)
+        os.replace(part_path, output_path)
+        return download_stats(output_path, offset, digest, transferred, start, emit)
+
+    raise DownloadError(f"Download failed after {max_attempts} attempts: {last_error}",
+                        part_path if os.path.exists(part_path) else None)
+
+
+def multipart_body(boundary, fields, files, chunk_size=CHUNK_SIZE):
+    """Build a streaming multipart/form-data body.
+
+    Returns (content_length, chunks) where chunks() yields the body. The
+    length is worked out from the file sizes up front; each file is read into
+    one reusable buffer, so memory stays flat however large the upload is.
+    chunks can be called again to replay the body.
+    """
+    parts = []
+    for key, value in fields.items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{key}"\r\n\r\n'
+            f"{value}\r\n".encode()
+        )
+    for key, filepath in files.items():
+        filename = os.path.basename(filepath)
+        parts.append(
+            f"--{boundary}\r\n"
+            f'Content-Disposition: form-data; name="{key}"; filename="{filename}"\r\n'
+            "Content-Type: application/octet-stream\r\n\r\n".encode()
+        )
+        parts.append((filepath, os.path.getsize(filepath)))
+        parts.append(b"\r\n")
+    parts.append(f"--{boundary}--\r\n".encode())
+
+    length = sum(len(p) if isinstance(p, bytes) else p[1] for p in parts)
+
+    def chunks():
+        buf = bytearray(chunk_size)
+        view = memoryview(buf)
+        for part in parts:
+            if isinstance(part, bytes):
+                yield part
+                continue
+            filepath, size = part
+            sent = 0
+            with open(filepath, "rb") as f:
+                while True:
+                    n = f.readinto(buf)
+                    if not n:
+                        break
+                    sent += n
+                    # http.client sends each chunk before asking for the
+                    # next one, so handing out the shared buffer is safe
+                    yield view[:n]
+            if sent != size:
+                raise OSError(f"{filepath} changed size during upload ({size} -> {sent} bytes)")
+
+    return length, chunks
+
+
+def api_call(endpoint, api_key, method="GET", data=None, files=None, base_url=None,
+             timeout=None):
+    """Call the async API and return the decoded JSON response.
+
+    Raises urllib.error.HTTPError/URLError once retries are exhausted.
+    """
+    url = f"{base_url or BASE_URL}{endpoint}"
+
+    if files:
+        # Multipart upload for image/audio files, streamed from disk
+        boundary = f"----CineClawBoundary{secrets.token_hex(16)}"
+        length, body = multipart_body(boundary, data or {}, files)
+        method = "POST"
+        headers = {
+            "Content-Type": f"multipart/form-data; boundary={boundary}",
+            "Content-Length": str(length),
+        }
+    elif data and method == "POST":
+        body = json.dumps(data).encode("utf-8")
+        headers = {"Content-Type": "application/json"}
+    else:
+        body = None
+        headers = {}
+
+    headers["Authorization"] = f"Bearer {api_key}"
+    headers["User-Agent"] = "CineClaw/1.0"
+
+    if method == "GET":
+        rate_key = f"{key_id(api_key)}/status"
+    else:
+        rate_key = rate_limit_key(endpoint, (data or {}).get("model"), api_key)
+    with RETRY.request(method, url, body=body, headers=headers, timeout=timeout,
+                       rate_key=rate_key) as resp:
+        return json.loads(resp.read().decode("utf-8"))
+
+
+def sigv4_canonical(method, path, query, headers, payload_hash):
+    """SigV4 canonical request.
+
+    path is unencoded, query a list of (name, value) pairs and headers a
+    {lowercase name: value} dict of exactly the signed headers.
+    """
+    canonical_query = "&".join(
+        f"{urllib.parse.quote(name, safe='-_.~')}={urllib.parse.quote(value, safe='-_.~')}"
+        for name, value in sorted(query))
+    canonical_headers = "".join(f"{name}:{' '.join(str(value).split())}\n"
+                                for name, value in sorted(headers.items()))
+    return "\n".join((method, urllib.parse.quote(path, safe="/-_.~"), canonical_query,
+                      canonical_headers, ";".join(sorted(headers)), payload_hash))
+
+
+def sigv4_sign(secret_key, amz_date, region, canonical_request, service="s3"):
+    """Hex SigV4 signature of a canonical request made at amz_date (YYYYMMDDTHHMMSSZ)."""
+    date = amz_date[:8]
+    scope = f"{date}/{region}/{service}/aws4_request"
+    to_sign = "\n".join(("AWS4-HMAC-SHA256", amz_date, scope,
+                         hashlib.sha256(canonical_request.encode("utf-8")).hexdigest()))
+    key = f"AWS4{secret_key}".encode("utf-8")
+    for part in (date, region, service, "aws4_request"):
+        key = hmac.new(key, part.encode("utf-8"), hashlib.sha256).digest()
+    return hmac.new(key, to_sign.encode("utf-8"), hashlib.sha256).hexdigest()
+
+
+class UploadError(LTXError):
+    """A local image or audio file could not be put in the asset store."""
+
+
+class S3Store:
+    """Objects in an S3 bucket, or any S3-compatible store (MinIO, R2,
+    scripts/s3_standin.py), addressed path-style and signed with SigV4.
+
+    This is the interface AssetIndex expects of a store: put() streams a
+    file up, exists() checks for an object and url() returns a presigned
+    GET URL valid for ttl seconds. id names the bucket and prefix so the
+    index keeps URLs from different stores apart.
+    """
+
+    # S3 refuses presigned URLs that live longer than 7 days
+    max_ttl = 7 * 86400
+
+    def __init__(self, bucket, prefix="", endpoint=None, region="us-east-1", access_key=None,
+                 secret_key=None, session_token=None):
+        if not access_key or not secret_key:
+            raise ValueError("S3 asset store needs AWS_ACCESS_KEY_ID and AWS_SECRET_ACCESS_KEY")
+        self.bucket = bucket
+        self.prefix = prefix
+        self.region = region
+        self.endpoint = (endpoint or f"https://s3.{region}.amazonaws.com").rstrip("/")
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.session_token = session_token
+        parts = urllib.parse.urlsplit(self.endpoint)
+        self._scheme = parts.scheme
+        self._host = parts.netloc
+        self._root = parts.path.rstrip("/")
+        self.id = f"s3://{bucket}/{prefix}@{self._host}"
+
+    @classmethod
+    def from_url(cls, spec, environ):
+        """A store for "s3://bucket/prefix", configured from AWS_* variables and
+        CINECLAW_ASSET_ENDPOINT (or AWS_ENDPOINT_URL) for non-AWS stores."""
+        parts = urllib.parse.urlsplit(spec)
+        if not parts.netloc:
+            raise ValueError(f"no bucket in {spec!r}")
+        prefix = parts.path.strip("/")
+        return cls(parts.netloc, f"{prefix}/" if prefix else "",
+                   environ.get("CINECLAW_ASSET_ENDPOINT") or environ.get("AWS_ENDPOINT_URL"),
+                   environ.get("AWS_REGION") or environ.get("AWS_DEFAULT_REGION") or "us-east-1",
+                   environ.get("AWS_ACCESS_KEY_ID"), environ.get("AWS_SECRET_ACCESS_KEY"),
+                   environ.get("AWS_SESSION_TOKEN"))
+
+    def _path(self, key):
+        return f"{self._root}/{self.bucket}/{self.prefix}{key}"
+
+    def _url(self, path):
+        return f"{self._scheme}://{self._host}{urllib.parse.quote(path, safe='/-_.~')}"
+
+    def _request(self, method, key, body=None, headers=None, timeout=None):
+        path = self._path(key)
+        amz_date = time.strftime("%Y%m%dT%H%M%SZ", time.gmtime())
+        signed = {"host": self._host, "x-amz-content-sha256": "UNSIGNED-PAYLOAD",
+                  "x-amz-date": amz_date}
+        if self.session_token:
+            signed["x-amz-security-token"] = self.session_token
+        signed.update(headers or {})
+        signature = sigv4_sign(self.secret_key, amz_date, self.region,
+                               sigv4_canonical(method, path, [], signed, "UNSIGNED-PAYLOAD"))
+        scope = f"{amz_date[:8]}/{self.region}/s3/aws4_request"
+        headers = dict(signed, **{
+            "authorization": f"AWS4-HMAC-SHA256 Credential={self.access_key}/{scope}, "
+                             f"SignedHeaders={';'.join(sorted(signed))}, Signature={signature}",
+            "user-agent": "CineClaw/1.0",
+        })
+        return RETRY.request(method, self._url(path), body=body, headers=headers,
+                             timeout=timeout)
+
+    def put(self, key, filepath, content_type="application/octet-stream", timeout=None,
+            chunk_size=CHUNK_SIZE):
+        """Stream filepath to key; memory stays at one chunk however big the file is."""
+        size = os.path.getsize(filepath)
+
+        def chunks():
+            buf = bytearray(chunk_size)
+            view = memoryview(buf)
+            sent = 0
+            with open(filepath, "rb") as f:
+                while True:
+                    n = f.readinto(buf)
+                    if not n:
+                        break
+                    sent += n
+                    yield view[:n]
+            if sent != size:
+                raise OSError(f"{filepath} changed size during upload ({size} -> {sent} bytes)")
+
+        with self._request("PUT", key, chunks,
+                           {"content-length": str(size), "content-type": content_type},
+                           timeout) as resp:
+            resp.read()
+
+    def exists(self, key, timeout=None):
+        try:
+            with self._request("HEAD", key, timeout=timeout) as resp:
+                resp.read()
+        except urllib.error.HTTPError as e:
+            if e.code == 404:
+                return False
+            raise
+        return True
+
+    def url(self, key, ttl):
+        """Presigned GET URL for key, valid for ttl seconds from now."""
+        path = self._path(key)
+        amz_date = time.strftime("%Y%m%dT%H%M%SZ", time.gmtime())
+        scope = f"{amz_date[:8]}/{self.region}/s3/aws4_request"
+        query = [("X-Amz-Algorithm", "AWS4-HMAC-SHA256"),
+                 ("X-Amz-Credential", f"{self.access_key}/{scope}"),
+                 ("X-Amz-Date", amz_date),
+                 ("X-Amz-Expires", str(int(min(ttl, self.max_ttl)))),
+                 ("X-Amz-SignedHeaders", "host")]
+        if self.session_token:
+            query.append(("X-Amz-Security-Token", self.session_token))
+        signature = sigv4_sign(self.secret_key, amz_date, self.region,
+                               sigv4_canonical("GET", path, query, {"host": self._host},
+                                               "UNSIGNED-PAYLOAD"))
+        query.append(("X-Amz-Signature", signature))
+        return f"{self._url(path)}?{urllib.parse.urlencode(query, quote_via=urllib.parse.quote)}"
+
+
+# Object store classes by CINECLAW_ASSET_STORE scheme; each provides
+# from_url(spec, environ) and the S3Store interface
+ASSET_STORES = {"s3": S3Store}
+
+# Lifetime of presigned asset URLs (seconds); stores cap it (S3: 7 days)
+ASSET_URL_TTL = 24 * 3600
+
+# A stored URL is re-signed once less than this is left (seconds), so it
+# stays valid for the whole generation that uses it
+ASSET_URL_MARGIN = 3600.0
+
+# Parallel uploads when a batch or sweep stages its files up front
+ASSET_UPLOAD_WORKERS = 4
+
+
+def load_asset_store(environ=None):
+    """The object store named by CINECLAW_ASSET_STORE (e.g. "s3://bucket/cineclaw"),
+    or None when it is unset or unusable."""
+    environ = os.environ if environ is None else environ
+    spec = environ.get("CINECLAW_ASSET_STORE", "").strip()
+    if not spec:
+        return None
+    scheme = urllib.parse.urlsplit(spec).scheme
+    try:
+        if scheme not in ASSET_STORES:
+            raise ValueError(f"unknown scheme {scheme!r} (use {', '.join(ASSET_STORES)})")
+        return ASSET_STORES[scheme].from_url(spec, environ)
+    except ValueError as e:
+        print(f"WARNING: Ignoring CINECLAW_ASSET_STORE: {e}", file=sys.stderr)
+        return None
+
+
+class AssetIndex:
+    """Local images and audio uploaded once per content (SQLite index).
+
+    Files are identified by SHA-256, memoised per path, size and mtime so an
+    unchanged file isn't read again, and stored under that hash, so one
+    reference frame shared by 200 variants is uploaded once. The index keeps
+    each file's presigned URL and its expiry; a URL near expiry is re-signed,
+    and the file uploaded again only if the object has gone. Threads wanting
+    the same file wait for one upload; across processes the worst case is a
+    duplicate upload of identical content.
+    """
+
+    def __init__(self, path, store=None, ttl=ASSET_URL_TTL, margin=ASSET_URL_MARGIN):
+        self.path = Path(path)
+        self.store = store
+        self.ttl = ttl
+        self.margin = margin
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._uploading = {}
+        self.uploads = 0
+        self.uploaded_bytes = 0
+        self.reused = 0
+        self.refreshed = 0
+
+    def _db(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS files ("
+                " path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, sha256 TEXT)"
+            )
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS assets ("
+                " store TEXT, sha256 TEXT, key TEXT, bytes INTEGER, url TEXT, expires REAL,"
+                " uploaded REAL, last_used REAL, PRIMARY KEY (store, sha256))"
+            )
+            self._local.db = db
+        return db
+
+    def digest(self, filepath):
+        """SHA-256 (hex) of a local file."""
+        filepath = os.path.abspath(filepath)
+        st = os.stat(filepath)
+        db = self._db()
+        row = db.execute("SELECT sha256 FROM files WHERE path = ? AND size = ? AND mtime_ns = ?",
+                         (filepath, st.st_size, st.st_mtime_ns)).fetchone()
+        if row:
+            return row[0]
+        sha256 = hash_file(filepath).hexdigest()
+        db.execute("INSERT OR REPLACE INTO files (path, size, mtime_ns, sha256)"
+                   " VALUES (?, ?, ?, ?)", (filepath, st.st_size, st.st_mtime_ns, sha256))
+        return sha256
+
+    def url(self, filepath, emit=None, timeout=None):
+        """A URL the API can fetch filepath from, uploading it first if needed.
+
+        emit, if given, receives "uploaded" (path, bytes, seconds) after an
+        upload. Raises UploadError or NetworkError.
+        """
+        if self.store is None:
+            raise UploadError("No asset store: set CINECLAW_ASSET_STORE to upload local files.")
+        try:
+            sha256 = self.digest(filepath)
+        except OSError as e:
+            raise UploadError(f"Can't read {filepath}: {e}") from e
+        with self._lock:
+            lock = self._uploading.setdefault(sha256, threading.Lock())
+        with lock:
+            db = self._db()
+            row = db.execute("SELECT key, url, expires, uploaded FROM assets"
+                             " WHERE store = ? AND sha256 = ?",
+                             (self.store.id, sha256)).fetchone()
+            now = time.time()
+            if row and row[2] - now > self.margin:
+                db.execute("UPDATE assets SET last_used = ? WHERE store = ? AND sha256 = ?",
+                           (now, self.store.id, sha256))
+                with self._lock:
+                    self.reused += 1
+                return row[1]
+            suffix = Path(filepath).suffix.lower()
+            key = row[0] if row else sha256 + (suffix if suffix[1:].isalnum() else "")
+            size = os.path.getsize(filepath)
+            start = time.monotonic()
+            try:
+                with TRACER.span("upload", file=os.path.basename(filepath), bytes=size) as span:
+                    if row and self.store.exists(key, timeout):
+                        uploaded = False
+                    else:
+                        content_type = (mimetypes.guess_type(filepath)[0]
+                                        or "application/octet-stream")
+                        self.store.put(key, filepath, content_type, timeout)
+                        uploaded = True
+                    span.tag(uploaded=uploaded)
+            except urllib.error.HTTPError as e:
+                raise UploadError(f"Asset store refused {os.path.basename(filepath)}: "
+                                  f"HTTP {e.code} {e.reason}") from e
+            except urllib.error.URLError as e:
+                raise NetworkError(getattr(e, "reason", e)) from e
+            except OSError as e:
+                raise UploadError(f"Can't upload {filepath}: {e}") from e
+            ttl = min(self.ttl, self.store.max_ttl)
+            url = self.store.url(key, ttl)
+            db.execute(
+                "INSERT OR REPLACE INTO assets"
+                " (store, sha256, key, bytes, url, expires, uploaded, last_used)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (self.store.id, sha256, key, size, url, now + ttl,
+                 now if uploaded else row[3], now))
+            with self._lock:
+                if uploaded:
+                    self.uploads += 1
+                    self.uploaded_bytes += size
+                else:
+                    self.refreshed += 1
+            if uploaded and emit:
+                emit("uploaded", path=filepath, bytes=size, seconds=time.monotonic() - start)
+            return url
+
+    def stage(self, paths, workers=ASSET_UPLOAD_WORKERS, emit=None):
+        """URLs for many files at once, uploading the new ones in parallel.
+
+        Returns (urls, errors): {path: url} and {path: LTXError}.
+        """
+        urls, errors = {}, {}
+        paths = list(dict.fromkeys(paths))
+        if not paths:
+            return urls, errors
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(paths)))) as executor:
+            futures = {path: executor.submit(self.url, path, emit) for path in paths}
+        for path, future in futures.items():
+            try:
+                urls[path] = future.result()
+            except LTXError as e:
+                errors[path] = e
+        return urls, errors
+
+    def stats(self):
+        with self._lock:
+            return {"uploads": self.uploads, "uploaded_bytes": self.uploaded_bytes,
+                    "reused": self.reused, "refreshed": self.refreshed}
+
+
+ASSETS = AssetIndex(STATE_DIR / "assets.sqlite3", load_asset_store())
+
+
+# Expected generation time (seconds) before any history exists, per model
+DEFAULT_EXPECTED_SECONDS = {"ltx-2-fast": 15.0, "ltx-2-pro": 60.0}
+
+# Bounds on the adaptive status-poll interval (seconds)
+POLL_MIN_INTERVAL = 1.0
+
+POLL_MAX_INTERVAL = 15.0
+
+# Poll interval while webhooks are expected to report completion
+POLL_SAFETY_NET_INTERVAL = 60.0
+
+
+class GenerationPoller:
+    """Track many async generations from a single polling thread.
+
+    Each job is polled on its own schedule: sparsely while it is far from its
+    expected finish time, every POLL_MIN_INTERVAL around it, then backing off
+    again if it overruns. Expected times come from the median of recent jobs
+    with the same model/resolution/duration, kept in SQLite so estimates
+    survive restarts. track() returns a Future that resolves with the final
+    generation record the moment the job completes.
+    """
+
+    def __init__(self, history_path, history_size=20):
+        self.history_path = Path(history_path)
+        self.history_size = history_size
+        self._jobs = {}
+        self._cond = threading.Condition()
+        self._thread = None
+        self._local = threading.local()
+        self.polls = 0
+        self.completed = 0
+        self.completed_by = {}
+        self.wait_times = deque(maxlen=1000)
+        self._finished = deque(maxlen=10000)
+        self._early = {}
+
+    def _history(self):
+        # track() runs on caller threads and _record() on the poller's, so
+        # each thread gets its own connection
+        db = getattr(self._local, "db", None)
+        if db is None:
+            self.history_path.parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(self.history_path, timeout=30, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS generation_times ("
+                " profile TEXT, seconds REAL, finished REAL)"
+            )
+            db.execute(
+                "CREATE INDEX IF NOT EXISTS generation_times_profile"
+                " ON generation_times (profile, finished)"
+            )
+            self._local.db = db
+        return db
+
+    def expected_seconds(self, profile):
+        """Median duration of recent jobs with this profile, or the default."""
+        default = DEFAULT_EXPECTED_SECONDS.get(profile[0] if profile else None, 30.0)
+        if not profile:
+            return default
+        try:
+            rows = self._history().execute(
+                "SELECT seconds FROM generation_times WHERE profile = ?"
+                " ORDER BY finished DESC LIMIT ?",
+                (json.dumps(profile), self.history_size)).fetchall()
+        except sqlite3.Error:
+            return default
+        if not rows:
+            return default
+        times = sorted(r[0] for r in rows)
+        return times[len(times) // 2]
+
+    def _record(self, profile, seconds):
+        if not profile:
+            return
+        try:
+            self._history().execute(
+                "INSERT INTO generation_times (profile, seconds, finished) VALUES (?, ?, ?)",
+                (json.dumps(profile), seconds, time.time()))
+        except sqlite3.Error as e:
+            print(f"WARNING: Could not record generation time: {e}", file=sys.stderr)
+
+    @staticmethod
+    def next_interval(elapsed, expected):
+        """How long to wait before the next poll of a job."""
+        remaining = expected - elapsed
+        if remaining > 0:
+            # Aim to land roughly on the expected finish time
+            return min(POLL_MAX_INTERVAL, max(POLL_MIN_INTERVAL, remaining / 2))
+        overrun = -remaining
+        return min(POLL_MAX_INTERVAL, max(POLL_MIN_INTERVAL, overrun / 4))
+
+    def track(self, gen_id, api_key, profile=None, timeout=None, on_done=None, webhook=False,
+              base_url=None, span=None):
+        """Start tracking gen_id. Returns a Future for its final record.
+
+        profile is (model, resolution, duration); timeout defaults to four
+        times the expected duration, and never less than 300 seconds. With
+        webhook, completion is expected via notify() and polling drops to a
+        slow safety net. Polls are traced under span (see Tracer).
+        """
+        expected = self.expected_seconds(profile)
+        future = Future()
+        if on_done:
+            future.add_done_callback(on_done)
+        now = time.monotonic()
+        with self._cond:
+            self._jobs[gen_id] = {
+                "api_key": api_key,
+                "base_url": base_url,
+                "profile": profile,
+                "expected": expected,
+                "started": now,
+                "deadline": now + (timeout or max(300.0, expected * 4)),
+                "next_poll": now + min(self.next_interval(0.0, expected),
+                                       timeout or float("inf")),
+                "polls": 0,
+                "last_poll": now,
+                "status": "queued",
+                "future": future,
+                "webhook": webhook,
+                "span": span,
+            }
+            early = self._early.pop(gen_id, None)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="cineclaw-poller",
+                                                daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        if early is not None:
+            self._finish(gen_id, early, "push")
+        return future
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._jobs:
+                    self._thread = None
+                    return
+                now = time.monotonic()
+                gen_id, job = min(self._jobs.items(), key=lambda item: item[1]["next_poll"])
+                wait = job["next_poll"] - now
+                if wait > 0:
+                    self._cond.wait(wait)
+                    continue
+            self._poll(gen_id, job)
+
+    def _poll(self, gen_id, job):
+        now = time.monotonic()
+        outcome = None
+        with TRACER.span("poll", job["span"], id=gen_id, gap=now - job["last_poll"]) as span:
+            job["last_poll"] = now
+            try:
+                result = api_call(f"/generations/{gen_id}", job["api_key"],
+                                  base_url=job["base_url"])
+            except Exception as e:
+                # Network errors, bad JSON, anything else: fail this job, not
+                # the thread every other job is polled from
+                outcome = e
+                span.tag(error=error_code(e))
+            else:
+                job["polls"] += 1
+                if not isinstance(result, dict):
+                    outcome = LTXError(f"Unexpected status response for {gen_id}")
+                    span.tag(error="invalid_response")
+                else:
+                    job["status"] = result.get("status", "unknown")
+                    span.tag(status=job["status"])
+                    if job["status"] == "completed":
+                        outcome = result
+                    elif job["status"] in ("failed", "error"):
+                        outcome = GenerationError(result.get("error", "Unknown error"))
+        with self._cond:
+            self.polls += 1
+
+        elapsed = time.monotonic() - job["started"]
+        if outcome is None and now >= job["deadline"]:
+            outcome = GenerationTimeout(f"Generation {gen_id} timed out after {elapsed:.0f}s")
+        if outcome is None:
+            interval = self.next_interval(elapsed, job["expected"])
+            if job["webhook"]:
+                # Callbacks do the real work; polling only catches lost ones
+                interval = max(interval, POLL_SAFETY_NET_INTERVAL)
+            # Poll once more at the deadline rather than sleeping past it
+            job["next_poll"] = min(time.monotonic() + interval, job["deadline"])
+            return
+        self._finish(gen_id, outcome, "poll")
+
+    def _finish(self, gen_id, outcome, source):
+        """Resolve a job's future exactly once, whichever path sees it first."""
+        with self._cond:
+            job = self._jobs.pop(gen_id, None)
+            if job is None:
+                return False
+            elapsed = time.monotonic() - job["started"]
+            self.completed += 1
+            self.wait_times.append(elapsed)
+            self.completed_by[source] = self.completed_by.get(source, 0) + 1
+            self._finished.append(gen_id)
+            self._cond.notify()
+        if isinstance(outcome, dict):
+            self._record(job["profile"], elapsed)
+            job["future"].set_result(outcome)
+        else:
+            job["future"].set_exception(outcome)
+        return True
+
+    def notify(self, record):
+        """Deliver a pushed generation record (e.g. from a webhook).
+
+        Returns "delivered", "duplicate", "pending" (not final yet) or "early"
+        (the job isn't tracked yet; the record is held until it is).
+        """
+        gen_id = record.get("id")
+        status = record.get("status")
+        if status == "completed":
+            outcome = record
+        elif status in ("failed", "error"):
+            outcome = GenerationError(record.get("error", "Unknown error"))
+        else:
+            return "pending"
+        with self._cond:
+            if gen_id in self._finished:
+                return "duplicate"
+            if gen_id not in self._jobs:
+                if gen_id in self._early:
+                    return "duplicate"
+                self._early[gen_id] = outcome
+                while len(self._early) > 1000:
+                    self._early.pop(next(iter(self._early)))
+                return "early"
+        return "delivered" if self._finish(gen_id, outcome, "push") else "duplicate"
+
+    def status(self, gen_id):
+        with self._cond:
+            job = self._jobs.get(gen_id)
+            return job["status"] if job else None
+
+    def stats(self):
+        """Queue depth, poll volume and wait times across tracked jobs."""
+        with self._cond:
+            waits = sorted(self.wait_times)
+            now = time.monotonic()
+            return {
+                "in_flight": len(self._jobs),
+                "oldest_wait": max((now - j["started"] for j in self._jobs.values()), default=0.0),
+                "completed": self.completed,
+                "polls": self.polls,
+                "polls_per_job": self.polls / self.completed if self.completed else 0.0,
+                "completed_by": dict(self.completed_by),
+                "wait_p50": waits[len(waits) // 2] if waits else 0.0,
+                "wait_max": waits[-1] if waits else 0.0,
+            }
+
+
+POLLER = GenerationPoller(STATE_DIR / "timings.sqlite3")
+
+# Relative accuracy of the latency sketches (log-spaced buckets, as in DDSketch)
+LATENCY_ACCURACY = 0.02
+
+# Weight older samples keep each time one is added, so sketches follow recent behaviour
+LATENCY_DECAY = 0.98
+
+# Samples a sketch needs before it is trusted over the prior (twice DEFAULT_EXPECTED_SECONDS)
+LATENCY_MIN_SAMPLES = 5
+
+# Quality ranks for --deadline, lowest first
+MODEL_QUALITY = ("ltx-2-fast", "ltx-2-pro")
+RESOLUTION_QUALITY = ("1920x1080", "2560x1440", "3840x2160")
+
+
+def latency_profile(transport, mode, model, resolution, fps, duration):
+    """Key under which end-to-end latency is recorded."""
+    parts = [transport, f"{MODE_NAMES.get(mode, mode)}-to-video", model, resolution]
+    if fps:
+        parts.append(f"{fps}fps")
+    if duration:
+        parts.append(f"{duration}s")
+    return " ".join(parts)
+
+
+def parse_seconds(text):
+    """Parse "30s", "2m", "1.5h" or a bare number of seconds."""
+    text = str(text).strip().lower()
+    scale = {"s": 1, "m": 60, "h": 3600}.get(text[-1:], None)
+    try:
+        value = float(text[:-1] if scale else text) * (scale or 1)
+    except ValueError:
+        raise ValueError(f"can't read {text!r} as a duration (use e.g. 30s or 2m)") from None
+    if value <= 0:
+        raise ValueError(f"duration must be positive, not {text!r}")
+    return value
+
+
+class LatencyStats:
+    """Rolling end-to-end latency sketches per profile, kept in SQLite.
+
+    Each sketch is a histogram over log-spaced buckets, so any quantile is
+    within LATENCY_ACCURACY of the true value whatever the spread, and it
+    stays a few hundred bytes. Every new sample first decays the existing
+    weights by LATENCY_DECAY, so the distribution tracks the last fifty or
+    so jobs rather than all time. Processes share the sketches.
+    """
+
+    def __init__(self, path, accuracy=LATENCY_ACCURACY, decay=LATENCY_DECAY):
+        self.path = Path(path)
+        self.gamma = (1 + accuracy) / (1 - accuracy)
+        self.decay = decay
+        self._local = threading.local()
+
+    def _db(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS sketches ("
+                " profile TEXT PRIMARY KEY, buckets TEXT, weight REAL, samples INTEGER,"
+                " low REAL, high REAL, updated REAL)"
+            )
+            self._local.db = db
+        return db
+
+    def record(self, profile, seconds):
+        """Add one latency sample to profile's sketch."""
+        index = math.ceil(math.log(max(seconds, 0.001), self.gamma))
+        try:
+            db = self._db()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                row = db.execute("SELECT buckets, weight, samples, low, high FROM sketches"
+                                 " WHERE profile = ?", (profile,)).fetchone()
+                if row:
+                    buckets = {int(k): v * self.decay for k, v in json.loads(row[0]).items()}
+                    # Forget buckets whose weight has decayed to nothing
+                    buckets = {k: v for k, v in buckets.items() if v > 1e-4}
+                    weight, samples = row[1] * self.decay, row[2]
+                    low, high = min(row[3], seconds), max(row[4], seconds)
+                else:
+                    buckets, weight, samples, low, high = {}, 0.0, 0, seconds, seconds
+                buckets[index] = buckets.get(index, 0.0) + 1.0
+                db.execute(
+                    "INSERT OR REPLACE INTO sketches"
+                    " (profile, buckets, weight, samples, low, high, updated)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (profile, json.dumps(buckets), weight + 1.0, samples + 1, low, high,
+                     time.time()))
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+            db.execute("COMMIT")
+        except (OSError, sqlite3.Error) as e:
+            print(f"WARNING: Could not record latency: {e}", file=sys.stderr)
+
+    def _quantiles(self, buckets, weight, qs):
+        ordered = sorted(buckets.items())
+        out = []
+        for q in qs:
+            target = q * weight
+            seen = 0.0
+            for index, count in ordered:
+                seen += count
+                if seen >= target:
+                    break
+            # Bucket i holds (gamma^(i-1), gamma^i]; report its midpoint
+            out.append(2 * self.gamma ** index / (self.gamma + 1))
+        return out
+
+    def summary(self, profile=None):
+        """{profile: {"samples", "p50", "p90", "p99", "min", "max"}}, for one or all profiles."""
+        sql = "SELECT profile, buckets, weight, samples, low, high FROM sketches"
+        rows = self._db().execute(sql + (" WHERE profile = ?" if profile else "")
+                                  + " ORDER BY profile", (profile,) if profile else ()).fetchall()
+        stats = {}
+        for name, buckets, weight, samples, low, high in rows:
+            buckets = {int(k): v for k, v in json.loads(buckets).items()}
+            p50, p90, p99 = self._quantiles(buckets, weight, (0.5, 0.9, 0.99))
+            stats[name] = {"samples": samples, "p50": p50, "p90": p90, "p99": p99,
+                           "min": low, "max": high}
+        return stats
+
+    def get(self, profile):
+        """The summary row for profile, or None if unknown or unreadable."""
+        try:
+            return self.summary(profile).get(profile)
+        except (OSError, sqlite3.Error, ValueError):
+            return None
+
+    def p90(self, profile, model):
+        """(p90 seconds, from history) for profile, falling back to the prior."""
+        found = self.get(profile)
+        if found and found["samples"] >= LATENCY_MIN_SAMPLES:
+            return found["p90"], True
+        return DEFAULT_EXPECTED_SECONDS.get(model, 30.0) * 2, False
+
+
+LATENCY = LatencyStats(STATE_DIR / "latency.sqlite3")
+
+
+def print_latency_stats():
+    """Print the recorded latency distribution of every configuration.
+
+    Raises LTXError if the history can't be read.
+    """
+    try:
+        stats = LATENCY.summary()
+    except (OSError, sqlite3.Error) as e:
+        raise LTXError(f"Can't read latency history {LATENCY.path}: {e}") from e
+    if not stats:
+        print("No latency history yet.")
+        return stats
+    width = max(len("configuration"), *(len(name) for name in stats))
+    print(f"{'configuration'.ljust(width)}  {'jobs':>5}  {'p50':>6}  {'p90':>6}  {'p99':>6}  "
+          f"{'min':>6}  {'max':>6}")
+    for name, row in stats.items():
+        print(f"{name.ljust(width)}  {row['samples']:>5}  "
+              + "  ".join(f"{row[key]:>5.1f}s" for key in ("p50", "p90", "p99", "min", "max")))
+    print(f"(recent jobs weigh most; --deadline trusts a configuration after "
+          f"{LATENCY_MIN_SAMPLES} jobs)")
+    return stats
+
+
+def select_for_deadline(request, seconds, transport="sync", latency=None):
+    """Return (request, p90, changes) for the best configuration that fits.
+
+    Candidates are the supported configurations for request's duration that
+    are no better than request in model, resolution or fps (a deadline never
+    buys a more expensive render). The highest-quality one whose p90 latency
+    fits in seconds wins. Raises InvalidRequestError if none does.
+    """
+    latency = latency or LATENCY
+    if request.mode == "a2v":
+        # Duration and fps follow the audio
+        candidates = [(A2V_CONFIG[0], A2V_CONFIG[1], None)]
+    else:
+        def rank(value, order):
+            return order.index(value) if value in order else len(order)
+
+        candidates = sorted(
+            ((model, resolution, fps) for (model, resolution, fps), (low, high)
+             in SUPPORTED_CONFIGS.items()
+             if low <= request.duration <= high
+             and rank(model, MODEL_QUALITY) <= rank(request.model, MODEL_QUALITY)
+             and rank(resolution, RESOLUTION_QUALITY)
+             <= rank(request.resolution, RESOLUTION_QUALITY)
+             and fps <= request.fps),
+            key=lambda c: (rank(c[0], MODEL_QUALITY), rank(c[1], RESOLUTION_QUALITY), c[2]),
+            reverse=True)
+    fastest = None
+    for model, resolution, fps in candidates:
+        duration = None if request.mode == "a2v" else request.duration
+        p90, known = latency.p90(latency_profile(transport, request.mode, model, resolution,
+                                                 fps, duration), model)
+        if p90 <= seconds:
+            chosen = replace(request, model=model, resolution=resolution, fps=fps or request.fps)
+            changes = [f"{name} {getattr(request, name)} -> {getattr(chosen, name)}"
+                       for name in ("model", "resolution", "fps")
+                       if getattr(request, name) != getattr(chosen, name)]
+            if changes:
+                changes.append(f"p90 {p90:.3g}s fits the {seconds:.3g}s deadline"
+                               f"{'' if known else ' (estimated, little history yet)'}")
+            return chosen, p90, changes
+        if fastest is None or p90 < fastest[0]:
+            fastest = (p90, model, resolution, fps)
+    if fastest is None:
+        raise InvalidRequestError(f"No supported configuration for a {request.duration}s "
+                                  f"{request.mode} request")
+    p90, model, resolution, fps = fastest
+    config = f"{model} {resolution}" + (f"/{fps}fps" if fps else "")
+    raise InvalidRequestError(f"No configuration fits a {seconds:.3g}s deadline: fastest is "
+                              f"{config} at p90 {p90:.3g}s")
+
+
+# Priority classes, most urgent first
+PRIORITIES = ("interactive", "batch")
+
+# Generations in flight at once per process (the standard tier allows 10)
+SCHEDULER_SLOTS = 10
+
+# Slots held back for a class: less urgent classes can't use them
+SCHEDULER_RESERVED = {"interactive": 2}
+
+# Seconds of queueing that move a waiting job up by one priority class
+PRIORITY_AGING = 120.0
+
+
+class PriorityScheduler:
+    """Share a process's generation slots between priority classes.
+
+    Free slots go to the waiting job with the lowest class rank, less one
+    rank per `aging` seconds it has waited, so batch work that has queued
+    long enough competes with fresh interactive work instead of starving.
+    Slots reserved for a class and not in use by it are never handed to a
+    less urgent class, so an interactive job always finds one free. A
+    paused class keeps its queue but gets no slots; requeue() hands a
+    class's waiting jobs back to their callers as JobRequeued. Jobs hold a
+    slot from submission until their video is downloaded.
+    """
+
+    def __init__(self, slots=SCHEDULER_SLOTS, reserved=None, aging=PRIORITY_AGING):
+        self.slots = slots
+        self.reserved = dict(SCHEDULER_RESERVED if reserved is None else reserved)
+        self.aging = aging
+        self.paused = set()
+        self._waiting = []
+        self._running = dict.fromkeys(PRIORITIES, 0)
+        self._waits = {name: [0, 0.0, 0.0] for name in PRIORITIES}  # jobs, total, max
+        self._order = itertools.count()
+        self._cond = threading.Condition()
+
+    def _headroom(self, priority):
+        """Free slots a job of priority may take without eating into a reservation."""
+        held = sum(max(0, self.reserved.get(name, 0) - self._running[name])
+                   for name in PRIORITIES[:PRIORITIES.index(priority)])
+        return self.slots - sum(self._running.values()) - held
+
+    def _grant(self):
+        now = time.monotonic()
+        self._waiting.sort(key=lambda t: (PRIORITIES.index(t["priority"])
+                                          - (now - t["enqueued"]) / self.aging, t["order"]))
+        for ticket in list(self._waiting):
+            if ticket["priority"] in self.paused or self._headroom(ticket["priority"]) <= 0:
+                continue
+            self._waiting.remove(ticket)
+            ticket["state"] = "running"
+            self._running[ticket["priority"]] += 1
+            waited = now - ticket["enqueued"]
+            waits = self._waits[ticket["priority"]]
+            waits[0] += 1
+            waits[1] += waited
+            waits[2] = max(waits[2], waited)
+        self._cond.notify_all()
+
+    def acquire(self, priority="interactive", timeout=None, on_queued=None):
+        """Wait for a slot and return the ticket to release().
+
+        on_queued(ahead) is called once if the job has to wait. Raises
+        JobRequeued if requeue() hands the job back, or GenerationTimeout
+        if no slot frees up within timeout seconds.
+        """
+        if priority not in PRIORITIES:
+            raise InvalidRequestError(f"Unknown priority '{priority}'. "
+                                      f"Use {' or '.join(PRIORITIES)}.")
+        ticket = {"priority": priority, "enqueued": time.monotonic(), "state": "queued",
+                  "order": next(self._order)}
+        end = None if timeout is None else ticket["enqueued"] + timeout
+        with self._cond:
+            self._waiting.append(ticket)
+            self._grant()
+            if ticket["state"] == "queued" and on_queued:
+                on_queued(self._waiting.index(ticket))
+            while ticket["state"] == "queued":
+                left = None if end is None else end - time.monotonic()
+                if left is not None and left <= 0:
+                    self._waiting.remove(ticket)
+                    raise GenerationTimeout(f"Still queued ({priority}) when the deadline "
+                                            f"passed")
+                self._cond.wait(left)
+            if ticket["state"] == "requeued":
+                raise JobRequeued(f"{priority} job requeued before it was sent")
+        return ticket
+
+    def release(self, ticket):
+        with self._cond:
+            if ticket["state"] == "running":
+                ticket["state"] = "done"
+                self._running[ticket["priority"]] -= 1
+                self._grant()
+
+    def pause(self, priority):
+        """Stop handing slots to priority; its queued jobs keep their place."""
+        with self._cond:
+            self.paused.add(priority)
+
+    def resume(self, priority):
+        with self._cond:
+            self.paused.discard(priority)
+            self._grant()
+
+    def requeue(self, priority):
+        """Hand every queued job of priority back to its caller; returns how many."""
+        with self._cond:
+            handed = [t for t in self._waiting if t["priority"] == priority]
+            for ticket in handed:
+                self._waiting.remove(ticket)
+                ticket["state"] = "requeued"
+            self._cond.notify_all()
+        return len(handed)
+
+    def stats(self):
+        """{priority: {"running", "queued", "paused", "jobs", "wait_avg", "wait_max"}}."""
+        with self._cond:
+            now = time.monotonic()
+            out = {}
+            for name in PRIORITIES:
+                queued = [now - t["enqueued"] for t in self._waiting if t["priority"] == name]
+                jobs, total, longest = self._waits[name]
+                out[name] = {"running": self._running[name], "queued": len(queued),
+                             "paused": name in self.paused, "jobs": jobs,
+                             "wait_avg": total / jobs if jobs else 0.0,
+                             "wait_max": max([longest] + queued)}
+            return out
+
+
+SCHEDULER = PriorityScheduler()
+
+
+class WebhookReceiver:
+    """Local HTTP endpoint that receives generation-complete callbacks.
+
+    The callback URL carries a random per-receiver token, and when a secret
+    is configured the body must also carry a matching hex HMAC-SHA256 in the
+    X-Signature header. Verified records go to poller.notify(), which
+    deduplicates them and resolves the waiting job.
+    """
+
+    def __init__(self, poller, host="127.0.0.1", port=0, public_url=None, secret=None):
+        self.poller = poller
+        self.token = secrets.token_urlsafe(16)
+        self.secret = secret
+        self.counts = {"delivered": 0, "duplicate": 0, "pending": 0, "early": 0, "rejected": 0}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        bound_host, bound_port = self._server.server_address[:2]
+        base = (public_url or f"http://{bound_host}:{bound_port}").rstrip("/")
+        self.callback_url = f"{base}/cineclaw/callback/{self.token}"
+        self._thread = None
+
+    def _handler(self):
+        receiver = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                expected = f"/cineclaw/callback/{receiver.token}"
+                length = self.headers.get("Content-Length") or "0"
+                if not hmac.compare_digest(self.path, expected):
+                    return self._reply(404, "rejected")
+                if not length.isdigit():
+                    return self._reply(400, "rejected")
+                length = int(length)
+                if length > 1024 * 1024:
+                    return self._reply(413, "rejected")
+                body = self.rfile.read(length)
+                if receiver.secret:
+                    signature = self.headers.get("X-Signature", "")
+                    digest = hmac.new(receiver.secret.encode(), body, hashlib.sha256).hexdigest()
+                    if not hmac.compare_digest(signature, digest):
+                        return self._reply(401, "rejected")
+                try:
+                    record = json.loads(body)
+                except ValueError:
+                    return self._reply(400, "rejected")
+                if not isinstance(record, dict) or not record.get("id"):
+                    return self._reply(400, "rejected")
+                self._reply(200, receiver.poller.notify(record))
+
+            def _reply(self, code, outcome):
+                with receiver._lock:
+                    receiver.counts[outcome] += 1
+                self.send_response(code)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        name="cineclaw-webhook", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def _raise_api_error(e):
+    """Translate urllib errors from RETRY/POOL into LTXError subclasses."""
+    if isinstance(e, urllib.error.HTTPError):
+        raise APIError.from_http_error(e) from e
+    raise NetworkError(e.reason) from e
+
+
+# Socket timeout for the sync API, which holds the request open while it renders
+SYNC_TIMEOUT = 300
+
+
+def time_left(deadline, default):
+    """Seconds until a time.monotonic() deadline (at least 1), or default without one."""
+    if deadline is None:
+        return default
+    return max(1.0, deadline - time.monotonic())
+
+
+class SyncTransport:
+    """The /v1/{text,image,audio}-to-video API: POST JSON, get the MP4 back.
+
+    The API takes images and audio as URLs; local files are put in the asset
+    store (once per content, see AssetIndex) and sent as presigned URLs. A
+    dropped download can only resume when the response names a GET-able
+    copy of the video; see save_video().
+    """
+
+    name = "sync"
+
+    def __init__(self, base_url=None, assets=None):
+        self.base_url = base_url
+        self.assets = assets or ASSETS
+
+    def prepare(self, request):
+        """Validate request and return (endpoint, payload, files)."""
+        base_url = self.base_url or BASE_URL
+        if request.mode not in MODE_NAMES:
+            raise InvalidRequestError(f"Unknown mode '{request.mode}'. Use t2v, i2v, or a2v.")
+        if request.seed is not None:
+            raise InvalidRequestError("The sync API has no seed parameter.")
+        endpoint = f"{base_url}/{MODE_NAMES[request.mode]}-to-video"
+        payload = {
+            "prompt": request.prompt,
+            "model": request.model,
+            "duration": request.duration,
+            "resolution": request.resolution,
+            "fps": request.fps,
+            "generate_audio": request.generate_audio,
+        }
+        if request.camera_motion:
+            payload["camera_motion"] = request.camera_motion
+
+        files = {}
+        if request.mode == "a2v":
+            # Duration follows the audio; audio-to-video is pro-only at 1080p
+            payload["model"] = "ltx-2-pro"
+            payload["resolution"] = "1920x1080"
+            for name in ("duration", "fps", "generate_audio"):
+                payload.pop(name)
+            if not request.audio_path:
+                raise InvalidRequestError("Audio-to-video requires an audio URL or file.")
+            self._source("audio", request.audio_path, payload, files)
+        elif request.mode == "i2v":
+            if not request.image_path:
+                raise InvalidRequestError("Image-to-video requires an image URL or file.")
+            self._source("image", request.image_path, payload, files)
+        return endpoint, payload, files or None
+
+    def _source(self, name, location, payload, files):
+        """Send a URL as is; queue a local file for upload to the asset store."""
+        if location.startswith(("http://", "https://")):
+            payload[f"{name}_url"] = location
+        elif not os.path.isfile(location):
+            raise InvalidRequestError(f"{name.capitalize()} file not found: {location}")
+        elif self.assets.store is None:
+            raise InvalidRequestError(
+                f"{name.capitalize()} must be a public HTTPS URL for the API. Set "
+                f"CINECLAW_ASSET_STORE (e.g. s3://bucket/cineclaw) to upload local files.")
+        else:
+            files[name] = os.path.abspath(location)
+
+    def key_data(self, endpoint, payload, files):
+        if not files:
+            return payload
+        # Local files count by content, not by their (expiring) upload URL
+        key_data = dict(payload)
+        for name, filepath in files.items():
+            key_data[f"{name}_sha256"] = self.assets.digest(filepath)
+        return key_data
+
+    def run(self, endpoint, payload, files, output_path, api_key, emit, mode=None,
+            deadline=None):
+        """POST the request and stream the MP4 to output_path.
+
+        files ({"image"|"audio": local path} from prepare()) are uploaded
+        first and sent by URL. deadline (a time.monotonic() value) bounds
+        the socket timeouts.
+        """
+        if files:
+            payload = dict(payload)
+            for name, filepath in files.items():
+                payload[f"{name}_url"] = self.assets.url(filepath, emit,
+                                                         time_left(deadline, None))
+        body = json.dumps(payload).encode("utf-8")
+        headers = {
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json",
+            "User-Agent": "CineClaw/1.0",
+        }
+        emit("submitted", endpoint=endpoint)
+        try:
+            with RETRY.request("POST", endpoint, body=body, headers=headers,
+                               timeout=time_left(deadline, SYNC_TIMEOUT),
+                               rate_key=rate_limit_key(endpoint, payload["model"],
+                                                       api_key)) as resp:
+                content_type = resp.headers.get("Content-Type", "")
+                request_id = resp.headers.get("x-request-id", "unknown")
+                emit("accepted", id=request_id)
+                if "video/mp4" not in content_type and "application/octet-stream" not in content_type:
+                    body = resp.read().decode("utf-8", errors="replace")
+                    raise APIError(resp.status, f"unexpected content type {content_type!r}: "
+                                   f"{body[:500]}", request_id)
+                stats = save_video(resp, output_path, emit=emit)
+        except (urllib.error.URLError, NetworkError) as e:
+            if (deadline is not None and time.monotonic() >= deadline - 1
+                    and not isinstance(e, urllib.error.HTTPError)):
+                reason = getattr(e, "reason", e)
+                raise GenerationTimeout(f"No video within the deadline ({reason})") from e
+            if isinstance(e, NetworkError):
+                raise
+            _raise_api_error(e)
+        return dict(stats, request_id=request_id, cost=None)
+
+
+class AsyncTransport:
+    """The /v1/generations API: submit multipart, wait, download by URL.
+
+    Images and audio are local files uploaded with the request. Waiting is
+    shared through one GenerationPoller; with a WebhookReceiver the API's
+    callback resolves the wait and polling only runs as a safety net. Every
+    step is written to the job journal first, so resume() can finish a job
+    an interrupted process left behind without paying for it twice.
+    """
+
+    name = "async"
+
+    def __init__(self, base_url=None, poller=None, webhook=None, journal=None):
+        self.base_url = base_url
+        self.poller = poller or POLLER
+        self.webhook = webhook
+        self.journal = journal or JOURNAL
+
+    def prepare(self, request):
+        """Validate request and return (endpoint, data, files)."""
+        if request.camera_motion or not request.generate_audio:
+            raise InvalidRequestError("camera_motion and generate_audio are sync API options.")
+        if request.mode == "a2v":
+            if not request.audio_path:
+                raise InvalidRequestError("Audio-to-video requires an audio file.")
+            if not os.path.exists(request.audio_path):
+                raise InvalidRequestError(f"Audio file not found: {request.audio_path}")
+            # Audio-to-video is pro-only at 1080p; duration follows the audio
+            data = {"prompt": request.prompt, "model": "ltx-2-pro", "resolution": "1920x1080"}
+            return "/generations/audio-to-video", data, {"audio": request.audio_path}
+
+        data = {
+            "prompt": request.prompt,
+            "model": request.model,
+            "resolution": request.resolution,
+            "duration": request.duration,
+            "fps": request.fps,
+        }
+        if request.seed is not None:
+            data["seed"] = request.seed
+        if request.mode == "t2v":
+            return "/generations/text-to-video", data, None
+        if request.mode == "i2v":
+            if not request.image_path:
+                raise InvalidRequestError("Image-to-video requires an image file.")
+            if not os.path.exists(request.image_path):
+                raise InvalidRequestError(f"Image file not found: {request.image_path}")
+            return "/generations/image-to-video", data, {"image": request.image_path}
+        raise InvalidRequestError(f"Unknown mode '{request.mode}'. Use t2v, i2v, or a2v.")
+
+    def key_data(self, endpoint, data, files):
+        key_data = dict(data)
+        for name, filepath in (files or {}).items():
+            key_data[f"{name}_sha256"] = hash_file(filepath).hexdigest()
+        return key_data
+
+    def _call(self, endpoint, api_key, **kwargs):
+        try:
+            return api_call(endpoint, api_key, base_url=self.base_url, **kwargs)
+        except urllib.error.URLError as e:
+            _raise_api_error(e)
+
+    def run(self, endpoint, data, files, output_path, api_key, emit, mode=None,
+            deadline=None):
+        """Submit, wait for and download one generation.
+
+        deadline (a time.monotonic() value) bounds the request timeouts and
+        the wait; running out raises GenerationTimeout with the job resumable.
+        """
+        if self.webhook is not None:
+            data = dict(data, callback_url=self.webhook.callback_url)
+        job_id = self.journal.submitted(mode, endpoint, data, files, output_path,
+                                        key_id(api_key))
+        emit("submitted", endpoint=endpoint, job_id=job_id)
+        try:
+            with TRACER.span("submit"):
+                result = self._call(endpoint, api_key, method="POST", data=data, files=files,
+                                    timeout=time_left(deadline, None))
+        except APIError as e:
+            self.journal.failed(job_id, f"HTTP {e.status}")
+            raise
+        # A NetworkError leaves the job "submitted": the request may or may
+        # not have reached the API, so it is neither failed nor retried blindly
+
+        gen_id = result.get("id")
+        if gen_id:
+            self.journal.accepted(job_id, gen_id)
+            emit("accepted", id=gen_id, job_id=job_id)
+        if result.get("status", "processing") != "completed":
+            if not gen_id:
+                self.journal.failed(job_id, "unexpected response")
+                raise LTXError(f"Unexpected response: {json.dumps(result)}")
+            profile = (data.get("model"), data.get("resolution"), data.get("duration"))
+            result = self.wait(gen_id, api_key, profile, job_id, emit,
+                               time_left(deadline, None))
+        return self._download(job_id, result, gen_id, output_path, emit,
+                              time_left(deadline, 60))
+
+    def wait(self, gen_id, api_key, profile=None, job_id=None, emit=None, timeout=None):
+        """Block until gen_id finishes; returns its final record.
+
+        A failed generation is marked failed in the journal; timeouts and
+        network errors leave the job resumable.
+        """
+        with TRACER.span("wait", id=gen_id, webhook=self.webhook is not None) as span:
+            future = self.poller.track(gen_id, api_key, profile, timeout,
+                                       webhook=self.webhook is not None, base_url=self.base_url,
+                                       span=TRACER.current())
+            start = time.time()
+            while not wait([future], timeout=1).done:
+                if emit:
+                    emit("status", id=gen_id, status=self.poller.status(gen_id) or "finishing",
+                         elapsed=time.time() - start)
+            if future.exception() is not None:
+                span.tag(error=error_code(future.exception()))
+        try:
+            return future.result()
+        except GenerationError:
+            self.journal.failed(job_id, str(future.exception()))
+            raise
+        except urllib.error.URLError as e:
+            _raise_api_error(e)
+
+    def _download(self, job_id, result, gen_id, output_path, emit, timeout=60):
+        video_url = result.get("video_url")
+        if not video_url:
+            self.journal.failed(job_id, "no video URL")
+            raise LTXError("No video URL in response")
+        self.journal.completed(job_id, video_url, result.get("cost"))
+        emit("downloading", url=video_url)
+        stats = download_video(video_url, output_path, emit=emit, timeout=min(60, timeout))
+        self.journal.downloaded(job_id, output_path)
+        return dict(stats, request_id=result.get("id", gen_id), cost=result.get("cost"))
+
+    def resume(self, job, api_key, emit):
+        """Finish a journaled job by generation id, without resubmitting it.
+
+        Fetches a fresh status (the recorded video URL may have expired),
+        waits if the job is still running and resumes any .part download.
+        """
+        job_id, gen_id, output_path = job["job_id"], job["gen_id"], job["output_path"]
+        if os.path.exists(output_path) and check_mp4(output_path) is None:
+            # Crashed between the final rename and the journal write
+            self.journal.downloaded(job_id, output_path)
+            return {"path": output_path, "bytes": os.path.getsize(output_path),
+                    "sha256": hash_file(output_path).hexdigest(), "request_id": gen_id}
+        try:
+            result = self._call(f"/generations/{gen_id}", api_key)
+        except APIError as e:
+            if e.status == 404:
+                self.journal.failed(job_id, "generation not found")
+            raise
+        status = result.get("status")
+        if status in ("failed", "error"):
+            self.journal.failed(job_id, result.get("error", "Unknown error"))
+            raise GenerationError(result.get("error", "Unknown error"))
+        if status != "completed":
+            request = json.loads(job["request"])["data"]
+            profile = (request.get("model"), request.get("resolution"), request.get("duration"))
+            result = self.wait(gen_id, api_key, profile, job_id, emit)
+        if not result.get("video_url") and job["video_url"]:
+            result = dict(result, video_url=job["video_url"])
+        return self._download(job_id, result, gen_id, output_path, emit)
+
+
+TRANSPORTS = {"sync": SyncTransport, "async": AsyncTransport}
+
+
+def _ignore_event(event, **info):
+    pass
+
+
+class LTXClient:
+    """Generate LTX-2 videos in-process.
+
+    transport is "sync", "async" or a transport instance. Identical seeded
+    requests are served from the shared result cache (unseeded ones too
+    with cache_unseeded), and with coalesce a request identical to one
+    already running in any process waits for it instead of paying again.
+    Requests are checked against SUPPORTED_CONFIGS before anything is sent;
+    with auto_fix they are moved to the nearest supported configuration
+    instead of being rejected. End-to-end latency is recorded per
+    configuration, which generate(deadline=...) uses to choose one that
+    fits. Every paid generation reserves its estimated
+    cost in the cost ledger first (under project, for per-project caps) and
+    raises BudgetExceeded instead of going over a cap. Jobs then wait for a
+    slot from the scheduler under their priority class.
+
+    api_key is a key, a list of keys or a KeyPool (default: load_keys()).
+    Each job runs on the least-loaded usable key and stays on it until its
+    video is downloaded; a job refused with 401/402/403/429 before the API
+    accepted it moves to another key. on_event(event, **info) receives
+    progress: "auto_fixed", "deadline" (with the request as chosen), "queued",
+    "key_switched", "uploaded", "submitted", "accepted", "status", "downloading",
+    "download_retry", "downloaded" and, with tracing on, "phases".
+
+    The client holds no per-call state, so one instance can be shared by
+    any number of threads.
+    """
+
+    def __init__(self, api_key=None, transport="sync", output_dir=None, use_cache=True,
+                 cache_unseeded=False, coalesce=True, on_event=None, cache=None, flights=None,
+                 validate=True, auto_fix=False, ledger=None, project=None, latency=None,
+                 priority="interactive", scheduler=None):
+        if isinstance(api_key, KeyPool):
+            self.keys = api_key
+        elif api_key:
+            self.keys = KeyPool([api_key] if isinstance(api_key, str) else api_key)
+        else:
+            self.keys = load_keys()
+        if not self.keys:
+            raise LTXError("No API key: pass api_key or set LTX_API_KEY "
+                           "(or LTX_API_KEYS / LTX_API_KEYS_FILE).")
+        self.transport = TRANSPORTS[transport]() if isinstance(transport, str) else transport
+        self.output_dir = output_dir or os.path.expanduser("~/Desktop/cineclaw")
+        self.use_cache = use_cache
+        self.cache_unseeded = cache_unseeded
+        self.coalesce = coalesce
+        self.on_event = on_event or _ignore_event
+        self.cache = cache or CACHE
+        self.flights = flights or FLIGHTS
+        self.validate = validate
+        self.auto_fix = auto_fix
+        self.ledger = ledger or LEDGER
+        self.project = project
+        self.latency = latency or LATENCY
+        if priority not in PRIORITIES:
+            raise InvalidRequestError(f"Unknown priority '{priority}'. "
+                                      f"Use {' or '.join(PRIORITIES)}.")
+        self.priority = priority
+        self.scheduler = scheduler or SCHEDULER
+
+    def generate(self, request, output_path=None, on_event=None, deadline=None, priority=None):
+        """Generate one video and return a GenerationResult.
+
+        With deadline (seconds), the request is first moved to the best
+        configuration whose p90 latency fits (see select_for_deadline()),
+        and the remaining time bounds every network wait. priority
+        overrides the client's priority class for this job.
+
+        Raises InvalidRequestError or BudgetExceeded before anything is
+        sent, JobRequeued if the job is handed back while queued, and
+        APIError, NetworkError, GenerationError, GenerationTimeout or
+        DownloadError afterwards.
+
+        With tracing on (see Tracer) the job and each of its phases are
+        recorded as spans, and on_event also receives "phases" (seconds
+        spent per phase) once the video is saved.
+        """
+        emit = on_event or self.on_event
+        with TRACER.job(mode=request.mode,
+                        transport=getattr(self.transport, "name", "custom")) as job:
+            result = self._generate(request, output_path, emit, deadline, priority)
+            job.tag(outcome="cached" if result.cached else
+                    "coalesced" if result.coalesced else "ok")
+            if job.phases:
+                emit("phases", phases=dict(job.phases))
+            return result
+
+    def _generate(self, request, output_path, emit, deadline, priority):
+        started = time.monotonic()
+        priority = priority or self.priority
+        if priority not in PRIORITIES:
+            raise InvalidRequestError(f"Unknown priority '{priority}'. "
+                                      f"Use {' or '.join(PRIORITIES)}.")
+        if self.auto_fix:
+            request, changes = fix_request(request)
+            for change in changes:
+                emit("auto_fixed", change=change)
+        elif self.validate:
+            check_request(request)
+        if deadline is not None:
+            request, p90, changes = select_for_deadline(
+                request, deadline, getattr(self.transport, "name", "custom"), self.latency)
+            for change in changes:
+                emit("deadline", change=change, p90=p90, request=request)
+        endpoint, payload, files = self.transport.prepare(request)
+        TRACER.tag(model=payload["model"], resolution=payload["resolution"], url=endpoint)
+        est = estimated_cost(payload["model"], payload["resolution"],
+                             payload.get("duration", 10))
+        if not output_path:
+            os.makedirs(self.output_dir, exist_ok=True)
+            output_path = unique_output_path(self.output_dir, request.mode, payload["model"])
+        output_path = str(output_path)
+
+        # Serve identical requests from the result cache
+        cacheable = self.use_cache and (request.seed is not None or self.cache_unseeded)
+        request_key = None
+        if cacheable or self.coalesce:
+            request_key = cache_key(endpoint, self.transport.key_data(endpoint, payload, files))
+        key = request_key if cacheable else None
+        if key:
+            try:
+                hit = self.cache.get(key, output_path)
+            except (OSError, sqlite3.Error) as e:
+                print(f"WARNING: Result cache unavailable: {e}", file=sys.stderr)
+                key = None
+                hit = None
+            if hit:
+                return GenerationResult(output_path, hit["request_id"], hit["bytes"],
+                                        hit["sha256"], 0.0, 0.0, cached=True)
+
+        # Join an identical request that is already in flight; waiting costs nothing
+        flight_key = request_key if self.coalesce else None
+        if flight_key:
+            try:
+                shared = self.flights.join(flight_key)
+            except (OSError, sqlite3.Error) as e:
+                print(f"WARNING: Request coalescing unavailable: {e}", file=sys.stderr)
+                flight_key = None
+                shared = None
+            except RuntimeError as e:
+                raise LTXError(f"Identical in-flight request failed: {e}") from e
+            if shared:
+                link_or_copy(shared["output_path"], output_path)
+                return GenerationResult(output_path, shared["request_id"],
+                                        shared.get("bytes") or os.path.getsize(output_path),
+                                        shared.get("sha256") or "", 0.0, 0.0, coalesced=True)
+
+        # Only the caller that will send the request reserves its estimate
+        try:
+            charge = self.ledger.reserve(est, request.mode, payload["model"],
+                                         payload["resolution"], payload.get("duration", 10),
+                                         self.project)
+        except BaseException as e:
+            if flight_key:
+                self.flights.finish(flight_key, None, str(e))
+            raise
+
+        accepted = []
+        api_key = None
+
+        def track(event, **info):
+            if event == "accepted":
+                accepted.append(info["id"])
+                self.ledger.attach(charge, info["id"], key_id(api_key))
+                TRACER.tag(request_id=info["id"], key=key_id(api_key))
+            emit(event, **info)
+
+        stats = None
+        error = None
+        ticket = None
+        try:
+            with TRACER.span("schedule", priority=priority):
+                ticket = self.scheduler.acquire(
+                    priority,
+                    None if deadline is None else max(0.0, started + deadline - time.monotonic()),
+                    lambda ahead: emit("queued", priority=priority, ahead=ahead))
+            run_started = time.monotonic()
+            refused = set()
+            while True:
+                api_key = self.keys.acquire(refused)
+                try:
+                    stats = self.transport.run(
+                        endpoint, payload, files, output_path, api_key, track,
+                        mode=request.mode,
+                        deadline=None if deadline is None else started + deadline)
+                except BaseException as e:
+                    self.keys.release(api_key, e)
+                    # Refused before acceptance: nothing was billed, try another key
+                    if (isinstance(e, APIError) and e.status in KEY_COOLDOWNS
+                            and not accepted and self.keys.available(refused | {api_key})):
+                        refused.add(api_key)
+                        emit("key_switched", key=self.keys.label(api_key), status=e.status)
+                        continue
+                    raise
+                self.keys.release(api_key, cost=stats.get("cost"))
+                break
+        except LTXError as e:
+            error = str(e)
+            if isinstance(e, GenerationError):
+                accepted.clear()
+            raise
+        finally:
+            if ticket:
+                self.scheduler.release(ticket)
+            # Once accepted the job is billed, unless the generation itself failed
+            if stats is None:
+                if accepted:
+                    self.ledger.settle(charge)
+                else:
+                    self.ledger.release(charge)
+            if flight_key:
+                shared = None
+                if stats:
+                    shared = {"output_path": output_path, "request_id": stats["request_id"],
+                              "bytes": stats["bytes"], "sha256": stats["sha256"]}
+                self.flights.finish(flight_key, shared, error)
+
+        self.ledger.settle(charge, stats.get("cost"), stats["request_id"])
+        profile = latency_profile(getattr(self.transport, "name", "custom"), request.mode,
+                                  payload["model"], payload["resolution"], payload.get("fps"),
+                                  payload.get("duration"))
+        self.latency.record(profile, time.monotonic() - run_started)
+        if key:
+            try:
+                self.cache.put(key, output_path, stats["sha256"], stats["request_id"],
+                               {"mode": request.mode, "model": payload["model"],
+                                "cost": stats.get("cost")})
+            except (OSError, sqlite3.Error) as e:
+                print(f"WARNING: Could not cache result: {e}", file=sys.stderr)
+        return GenerationResult(output_path, stats["request_id"], stats["bytes"],
+                                stats["sha256"], est, stats.get("cost"),
+                                mb_per_sec=stats.get("mb_per_sec", 0.0))
+
+
+# Sweep grid keys: GenerationRequest fields, each one value or a list to sweep
+SWEEP_FIELDS = ("mode", "prompt", "model", "duration", "resolution", "fps", "seed",
+                "camera_motion", "generate_audio", "image_path", "audio_path")
+
+
+def expand_grid(grid):
+    """Every combination of a sweep grid as (swept values, GenerationRequest).
+
+    List values are swept and anything else is held fixed; camera_motion
+    "all" sweeps CAMERA_MOTIONS. Resolution aliases (1080p, 4k, ...) are
+    resolved. swept maps each swept field to this combination's value.
+    """
+    unknown = set(grid) - set(SWEEP_FIELDS)
+    if unknown:
+        raise ValueError(f"unknown grid field(s): {', '.join(sorted(unknown))}")
+    axes = []
+    for name in SWEEP_FIELDS:
+        if name not in grid:
+            continue
+        values = grid[name]
+        if name == "camera_motion" and values == "all":
+            values = list(CAMERA_MOTIONS)
+        if not isinstance(values, list):
+            values = [values]
+        if name == "resolution":
+            values = [RESOLUTIONS.get(str(value).lower().strip(), value) for value in values]
+        if not values:
+            raise ValueError(f"grid field {name} has no values")
+        axes.append((name, values))
+    swept_names = [name for name, values in axes if len(values) > 1]
+    for combo in itertools.product(*(values for _, values in axes)):
+        fields = dict(zip((name for name, _ in axes), combo))
+        swept = {name: fields[name] for name in swept_names}
+        yield swept, GenerationRequest(**fields)
+
+
+def plan_sweep(grid, transports, max_cost=None, cache=None):
+    """Turn a sweep grid into jobs, cheapest first.
+
+    transports is an ordered {name: transport}; each combination goes to the
+    first one whose prepare() accepts it. Combinations already in the result
+    cache cost nothing and sort first. Returns (jobs, dropped): each job is a
+    dict with swept, request, transport, estimated and cached; dropped is a
+    list of (swept, reason) for combinations that are invalid, repeat an
+    earlier combination, or don't fit under max_cost.
+    """
+    cache = cache or CACHE
+    jobs = []
+    dropped = []
+    seen = set()
+    for index, (swept, request) in enumerate(expand_grid(grid)):
+        problems = validate_request(request)
+        if problems:
+            dropped.append((swept, "; ".join(problems)))
+            continue
+        rejections = []
+        for name, transport in transports.items():
+            try:
+                endpoint, payload, files = transport.prepare(request)
+                break
+            except InvalidRequestError as e:
+                rejections.append(f"{name}: {str(e).rstrip('.')}")
+        else:
+            dropped.append((swept, "no API accepts it (" + "; ".join(rejections) + ")"))
+            continue
+        key = cache_key(endpoint, transport.key_data(endpoint, payload, files))
+        if key in seen:
+            dropped.append((swept, "repeats an earlier combination"))
+            continue
+        seen.add(key)
+        try:
+            cached = cache.contains(key)
+        except (OSError, sqlite3.Error):
+            cached = False
+        est = 0.0 if cached else estimated_cost(payload["model"], payload["resolution"],
+                                                payload.get("duration", 10))
+        jobs.append({"index": index, "swept": swept, "request": request, "transport": name,
+                     "estimated": est, "cached": cached})
+
+    jobs.sort(key=lambda job: (job["estimated"], job["index"]))
+    if max_cost is not None:
+        total = 0.0
+        for position, job in enumerate(jobs):
+            if total + job["estimated"] > max_cost + 1e-9:
+                for skipped in jobs[position:]:
+                    dropped.append((skipped["swept"], f"over the ${max_cost:.2f} cost cap"))
+                del jobs[position:]
+                break
+            total += job["estimated"]
+    return jobs, dropped
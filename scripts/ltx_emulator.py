@@ -0,0 +1,783 @@
+#!/usr/bin/env python3
+"""
+ltx_emulator.py — local stand-in for the LTX-2 API, for load tests without credits
+
+Stdlib only. Serves both API styles the scripts target:
+
+    POST /v1/{text,image,audio}-to-video        sync: JSON in, video/mp4 out
+    POST /v1/generations/{text,image,audio}-to-video   async: JSON or multipart in,
+    GET  /v1/generations/{id}                   {"id", "status", "video_url", "cost"}
+    GET  /v1/videos/{id}.mp4                    the finished video (byte ranges)
+    GET  /v1/health
+
+Requests are checked against SUPPORTED_CONFIGS like the real API (422),
+videos are well-formed MP4s (ftyp, moov/mvhd, mdat) of a configurable size
+streamed without being held in memory, generation time is drawn from a
+configurable distribution, and 422/429/5xx answers, slow bodies and dropped
+connections are injected at set rates. Per-key rate and concurrency limits
+answer 429 with Retry-After; webhooks (callback_url) are delivered signed.
+
+Usage:
+    python3 scripts/ltx_emulator.py --port 8900 --video-mb 20 --latency lognormal:8,0.5 \\
+        --errors 429=0.05,503=0.02 --slow 0.1 --drop 0.05
+    export LTX_BASE_URL=http://127.0.0.1:8900/v1
+
+From Python (tests, benchmarks):
+    with LTXEmulator(EmulatorConfig(latency="fixed:0.2", video_bytes=5_000_000)) as api:
+        ltx_client.BASE_URL = api.base_url
+        api.configure(errors={429: 0.2})
+        ...
+        print(api.stats())
+
+A running emulator is reconfigured over HTTP too: POST /_emulator/config with
+a JSON object of EmulatorConfig fields, GET /_emulator/stats, POST /_emulator/reset.
+"""
+
+import sys
+import json
+import math
+import hmac
+import time
+import random
+import socket
+import struct
+import hashlib
+import itertools
+import threading
+import urllib.request
+import email.parser
+import email.policy
+from collections import deque
+from dataclasses import asdict, dataclass, field, fields, replace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+from ltx_client import MODE_NAMES, RESOLUTIONS, estimated_cost, validate_fields
+
+# Largest request body accepted (bytes); the API takes images up to 20MB and audio up to 50MB
+MAX_UPLOAD_BYTES = 50 * 1024 * 1024
+
+# Bytes written per socket send while streaming a video
+WRITE_CHUNK = 64 * 1024
+
+# Duration reported for audio-to-video, whose length follows the audio
+A2V_DURATION = 10
+
+# Status codes the errors option can inject, with the message each carries
+INJECTED_ERRORS = {
+    422: "Invalid parameter combination (injected)",
+    429: "Rate limit exceeded (injected)",
+    500: "Internal server error (injected)",
+    502: "Bad gateway (injected)",
+    503: "Service unavailable (injected)",
+    504: "Gateway timeout (injected)",
+}
+
+
+@dataclass
+class EmulatorConfig:
+    """How the emulator behaves; every field can be changed while it runs.
+
+    latency is a distribution spec (see latency_sampler()) or a {model: spec}
+    dict. errors maps status codes from INJECTED_ERRORS to the fraction of
+    generation requests answered with them (422 only on submission; polls
+    draw 429/5xx). slow_rate and drop_rate are fractions of video bodies sent
+    at slow_bytes_per_sec or cut off part-way. fail_rate is the fraction of
+    async generations that end "failed". per_minute and max_concurrent are
+    per-key limits (0: none); api_keys, if set, are the only keys accepted
+    (401) and broke_keys are answered 402. With fetch_inputs, image_url and
+    audio_url must be downloadable (422 otherwise).
+    """
+    video_bytes: int = 2 * 1024 * 1024
+    latency: object = "uniform:0.5,2"
+    errors: dict = field(default_factory=dict)
+    retry_after: float = 1.0
+    slow_rate: float = 0.0
+    slow_bytes_per_sec: int = 256 * 1024
+    drop_rate: float = 0.0
+    fail_rate: float = 0.0
+    per_minute: int = 0
+    max_concurrent: int = 0
+    api_keys: Optional[list] = None
+    broke_keys: list = field(default_factory=list)
+    webhook_secret: str = ""
+    ranges: bool = True
+    sync_location: bool = False
+    fetch_inputs: bool = False
+    seed: Optional[int] = None
+
+
+def latency_sampler(spec):
+    """Turn a latency spec into sample(rng) -> seconds.
+
+    Specs: "fixed:S" (or just a number), "uniform:LOW,HIGH", "normal:MEAN,SD",
+    "lognormal:MEDIAN,SIGMA", "exp:MEAN", "empirical:S1,S2,..." (replays
+    recorded samples). Samples are never negative.
+    """
+    if isinstance(spec, (int, float)):
+        spec = f"fixed:{spec}"
+    kind, _, args = str(spec).partition(":")
+    try:
+        values = [float(value) for value in args.split(",") if value.strip()]
+    except ValueError:
+        raise ValueError(f"bad latency spec {spec!r}") from None
+    shapes = {
+        "fixed": (1, lambda rng: values[0]),
+        "uniform": (2, lambda rng: rng.uniform(values[0], values[1])),
+        "normal": (2, lambda rng: rng.gauss(values[0], values[1])),
+        "lognormal": (2, lambda rng: rng.lognormvariate(math.log(values[0]), values[1])),
+        "exp": (1, lambda rng: rng.expovariate(1 / values[0])),
+        "empirical": (None, lambda rng: rng.choice(values)),
+    }
+    if kind not in shapes:
+        try:
+            return latency_sampler(f"fixed:{float(kind)}")
+        except ValueError:
+            raise ValueError(f"unknown latency distribution {kind!r} "
+                             f"(use {', '.join(shapes)})") from None
+    count, sample = shapes[kind]
+    if (count is not None and len(values) != count) or not values:
+        raise ValueError(f"{kind} latency takes {count or 'one or more'} value(s)")
+    if kind in ("lognormal", "exp") and values[0] <= 0:
+        raise ValueError(f"{kind} latency needs a positive first value")
+    return lambda rng: max(0.0, sample(rng))
+
+
+def mp4_header(size, duration):
+    """ftyp + moov(mvhd) + the mdat box header of a size-byte MP4 lasting duration seconds."""
+    ftyp = struct.pack(">I4s4sI4s4s4s4s", 32, b"ftyp", b"isom", 512,
+                       b"isom", b"iso2", b"avc1", b"mp41")
+    matrix = struct.pack(">9I", 0x10000, 0, 0, 0, 0x10000, 0, 0, 0, 0x40000000)
+    mvhd = (struct.pack(">I4sIIIIIIH", 108, b"mvhd", 0, 0, 0, 1000, int(duration * 1000),
+                        0x10000, 0x100)
+            + b"\0" * 10 + matrix + b"\0" * 24 + struct.pack(">I", 2))
+    moov = struct.pack(">I4s", 8 + len(mvhd), b"moov") + mvhd
+    head = ftyp + moov
+    mdat_size = size - len(head)
+    if mdat_size < 16:
+        raise ValueError(f"video_bytes must be at least {len(head) + 16}")
+    if mdat_size < 2 ** 32:
+        return head + struct.pack(">I4s", mdat_size, b"mdat")
+    return head + struct.pack(">I4sQ", 1, b"mdat", mdat_size)
+
+
+class Video:
+    """A generated video: its MP4 bytes are produced on demand, in any range."""
+
+    def __init__(self, size, duration, block):
+        self.size = size
+        self.header = mp4_header(size, duration)
+        self.block = block
+
+    def chunks(self, start=0, end=None, chunk_size=WRITE_CHUNK):
+        """Yield bytes [start, end) of the file."""
+        end = self.size if end is None else end
+        position = start
+        while position < end:
+            if position < len(self.header):
+                piece = self.header[position:min(end, len(self.header))]
+            else:
+                offset = (position - len(self.header)) % len(self.block)
+                piece = self.block[offset:offset + min(chunk_size, end - position)]
+            yield piece
+            position += len(piece)
+
+
+class LTXEmulator:
+    """The emulator server. start() runs it on a background thread; base_url
+    is what BASE_URL / LTX_BASE_URL should be set to."""
+
+    def __init__(self, config=None, host="127.0.0.1", port=0):
+        self.config = config or EmulatorConfig()
+        self._lock = threading.Lock()
+        self._samplers = {}
+        self._apply(self.config)
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self.host, self.port = self._server.server_address[:2]
+        self.base_url = f"http://{self.host}:{self.port}/v1"
+        self._thread = None
+        self.reset()
+
+    def _apply(self, config):
+        if isinstance(config.latency, dict):
+            samplers = {model: latency_sampler(spec) for model, spec in config.latency.items()}
+        else:
+            samplers = {"*": latency_sampler(config.latency)}
+        for status in config.errors:
+            if int(status) not in INJECTED_ERRORS:
+                raise ValueError(f"can't inject HTTP {status} "
+                                 f"(use {', '.join(map(str, INJECTED_ERRORS))})")
+        mp4_header(config.video_bytes, 1)
+        reseed = not hasattr(self, "_rng") or config.seed != self.config.seed
+        self.config = replace(config, errors={int(k): float(v) for k, v in config.errors.items()})
+        self._samplers = samplers
+        if reseed:
+            self._rng = random.Random(config.seed)
+            # One random block repeated through every mdat; compresses like real video (not at all)
+            self._block = random.Random(config.seed).randbytes(1024 * 1024)
+
+    def configure(self, **changes):
+        """Change EmulatorConfig fields on the fly; returns the new config."""
+        unknown = set(changes) - {f.name for f in fields(EmulatorConfig)}
+        if unknown:
+            raise ValueError(f"unknown option(s): {', '.join(sorted(unknown))}")
+        with self._lock:
+            self._apply(replace(self.config, **changes))
+            return self.config
+
+    def reset(self):
+        """Forget every generation and zero the counters."""
+        with self._lock:
+            self._jobs = {}
+            self._videos = {}
+            self._ids = itertools.count(1)
+            self._windows = {}
+            self._in_flight = {}
+            self._stats = {"requests": {}, "responses": {}, "injected": {},
+                           "generations": {"submitted": 0, "completed": 0, "failed": 0},
+                           "polls": 0, "webhooks": 0, "bytes_sent": 0, "bytes_received": 0,
+                           "in_flight": 0, "peak_in_flight": 0}
+
+    def stats(self):
+        with self._lock:
+            return json.loads(json.dumps(self._stats))
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        name="ltx-emulator", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # -- decisions, all under the lock so a seeded run is reproducible per request order --
+
+    def _count(self, group, name, n=1):
+        with self._lock:
+            bucket = self._stats[group]
+            bucket[name] = bucket.get(name, 0) + n
+
+    def _draw(self, rate):
+        with self._lock:
+            return rate > 0 and self._rng.random() < rate
+
+    def _inject_error(self, allowed):
+        """A status code to answer with instead of doing the work, or None."""
+        with self._lock:
+            roll = self._rng.random()
+            for status, rate in sorted(self.config.errors.items()):
+                if status not in allowed:
+                    continue
+                if roll < rate:
+                    return status
+                roll -= rate
+        return None
+
+    def _latency(self, model):
+        with self._lock:
+            sampler = self._samplers.get(model) or self._samplers.get("*")
+            if sampler is None:
+                sampler = next(iter(self._samplers.values()))
+            return sampler(self._rng)
+
+    def _admit(self, key):
+        """None if key may start a generation now, else (retry_after, message)."""
+        now = time.monotonic()
+        with self._lock:
+            config = self.config
+            if config.per_minute:
+                window = self._windows.setdefault(key, deque())
+                while window and now - window[0] >= 60:
+                    window.popleft()
+                if len(window) >= config.per_minute:
+                    return 60 - (now - window[0]), "Rate limit exceeded: requests per minute"
+                window.append(now)
+            if config.max_concurrent and self._in_flight.get(key, 0) >= config.max_concurrent:
+                return config.retry_after, "Rate limit exceeded: concurrent generations"
+        return None
+
+    def _track(self, key, delta):
+        with self._lock:
+            self._in_flight[key] = self._in_flight.get(key, 0) + delta
+            total = self._stats["in_flight"] + delta
+            self._stats["in_flight"] = total
+            self._stats["peak_in_flight"] = max(self._stats["peak_in_flight"], total)
+
+    def _new_video(self, duration):
+        with self._lock:
+            video_id = f"gen_{next(self._ids):06d}"
+            video = Video(self.config.video_bytes, duration, self._block)
+            self._videos[video_id] = video
+            return video_id, video
+
+    # -- async generations --
+
+    def _submit(self, key, job, host):
+        video_id, _ = self._new_video(job["duration"])
+        delay = self._latency(job["model"])
+        record = dict(job, id=video_id, key=key, submitted=time.monotonic(),
+                      ready=time.monotonic() + delay, fail=self._draw(self.config.fail_rate),
+                      host=host, finished=False)
+        with self._lock:
+            self._jobs[video_id] = record
+            self._stats["generations"]["submitted"] += 1
+        self._track(key, 1)
+        timer = threading.Timer(delay, self._finish, (video_id,))
+        timer.daemon = True
+        timer.start()
+        return self._record(record)
+
+    def _finish(self, video_id):
+        with self._lock:
+            job = self._jobs.get(video_id)
+            if job is None or job["finished"]:
+                return
+            job["finished"] = True
+            self._stats["generations"]["failed" if job["fail"] else "completed"] += 1
+        self._track(job["key"], -1)
+        if job.get("callback_url"):
+            threading.Thread(target=self._deliver, args=(job,), daemon=True).start()
+
+    def _deliver(self, job):
+        body = json.dumps(self._record(job)).encode("utf-8")
+        headers = {"Content-Type": "application/json", "User-Agent": "LTX-Emulator/1.0"}
+        if self.config.webhook_secret:
+            headers["X-Signature"] = hmac.new(self.config.webhook_secret.encode(), body,
+                                              hashlib.sha256).hexdigest()
+        try:
+            request = urllib.request.Request(job["callback_url"], data=body, headers=headers)
+            with urllib.request.urlopen(request, timeout=10) as resp:
+                resp.read()
+            self._bump("webhooks")
+        except OSError as e:
+            print(f"[emulator] webhook to {job['callback_url']} failed: {e}", file=sys.stderr)
+
+    def _bump(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def _record(self, job):
+        """The API's JSON view of an async generation."""
+        now = time.monotonic()
+        record = {"id": job["id"], "model": job["model"], "resolution": job["resolution"],
+                  "duration": job["duration"]}
+        if not job["finished"] and now < job["ready"]:
+            elapsed = (now - job["submitted"]) / max(1e-9, job["ready"] - job["submitted"])
+            record["status"] = "queued" if elapsed < 0.2 else "processing"
+        elif job["fail"]:
+            record.update(status="failed", error="Generation failed (injected)")
+        else:
+            record.update(status="completed", cost=round(job["cost"], 4),
+                          video_url=f"http://{job['host']}/v1/videos/{job['id']}.mp4")
+        return record
+
+    def _handler(self):
+        emulator = self
+
+        class Handler(EmulatorHandler):
+            pass
+
+        Handler.emulator = emulator
+        return Handler
+
+
+class EmulatorHandler(BaseHTTPRequestHandler):
+    """Routes one request to the emulator; emulator is set per server."""
+
+    protocol_version = "HTTP/1.1"
+    emulator = None
+    # Headers and body go out in separate writes; don't let Nagle hold the body back
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    # -- plumbing --
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_UPLOAD_BYTES:
+            # Drain what we can't accept so the reply isn't lost in a reset
+            remaining = length
+            while remaining:
+                chunk = self.rfile.read(min(WRITE_CHUNK, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+            return None
+        body = self.rfile.read(length)
+        with self.emulator._lock:
+            self.emulator._stats["bytes_received"] += len(body)
+        return body
+
+    def _json(self, status, obj, headers=None):
+        out = json.dumps(obj).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(out)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(out)
+        self.emulator._count("responses", str(status))
+
+    def _error(self, status, message, headers=None):
+        self._json(status, {"error": {"message": message, "code": status}}, headers)
+
+    def _inject(self, allowed):
+        """Answer with an injected error if one is drawn; True if it was."""
+        status = self.emulator._inject_error(allowed)
+        if status is None:
+            return False
+        self.emulator._count("injected", str(status))
+        headers = {"Retry-After": f"{self.emulator.config.retry_after:g}"} if status == 429 else {}
+        self._error(status, INJECTED_ERRORS[status], headers)
+        return True
+
+    def _key(self):
+        """The bearer key, or None once a 401/402 has been sent."""
+        auth = self.headers.get("Authorization", "")
+        key = auth[7:].strip() if auth.startswith("Bearer ") else ""
+        config = self.emulator.config
+        if not key or (config.api_keys is not None and key not in config.api_keys):
+            self._error(401, "Invalid API key")
+            return None
+        if key in config.broke_keys:
+            self._error(402, "Insufficient credits")
+            return None
+        return key
+
+    def _send_video(self, video, video_id, status=200, start=0, end=None, headers=None):
+        """Stream a video (or a byte range of it), slowed or cut off if drawn."""
+        end = video.size if end is None else end
+        emulator = self.emulator
+        slow = emulator._draw(emulator.config.slow_rate)
+        cut = None
+        if emulator._draw(emulator.config.drop_rate):
+            with emulator._lock:
+                cut = start + int((end - start) * emulator._rng.uniform(0.05, 0.95))
+            emulator._count("injected", "drop")
+        if slow:
+            emulator._count("injected", "slow")
+        self.send_response(status)
+        self.send_header("Content-Type", "video/mp4")
+        self.send_header("Content-Length", str(end - start))
+        self.send_header("x-request-id", video_id)
+        if emulator.config.ranges:
+            self.send_header("Accept-Ranges", "bytes")
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        emulator._count("responses", str(status))
+        if self.command == "HEAD":
+            return
+        sent = 0
+        began = time.monotonic()
+        rate = max(1, emulator.config.slow_bytes_per_sec)
+        try:
+            for chunk in video.chunks(start, end if cut is None else cut):
+                self.wfile.write(chunk)
+                sent += len(chunk)
+                if slow:
+                    ahead = sent / rate - (time.monotonic() - began)
+                    if ahead > 0:
+                        time.sleep(ahead)
+        except OSError:
+            self.close_connection = True
+        finally:
+            with emulator._lock:
+                emulator._stats["bytes_sent"] += sent
+        if cut is not None:
+            # Promised Content-Length, delivered less: the client sees a dropped connection
+            self.close_connection = True
+            try:
+                self.connection.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    @staticmethod
+    def _split(path):
+        path = path.split("?", 1)[0]
+        if path.startswith("/v1/"):
+            path = path[3:]
+        return path
+
+    # -- requests --
+
+    def do_GET(self):
+        path = self._split(self.path)
+        if path == "/_emulator/stats":
+            return self._json(200, self.emulator.stats())
+        if path == "/_emulator/config":
+            return self._json(200, asdict(self.emulator.config))
+        self.emulator._count("requests", f"{self.command} /{path.split('/')[1]}")
+        if path == "/health":
+            return self._json(200, {"status": "ok"})
+        if path.startswith("/generations/"):
+            return self._poll(path.rsplit("/", 1)[1])
+        if path.startswith("/videos/") and path.endswith(".mp4"):
+            return self._download(path[len("/videos/"):-4])
+        self._error(404, "Not found")
+
+    do_HEAD = do_GET
+
+    def do_POST(self):
+        path = self._split(self.path)
+        body = self._body()
+        if body is None:
+            return self._error(413, f"Payload too large (max {MAX_UPLOAD_BYTES} bytes)")
+        if not path.startswith("/_emulator/"):
+            self.emulator._count("requests", f"POST {path}")
+        if path == "/_emulator/config":
+            try:
+                config = self.emulator.configure(**json.loads(body or b"{}"))
+            except (ValueError, TypeError) as e:
+                return self._error(400, str(e))
+            return self._json(200, asdict(config))
+        if path == "/_emulator/reset":
+            self.emulator.reset()
+            return self._json(200, {"reset": True})
+        for mode, name in MODE_NAMES.items():
+            if path == f"/{name}-to-video":
+                return self._generate_sync(mode, body)
+            if path == f"/generations/{name}-to-video":
+                return self._generate_async(mode, body)
+        self._error(404, "Not found")
+
+    def _parse(self, body):
+        """(fields, files) from a JSON or multipart body, or None once a 400 is sent."""
+        content_type = self.headers.get("Content-Type", "")
+        files = {}
+        try:
+            if content_type.startswith("multipart/form-data"):
+                message = email.parser.BytesParser(policy=email.policy.HTTP).parsebytes(
+                    f"Content-Type: {content_type}\r\n\r\n".encode("latin-1") + body)
+                fields_ = {}
+                for part in message.iter_parts():
+                    name = part.get_param("name", header="content-disposition")
+                    payload = part.get_payload(decode=True) or b""
+                    if part.get_filename() is not None:
+                        files[name] = payload
+                    else:
+                        fields_[name] = payload.decode("utf-8")
+                for name in ("duration", "fps", "seed"):
+                    if name in fields_:
+                        fields_[name] = int(fields_[name])
+            else:
+                fields_ = json.loads(body or b"{}")
+                if not isinstance(fields_, dict):
+                    raise ValueError("body must be a JSON object")
+        except (ValueError, UnicodeDecodeError) as e:
+            self._error(400, f"Bad request body: {e}")
+            return None
+        return fields_, files
+
+    def _check(self, mode, fields_):
+        """The normalised job, or None once a 422 is sent."""
+        resolution = str(fields_.get("resolution", "1920x1080")).lower()
+        job = {"mode": mode, "prompt": fields_.get("prompt"),
+               "model": fields_.get("model", "ltx-2-fast"),
+               "resolution": RESOLUTIONS.get(resolution, resolution),
+               "fps": fields_.get("fps", 25), "duration": fields_.get("duration", 6),
+               "camera_motion": fields_.get("camera_motion"),
+               "callback_url": fields_.get("callback_url")}
+        if mode == "a2v":
+            job["duration"] = A2V_DURATION
+        problems = validate_fields(mode, job["prompt"], job["model"], job["resolution"],
+                                   job["fps"], job["duration"], job["camera_motion"])
+        if problems:
+            self._error(422, "; ".join(problems))
+            return None
+        job["cost"] = estimated_cost(job["model"], job["resolution"], job["duration"])
+        return job
+
+    def _fetch_inputs(self, fields_):
+        """False once a 422 is sent for an input URL the emulator can't download."""
+        for name in ("image_url", "audio_url"):
+            url = fields_.get(name)
+            if url and self.emulator.config.fetch_inputs:
+                try:
+                    with urllib.request.urlopen(url, timeout=30) as resp:
+                        while resp.read(WRITE_CHUNK):
+                            pass
+                except (OSError, ValueError) as e:
+                    self._error(422, f"Could not fetch {name}: {e}")
+                    return False
+        return True
+
+    def _generate_sync(self, mode, body):
+        key = self._key()
+        if key is None or self._inject((422, 429, 500, 502, 503, 504)):
+            return
+        parsed = self._parse(body)
+        if parsed is None:
+            return
+        fields_, _ = parsed
+        required = {"i2v": "image_url", "a2v": "audio_url"}.get(mode)
+        if required and not fields_.get(required):
+            return self._error(422, f"{required} is required")
+        job = self._check(mode, fields_)
+        if job is None or not self._fetch_inputs(fields_):
+            return
+        limited = self.emulator._admit(key)
+        if limited:
+            self.emulator._count("injected", "rate_limited")
+            return self._error(429, limited[1], {"Retry-After": f"{math.ceil(limited[0])}"})
+        self.emulator._track(key, 1)
+        try:
+            time.sleep(self.emulator._latency(job["model"]))
+            video_id, video = self.emulator._new_video(job["duration"])
+            with self.emulator._lock:
+                self.emulator._stats["generations"]["submitted"] += 1
+                self.emulator._stats["generations"]["completed"] += 1
+            headers = {}
+            if self.emulator.config.sync_location:
+                headers["Content-Location"] = f"/v1/videos/{video_id}.mp4"
+            headers["x-cost"] = f"{job['cost']:.4f}"
+        finally:
+            self.emulator._track(key, -1)
+        self._send_video(video, video_id, headers=headers)
+
+    def _generate_async(self, mode, body):
+        key = self._key()
+        if key is None or self._inject((422, 429, 500, 502, 503, 504)):
+            return
+        parsed = self._parse(body)
+        if parsed is None:
+            return
+        fields_, files = parsed
+        required = {"i2v": "image", "a2v": "audio"}.get(mode)
+        if required and not files.get(required) and not fields_.get(f"{required}_url"):
+            return self._error(422, f"{required} file is required")
+        job = self._check(mode, fields_)
+        if job is None or not self._fetch_inputs(fields_):
+            return
+        limited = self.emulator._admit(key)
+        if limited:
+            self.emulator._count("injected", "rate_limited")
+            return self._error(429, limited[1], {"Retry-After": f"{math.ceil(limited[0])}"})
+        host = self.headers.get("Host") or f"{self.emulator.host}:{self.emulator.port}"
+        self._json(200, self.emulator._submit(key, job, host))
+
+    def _poll(self, video_id):
+        if self._key() is None or self._inject((429, 500, 502, 503, 504)):
+            return
+        with self.emulator._lock:
+            self.emulator._stats["polls"] += 1
+            job = self.emulator._jobs.get(video_id)
+        if job is None:
+            return self._error(404, f"Generation {video_id} not found")
+        self._json(200, self.emulator._record(job))
+
+    def _download(self, video_id):
+        with self.emulator._lock:
+            video = self.emulator._videos.get(video_id)
+            job = self.emulator._jobs.get(video_id)
+        if video is None or (job and (job["fail"] or not job["finished"])):
+            return self._error(404, "Video not found")
+        if self._inject((500, 502, 503)):
+            return
+        range_header = self.headers.get("Range", "")
+        if self.emulator.config.ranges and range_header.startswith("bytes="):
+            first, _, last = range_header[6:].partition("-")
+            try:
+                start = int(first)
+                end = int(last) + 1 if last else video.size
+            except ValueError:
+                start, end = 0, video.size
+            if start >= video.size:
+                return self._error(416, "Range not satisfiable",
+                                   {"Content-Range": f"bytes */{video.size}"})
+            end = min(end, video.size)
+            return self._send_video(video, video_id, 206, start, end, {
+                "Content-Range": f"bytes {start}-{end - 1}/{video.size}"})
+        self._send_video(video, video_id)
+
+
+def parse_errors(text):
+    """"429=0.1,503=0.05" -> {429: 0.1, 503: 0.05}."""
+    errors = {}
+    for item in filter(None, (part.strip() for part in text.split(","))):
+        status, _, rate = item.partition("=")
+        errors[int(status)] = float(rate)
+    return errors
+
+
+def main():
+    args = sys.argv[1:]
+    if "-h" in args or "--help" in args:
+        print(__doc__.strip())
+        print()
+        print("Options: --port N  --host ADDR  --video-mb N  --latency SPEC  --errors CODE=RATE,...")
+        print("         --slow RATE  --slow-kbps N  --drop RATE  --fail RATE  --per-minute N")
+        print("         --max-concurrent N  --keys K1,K2  --broke-keys K1,...  --webhook-secret S")
+        print("         --sync-location  --no-ranges  --fetch-inputs  --seed N")
+        return
+    port = 8900
+    host = "127.0.0.1"
+    config = EmulatorConfig()
+    options = {
+        "--video-mb": ("video_bytes", lambda v: int(float(v) * 1024 * 1024)),
+        "--latency": ("latency", str),
+        "--errors": ("errors", parse_errors),
+        "--slow": ("slow_rate", float),
+        "--slow-kbps": ("slow_bytes_per_sec", lambda v: int(float(v) * 1024)),
+        "--drop": ("drop_rate", float),
+        "--fail": ("fail_rate", float),
+        "--per-minute": ("per_minute", int),
+        "--max-concurrent": ("max_concurrent", int),
+        "--keys": ("api_keys", lambda v: [k for k in v.split(",") if k]),
+        "--broke-keys": ("broke_keys", lambda v: [k for k in v.split(",") if k]),
+        "--webhook-secret": ("webhook_secret", str),
+        "--retry-after": ("retry_after", float),
+        "--seed": ("seed", int),
+    }
+    flags = {"--sync-location": ("sync_location", True), "--no-ranges": ("ranges", False),
+             "--fetch-inputs": ("fetch_inputs", True)}
+    changes = {}
+    i = 0
+    try:
+        while i < len(args):
+            if args[i] == "--port" and i + 1 < len(args):
+                port = int(args[i + 1])
+                i += 2
+            elif args[i] == "--host" and i + 1 < len(args):
+                host = args[i + 1]
+                i += 2
+            elif args[i] in options and i + 1 < len(args):
+                name, convert = options[args[i]]
+                changes[name] = convert(args[i + 1])
+                i += 2
+            elif args[i] in flags:
+                name, value = flags[args[i]]
+                changes[name] = value
+                i += 1
+            else:
+                print(f"WARNING: Ignoring unknown argument {args[i]}", file=sys.stderr)
+                i += 1
+        emulator = LTXEmulator(replace(config, **changes), host, port)
+    except (ValueError, OSError) as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        sys.exit(1)
+    print(f"LTX emulator on {emulator.base_url} (Ctrl-C to stop)")
+    print(f"  export LTX_BASE_URL={emulator.base_url}")
+    try:
+        emulator._server.serve_forever()
+    except KeyboardInterrupt:
+        print()
+    finally:
+        emulator._server.server_close()
+        print(json.dumps(emulator.stats(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,7 @@
 ltx_generate.py — LTX-2 video generation for CineClaw OpenClaw skill
 
 Cross-platform (Windows/Mac/Linux). No curl, no bash escaping issues.
+A thin CLI over ltx_client.py (keep both files side by side).
 
 Usage:
     python3 ltx_generate.py --mode t2v --prompt "scene description"
@@ -11,103 +12,111 @@ Usage:
     python3 ltx_generate.py --mode a2v --audio voice.mp3 --prompt "visual description"
     python3 ltx_generate.py --mode t2v --prompt "scene" --resolution 3840x2160
     python3 ltx_generate.py --estimate --mode t2v --duration 10 --model ltx-2-pro
+    python3 ltx_generate.py resume
+    python3 ltx_generate.py costs --by model --days 7
+    python3 ltx_generate.py --mode t2v --prompt "scene" --model ltx-2-pro --resolution 4k --draft
+    python3 ltx_generate.py promote DRAFT_ID
     python3 ltx_generate.py --test
 """
 
 import sys
 import os
-import json
-import urllib.request
-import urllib.parse
+import signal
+import sqlite3
+import subprocess
+import threading
 import urllib.error
-import time
-from datetime import datetime
-from pathlib import Path
+from datetime import datetime, timedelta
 
-BASE_URL = "https://api.ltx.video/v1"
-
-# Cost per second of video (approximate)
-COST_TABLE = {
-    "ltx-2-fast": {"1920x1080": 0.02, "2560x1440": 0.04, "3840x2160": 0.08},
-    "ltx-2-pro": {"1920x1080": 0.05, "2560x1440": 0.10, "3840x2160": 0.20},
-}
+from ltx_client import (
+    BASE_URL, COST_PER_SEC, DRAFTS, JOURNAL, LATENCY, LEDGER, POLLER, POOL, RESOLUTIONS,
+    STATE_DIR, APIError, AsyncTransport, BudgetExceeded, DownloadError, GenerationRequest,
+    GenerationTimeout, InvalidRequestError, LTXClient, LTXError, NetworkError, WebhookReceiver,
+    draft_request, fix_request, instrument, latency_profile, load_keys, parse_seconds,
+    print_costs, print_keys, print_latency_stats, validate_request,
+)
 
 
 def get_api_key():
-    key = os.environ.get("LTX_API_KEY", "")
+    """The KeyPool of every configured API key (see load_keys())."""
+    try:
+        key = load_keys()
+    except LTXError as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        sys.exit(1)
     if not key:
         print("ERROR: LTX_API_KEY is not set.", file=sys.stderr)
         print("Get your key at https://console.ltx.video", file=sys.stderr)
         print("Set it: export LTX_API_KEY=your_key_here", file=sys.stderr)
+        print("Several keys: LTX_API_KEYS=\"k1,k2\" or LTX_API_KEYS_FILE=keys.txt",
+              file=sys.stderr)
         sys.exit(1)
     return key
 
 
-def api_request(endpoint, api_key, method="GET", data=None, files=None):
-    url = f"{BASE_URL}{endpoint}"
-
-    if files:
-        # Multipart upload for image/audio files
-        boundary = "----CineClawBoundary"
-        body_parts = []
-
-        for key, value in (data or {}).items():
-            body_parts.append(f"--{boundary}\r\n".encode())
-            body_parts.append(f'Content-Disposition: form-data; name="{key}"\r\n\r\n'.encode())
-            body_parts.append(f"{value}\r\n".encode())
-
-        for key, filepath in files.items():
-            filename = os.path.basename(filepath)
-            with open(filepath, "rb") as f:
-                file_data = f.read()
-            body_parts.append(f"--{boundary}\r\n".encode())
-            body_parts.append(
-                f'Content-Disposition: form-data; name="{key}"; filename="{filename}"\r\n'.encode()
-            )
-            body_parts.append(b"Content-Type: application/octet-stream\r\n\r\n")
-            body_parts.append(file_data)
-            body_parts.append(b"\r\n")
-
-        body_parts.append(f"--{boundary}--\r\n".encode())
-        body = b"".join(body_parts)
-
-        req = urllib.request.Request(url, data=body, method="POST")
-        req.add_header("Content-Type", f"multipart/form-data; boundary={boundary}")
-    elif data and method == "POST":
-        body = json.dumps(data).encode("utf-8")
-        req = urllib.request.Request(url, data=body, method="POST")
-        req.add_header("Content-Type", "application/json")
-    else:
-        req = urllib.request.Request(url, method=method)
+def print_pool_stats(pool=POOL):
+    stats = pool.stats()
+    print(f"Connections: {stats['handshakes']} handshakes for {stats['requests']} requests "
+          f"({stats['reuse_ratio']:.0%} reused)")
 
-    req.add_header("Authorization", f"Bearer {api_key}")
-    req.add_header("User-Agent", "CineClaw/1.0")
 
-    try:
-        with urllib.request.urlopen(req) as resp:
-            return json.loads(resp.read().decode("utf-8"))
-    except urllib.error.HTTPError as e:
-        body = e.read().decode("utf-8", errors="replace")
-        print(f"ERROR: HTTP {e.code}: {body}", file=sys.stderr)
-        if e.code == 401:
+def report_error(e):
+    """Print an LTXError the way the CLI always has."""
+    if isinstance(e, BudgetExceeded):
+        print(f"ERROR: Not sent — {e}", file=sys.stderr)
+        print("Raise the cap in CINECLAW_BUDGETS, or see spend with: ltx_generate.py costs",
+              file=sys.stderr)
+    elif isinstance(e, APIError):
+        print(f"ERROR: HTTP {e.status}: {e.message}", file=sys.stderr)
+        if e.status == 401:
             print("API key invalid. Check at console.ltx.video", file=sys.stderr)
-        elif e.code == 402:
+        elif e.status == 402:
             print("Insufficient credits. Add credits at console.ltx.video", file=sys.stderr)
-        elif e.code == 429:
-            print("Rate limited. Wait a minute and retry.", file=sys.stderr)
-        sys.exit(1)
-    except urllib.error.URLError as e:
-        print(f"ERROR: Connection failed: {e.reason}", file=sys.stderr)
-        sys.exit(1)
+        elif e.status == 429:
+            print("Still rate limited after retries. Try again in a few minutes.", file=sys.stderr)
+        elif e.status in (500, 502, 503, 504):
+            print("API error persisted after retries. Try again later.", file=sys.stderr)
+    else:
+        print(f"ERROR: {e}", file=sys.stderr)
+    part_path = getattr(e, "part_path", None)
+    if part_path:
+        print(f"Partial file kept for resume: {part_path}", file=sys.stderr)
+
+
+def print_event(event, **info):
+    """Render client progress events on the terminal."""
+    if event == "queued":
+        print(f"Queued behind {info['ahead']} {info['priority']} job(s) for a free slot...")
+    elif event == "key_switched":
+        print(f"{info['key']} refused the job (HTTP {info['status']}); trying another key...")
+    elif event == "deadline":
+        print(f"Deadline: {info['change']}")
+    elif event == "accepted":
+        print(f"Generation started (ID: {info['id']}). Polling for completion...")
+    elif event == "status":
+        print(f"  Status: {info['status']} ({int(info['elapsed'])}s elapsed)...", end="\r")
+    elif event == "downloading":
+        print()
+        print("Downloading video...")
+    elif event == "download_retry":
+        print(f"  Download interrupted ({info['error']}). Resuming at {info['offset']} bytes "
+              f"in {info['delay']}s (attempt {info['attempt']}/{info['max_attempts']})...")
+    elif event == "phases":
+        # "http" spans wrap dns/connect/send/ttfb, which are listed on their own
+        print("Phases: " + ", ".join(f"{name} {seconds:.2f}s"
+                                     for name, seconds in info["phases"].items()
+                                     if name != "http"))
+    elif event == "downloaded":
+        print(f"  {info['bytes'] / (1024 * 1024):.1f} MB in {info['seconds']:.1f}s "
+              f"({info['mb_per_sec']:.1f} MB/s)")
+        print(f"  SHA-256: {info['sha256']}")
 
 
 def test_connection(api_key):
     try:
-        req = urllib.request.Request(
-            f"{BASE_URL}/health",
-            headers={"Authorization": f"Bearer {api_key}", "User-Agent": "CineClaw/1.0"},
-        )
-        with urllib.request.urlopen(req) as resp:
+        headers = {"Authorization": f"Bearer {api_key}", "User-Agent": "CineClaw/1.0"}
+        with POOL.request("GET", f"{BASE_URL}/health", headers=headers) as resp:
+            resp.read()
             print(f"OK - LTX API reachable (HTTP {resp.status})")
             return True
     except urllib.error.HTTPError as e:
@@ -121,7 +130,7 @@ def test_connection(api_key):
 
 
 def estimate_cost(model, resolution, duration):
-    cost_per_sec = COST_TABLE.get(model, {}).get(resolution, 0.02)
+    cost_per_sec = COST_PER_SEC.get(model, {}).get(resolution, 0.02)
     total = cost_per_sec * duration
     print(f"=== COST ESTIMATE ===")
     print(f"Model: {model}")
@@ -133,146 +142,298 @@ def estimate_cost(model, resolution, duration):
     return total
 
 
-def poll_generation(gen_id, api_key, timeout=300):
-    """Poll for generation completion."""
-    start = time.time()
-    while time.time() - start < timeout:
-        result = api_request(f"/generations/{gen_id}", api_key)
-        status = result.get("status", "unknown")
+# Failures after which the journaled job can still be finished by `resume`
+RESUMABLE_ERRORS = (NetworkError, GenerationTimeout, DownloadError)
 
-        if status == "completed":
-            return result
-        elif status in ("failed", "error"):
-            print(f"ERROR: Generation failed: {result.get('error', 'Unknown error')}", file=sys.stderr)
-            sys.exit(1)
+# Async transport shared by every job in this process; --webhook attaches a receiver
+TRANSPORT = AsyncTransport()
 
-        elapsed = int(time.time() - start)
-        print(f"  Status: {status} ({elapsed}s elapsed)...", end="\r")
-        time.sleep(3)
+# Finals rendered at once by a promotion worker
+PROMOTE_WORKERS = 2
 
-    print(f"\nERROR: Generation timed out after {timeout}s", file=sys.stderr)
-    sys.exit(1)
+# Where background promotion workers write their output
+PROMOTE_LOG = STATE_DIR / "promotions.log"
 
 
-def download_video(video_url, output_path):
-    """Download the generated video."""
-    req = urllib.request.Request(video_url, headers={"User-Agent": "CineClaw/1.0"})
-    with urllib.request.urlopen(req) as resp:
-        with open(output_path, "wb") as f:
-            f.write(resp.read())
-    return output_path
+def start_webhook(bind, public_url=None):
+    """Start the callback receiver on "host:port" and make generate() use it."""
+    host, _, port = bind.rpartition(":")
+    TRANSPORT.webhook = WebhookReceiver(POLLER, host or "127.0.0.1", int(port or 0), public_url,
+                                        os.environ.get("CINECLAW_WEBHOOK_SECRET")).start()
+    return TRANSPORT.webhook
 
 
 def generate(mode, prompt, api_key, model="ltx-2-fast", resolution="1920x1080",
              duration=6, fps=25, seed=None, image_path=None, audio_path=None,
-             output_dir=None):
-    """Main generation function."""
+             output_dir=None, use_cache=True, cache_unseeded=False, coalesce=True,
+             auto_fix=False, project=None, draft=False, deadline=None, priority="interactive"):
+    """Main generation function.
+
+    Identical requests are served from the result cache. Requests without a
+    seed are only cached when cache_unseeded opts in. With coalesce, a request
+    identical to one already running (in this or another process) waits for
+    it and shares its video instead of paying again. Unsupported
+    configurations are rejected locally, or with auto_fix moved to the
+    nearest supported one. The estimate is reserved against the daily and
+    project budgets before the job is sent.
+
+    With draft, the request is rendered at the cheapest supported
+    configuration with a pinned seed and recorded in the draft index, so
+    `promote` can re-render it at full quality later.
+
+    With deadline (seconds), the best configuration whose p90 latency fits
+    is used, or the request is refused before anything is sent. priority is
+    the scheduler class the job queues under for a generation slot.
+    """
 
     # Validate A2V model
     if mode == "a2v" and model != "ltx-2-pro":
         print("NOTE: Audio-to-video requires ltx-2-pro. Switching automatically.")
         model = "ltx-2-pro"
 
-    # Estimate cost
-    est = estimate_cost(model, resolution, duration)
-    print()
-
-    # Build request
-    if mode == "t2v":
-        endpoint = "/generations/text-to-video"
-        data = {
-            "prompt": prompt,
-            "model": model,
-            "resolution": resolution,
-            "duration": duration,
-            "fps": fps,
-        }
-        if seed is not None:
-            data["seed"] = seed
-        files = None
-
-    elif mode == "i2v":
-        if not image_path:
-            print("ERROR: --image required for image-to-video mode", file=sys.stderr)
-            sys.exit(1)
-        if not os.path.exists(image_path):
-            print(f"ERROR: Image file not found: {image_path}", file=sys.stderr)
+    request = GenerationRequest(mode, prompt, model, duration, resolution, fps, seed,
+                                image_path=image_path, audio_path=audio_path)
+    if auto_fix:
+        try:
+            request, changes = fix_request(request)
+        except LTXError as e:
+            report_error(e)
             sys.exit(1)
-        endpoint = "/generations/image-to-video"
-        data = {
-            "prompt": prompt,
-            "model": model,
-            "resolution": resolution,
-            "duration": duration,
-            "fps": fps,
-        }
-        if seed is not None:
-            data["seed"] = seed
-        files = {"image": image_path}
-
-    elif mode == "a2v":
-        if not audio_path:
-            print("ERROR: --audio required for audio-to-video mode", file=sys.stderr)
-            sys.exit(1)
-        if not os.path.exists(audio_path):
-            print(f"ERROR: Audio file not found: {audio_path}", file=sys.stderr)
-            sys.exit(1)
-        endpoint = "/generations/audio-to-video"
-        data = {
-            "prompt": prompt,
-            "model": "ltx-2-pro",
-            "resolution": "1920x1080",
-        }
-        files = {"audio": audio_path}
+        for change in changes:
+            print(f"NOTE: Auto-fix: {change}")
+        prompt, model, resolution = request.prompt, request.model, request.resolution
+        duration, fps = request.duration, request.fps
     else:
-        print(f"ERROR: Unknown mode '{mode}'. Use t2v, i2v, or a2v.", file=sys.stderr)
-        sys.exit(1)
+        problems = validate_request(request)
+        if problems:
+            print("ERROR: Unsupported request (not sent):", file=sys.stderr)
+            for problem in problems:
+                print(f"  - {problem}", file=sys.stderr)
+            print("Pass --auto-fix to use the nearest supported configuration.",
+                  file=sys.stderr)
+            sys.exit(1)
+
+    final = None
+    if draft:
+        request, final = draft_request(request)
+        model, resolution, duration, fps = (request.model, request.resolution,
+                                            request.duration, request.fps)
+        print(f"DRAFT: {model} {resolution} {fps}fps, seed {request.seed} "
+              f"(final: {final.model} {final.resolution} {final.fps}fps)")
 
-    # Send request
+    try:
+        client = LTXClient(api_key, TRANSPORT, output_dir, use_cache, cache_unseeded, coalesce,
+                           on_event=print_event, project=project, priority=priority)
+    except LTXError as e:
+        report_error(e)
+        sys.exit(1)
     print(f"[{mode.upper()}] Generating: {prompt[:80]}...")
     print(f"  Model: {model} | Resolution: {resolution} | Duration: {duration}s | FPS: {fps}")
+    history = LATENCY.get(latency_profile(TRANSPORT.name, mode, model, resolution,
+                                          None if mode == "a2v" else fps,
+                                          None if mode == "a2v" else duration))
+    if history:
+        print(f"  Usually {history['p50']:.3g}s, 90% within {history['p90']:.3g}s")
     print()
 
-    result = api_request(endpoint, api_key, method="POST", data=data, files=files)
-
-    gen_id = result.get("id")
-    status = result.get("status", "processing")
+    # The client picks the configuration for a deadline; keep what it chose
+    chosen = [request]
 
-    if status == "completed":
-        video_url = result.get("video_url")
-    elif gen_id:
-        print(f"Generation started (ID: {gen_id}). Polling for completion...")
-        result = poll_generation(gen_id, api_key)
-        video_url = result.get("video_url")
-    else:
-        print(f"ERROR: Unexpected response: {json.dumps(result, indent=2)}", file=sys.stderr)
-        sys.exit(1)
+    def on_event(event, **info):
+        if event == "deadline":
+            chosen[0] = info["request"]
+        print_event(event, **info)
 
-    if not video_url:
-        print("ERROR: No video URL in response", file=sys.stderr)
+    try:
+        result = client.generate(request, on_event=on_event, deadline=deadline)
+    except LTXError as e:
+        print()
+        report_error(e)
+        if isinstance(e, RESUMABLE_ERRORS) and not JOURNAL.disabled:
+            print("If the job was accepted, finish it later with: ltx_generate.py resume",
+                  file=sys.stderr)
         sys.exit(1)
 
-    # Download video
-    if not output_dir:
-        output_dir = os.path.expanduser("~/Desktop/cineclaw")
-    os.makedirs(output_dir, exist_ok=True)
-
-    timestamp = datetime.now().strftime("%Y-%m-%d-%H%M%S")
-    filename = f"output-{mode}-{model}-{timestamp}.mp4"
-    output_path = os.path.join(output_dir, filename)
-
-    print(f"Downloading video...")
-    download_video(video_url, output_path)
-
-    actual_cost = result.get("cost", est)
+    request = chosen[0]
+    model, resolution, duration, fps = (request.model, request.resolution, request.duration,
+                                        request.fps)
+    draft_id = None
+    if final is not None:
+        try:
+            draft_id = DRAFTS.add_draft(request, final, result.output_path, result.request_id,
+                                        0.0 if result.cached or result.coalesced else result.cost)
+        except (OSError, sqlite3.Error) as e:
+            print(f"WARNING: Could not record draft: {e}", file=sys.stderr)
+
+    if result.cached or result.coalesced:
+        print(f"=== DONE ({'cached' if result.cached else 'shared'}) ===")
+        print(f"Video saved: {result.output_path}")
+        print(f"Generation: {result.request_id}")
+        print(f"Cost: $0.00 ({'cache hit' if result.cached else 'paid by the identical request'})")
+        if draft_id:
+            print(f"Draft: {draft_id} — promote with: python3 ltx_generate.py promote {draft_id}")
+        print("=============")
+        return result.output_path
+
+    actual_cost = result.cost if result.cost is not None else result.estimated_cost
     print()
-    print(f"=== DONE ===")
-    print(f"Video saved: {output_path}")
+    print("=== DONE ===")
+    print(f"Video saved: {result.output_path}")
+    print(f"Estimated: ${result.estimated_cost:.2f}")
     print(f"Cost: ~${actual_cost:.2f}")
     print(f"Duration: {duration}s | Model: {model} | Resolution: {resolution}")
-    print(f"=============")
+    print_pool_stats()
+    poll_stats = POLLER.stats()
+    if poll_stats["completed"]:
+        print(f"Status polls: {poll_stats['polls']} ({poll_stats['polls_per_job']:.1f} per job)")
+    if draft_id:
+        print(f"Draft: {draft_id} — promote with: python3 ltx_generate.py promote {draft_id}")
+    print("=============")
+
+    return result.output_path
 
-    return output_path
+
+def resume_jobs(api_key, job_ids=None):
+    """Finish jobs an earlier run left behind, without resubmitting them.
+
+    Jobs still owned by a running process are skipped, and jobs with no
+    generation id are reported but never sent again — the first request may
+    have been billed.
+    """
+    try:
+        jobs = JOURNAL.unfinished(job_ids)
+    except (OSError, sqlite3.Error) as e:
+        print(f"ERROR: Can't read job journal {JOURNAL.path}: {e}", file=sys.stderr)
+        sys.exit(1)
+    if not jobs:
+        print("No unfinished jobs.")
+        return []
+
+    finished = []
+    for job in jobs:
+        job_id = job["job_id"]
+        started = datetime.fromtimestamp(job["created"]).strftime("%Y-%m-%d %H:%M:%S")
+        if job["state"] == "submitted":
+            print(f"  {job_id}: submitted {started} but no generation id was recorded; "
+                  f"not resubmitted (check console.ltx.video)")
+            continue
+        # Polls and downloads must use the key that submitted the job
+        key = api_key.get(job["key_id"]) if job["key_id"] else api_key.keys[0]
+        if key is None:
+            print(f"  {job_id}: submitted with {job['key_id']}, which is not configured; skipped")
+            continue
+        if not JOURNAL.claim(job_id):
+            print(f"  {job_id}: still running in process {job['owner']}, skipped")
+            continue
+
+        print(f"Resuming {job_id} (generation {job['gen_id']}, {job['state']} {started})...")
+        try:
+            stats = TRANSPORT.resume(job, key, print_event)
+        except LTXError as e:
+            print()
+            report_error(e)
+            continue
+        LEDGER.record_actual(stats["request_id"], stats.get("cost"))
+        print(f"  Video saved: {stats['path']}")
+        finished.append(stats["path"])
+
+    print(f"Resumed {len(finished)} of {len(jobs)} unfinished job(s).")
+    return finished
+
+
+def promote_drafts(api_key, draft_ids, overrides, wait=False, workers=PROMOTE_WORKERS):
+    """Queue the final render of each draft, then render the queue.
+
+    The queue is worked by a detached background process unless wait is
+    set, so the terminal is free as soon as the promotions are recorded.
+    """
+    queued = 0
+    for draft_id in draft_ids:
+        try:
+            final_id, created = DRAFTS.promote(draft_id, **overrides)
+        except KeyError:
+            print(f"  {draft_id}: no such draft (see: ltx_generate.py drafts)", file=sys.stderr)
+            continue
+        except InvalidRequestError as e:
+            print(f"  {draft_id}: {e}", file=sys.stderr)
+            continue
+        final = DRAFTS.get(final_id)
+        req = final["request"]
+        if created:
+            queued += 1
+            print(f"  {draft_id} -> {final_id}: queued {req.model} {req.resolution} "
+                  f"{req.fps}fps {req.duration}s, seed {req.seed}")
+        else:
+            where = final["output_path"] or final["state"]
+            print(f"  {draft_id} -> {final_id}: already promoted ({where})")
+    if not queued:
+        return
+    if wait:
+        run_promotions(api_key, workers)
+        return
+    STATE_DIR.mkdir(parents=True, exist_ok=True)
+    with open(PROMOTE_LOG, "a") as log:
+        subprocess.Popen([sys.executable, os.path.abspath(__file__), "promote", "--run",
+                          "--workers", str(workers)],
+                         stdin=subprocess.DEVNULL, stdout=log, stderr=subprocess.STDOUT,
+                         start_new_session=os.name != "nt")
+    print(f"Rendering {queued} final(s) in the background; log: {PROMOTE_LOG}")
+    print("Check progress with: python3 ltx_generate.py drafts")
+
+
+def run_promotions(api_key, workers=PROMOTE_WORKERS):
+    """Render queued finals until the queue is empty. Returns the count rendered."""
+    client = LTXClient(api_key, TRANSPORT, use_cache=True, coalesce=True, priority="batch")
+    done = []
+
+    def work():
+        while True:
+            final = DRAFTS.claim()
+            if final is None:
+                return
+            req = final["request"]
+            print(f"[promote] {final['render_id']} (draft {final['parent_id']}): "
+                  f"{req.model} {req.resolution} {req.fps}fps seed {req.seed}", flush=True)
+            try:
+                result = client.generate(req)
+            except LTXError as e:
+                DRAFTS.fail(final["render_id"], str(e))
+                print(f"[promote] {final['render_id']} failed: {e}", flush=True)
+                continue
+            cost = 0.0 if result.cached or result.coalesced else result.cost
+            DRAFTS.finish(final["render_id"], result.output_path, result.request_id, cost)
+            done.append(final["render_id"])
+            print(f"[promote] {final['render_id']} saved: {result.output_path}", flush=True)
+
+    threads = [threading.Thread(target=work) for _ in range(max(1, workers))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    print(f"[promote] {len(done)} final(s) rendered", flush=True)
+    return len(done)
+
+
+def list_drafts(limit=20):
+    """Print recent drafts and the finals promoted from them."""
+    drafts = DRAFTS.lineage(limit)
+    if not drafts:
+        print("No drafts yet. Render one with --draft.")
+        return
+    for draft in drafts:
+        req, final = draft["request"], draft["final"]
+        started = datetime.fromtimestamp(draft["created"]).strftime("%Y-%m-%d %H:%M")
+        print(f"{draft['render_id']}  {started}  {req.model} {req.resolution} seed {req.seed}  "
+              f"{req.prompt[:50]}")
+        print(f"    draft: {draft['output_path']}")
+        if not draft["finals"]:
+            print(f"    final: not promoted (default {final.model} {final.resolution} "
+                  f"{final.fps}fps)")
+        for render in draft["finals"]:
+            req = render["request"]
+            detail = render["output_path"] or render["error"] or ""
+            print(f"    final {render['render_id']}: {render['state']}  {req.model} "
+                  f"{req.resolution} {req.fps}fps  {detail}")
 
 
 def main():
@@ -289,24 +450,161 @@ def main():
         print("Options:")
         print("  --prompt TEXT        Video/scene description")
         print("  --model MODEL        ltx-2-fast (default) or ltx-2-pro")
-        print("  --resolution RES     1920x1080 (default), 2560x1440, 3840x2160")
+        print("  --resolution RES     1920x1080 (default), 2560x1440, 3840x2160 (or 1080p/1440p/4k)")
         print("  --duration N         Seconds (default: 6)")
         print("  --fps N              25 (default) or 50")
         print("  --seed N             Seed for reproducibility")
         print("  --image PATH         Image file for i2v mode")
         print("  --audio PATH         Audio file for a2v mode")
         print("  --output DIR         Output directory (default: ~/Desktop/cineclaw)")
+        print("  --no-cache           Always generate, bypassing the result cache")
+        print("  --cache-unseeded     Cache/reuse results even without --seed")
+        print("  --no-coalesce        Don't share results with identical running jobs")
+        print("  --webhook HOST:PORT  Receive completion callbacks instead of polling")
+        print("  --webhook-url URL    Public base URL that reaches the --webhook receiver")
+        print("  --auto-fix           Use the nearest supported model/resolution/fps/duration")
+        print("  --project NAME       Charge the job to NAME's budget")
+        print("  --draft              Cheap preview with a pinned seed; promote it later")
+        print("  --deadline 30s       Best quality whose p90 latency fits, else refuse")
+        print("  --priority CLASS     interactive (default) or batch scheduler class")
         print("  --estimate           Estimate cost only, don't generate")
         print("  --test               Test API connection")
+        print("  --trace FILE         Append per-phase timing spans to FILE (JSONL)")
+        print("  --metrics TARGET     Prometheus metrics: a textfile, or [HOST]:PORT for /metrics")
+        print("  --profile            cProfile + tracemalloc report under ~/.cineclaw/profiles")
+        print()
+        print("Commands:")
+        print("  resume [JOB_ID ...]  Finish jobs an interrupted run left behind (no resubmit)")
+        print("  costs [--by day,model,resolution] [--days N] [--project NAME]  Spend report")
+        print("  drafts               List drafts and their promoted finals")
+        print("  stats                Latency history (p50/p90/p99) per configuration")
+        print("  keys                 API keys and spend per key")
+        print("  promote DRAFT_ID ... [--model M] [--resolution R] [--fps N] [--wait]")
+        print("                       Re-render drafts at final quality (in the background)")
+        print()
+        print("Budgets: CINECLAW_BUDGETS='{\"daily\": 50, \"projects\": {\"NAME\": 200}}' (USD)")
+        print("Several API keys: LTX_API_KEYS=\"k1,k2\", LTX_API_KEY_1, LTX_API_KEY_2, ... or "
+              "LTX_API_KEYS_FILE=keys.txt")
         sys.exit(0)
 
+    # Spend report; needs no API key
+    if args[0] == "costs":
+        by = ("day", "model", "resolution")
+        since = None
+        project = None
+        i = 1
+        while i < len(args):
+            if args[i] == "--by" and i + 1 < len(args):
+                by = tuple(name.strip() for name in args[i + 1].split(",") if name.strip())
+                i += 2
+            elif args[i] == "--since" and i + 1 < len(args):
+                since = args[i + 1]
+                i += 2
+            elif args[i] == "--days" and i + 1 < len(args):
+                since = datetime.now() - timedelta(days=int(args[i + 1]) - 1)
+                since = since.strftime("%Y-%m-%d")
+                i += 2
+            elif args[i] == "--project" and i + 1 < len(args):
+                project = args[i + 1]
+                i += 2
+            else:
+                i += 1
+        try:
+            print_costs(by, since, project)
+        except LTXError as e:
+            print(f"ERROR: {e}", file=sys.stderr)
+            sys.exit(1)
+        return
+
+    if args[0] == "drafts":
+        list_drafts()
+        return
+
+    if args[0] == "stats":
+        try:
+            print_latency_stats()
+        except LTXError as e:
+            print(f"ERROR: {e}", file=sys.stderr)
+            sys.exit(1)
+        return
+
     api_key = get_api_key()
 
     # Test mode
     if args[0] == "--test":
-        test_connection(api_key)
+        for key in api_key.keys:
+            if len(api_key) > 1:
+                print(f"[{api_key.label(key)}]")
+            test_connection(key)
+        return
+
+    if args[0] == "keys":
+        print_keys(api_key)
         return
 
+    # SIGTERM unwinds like Ctrl-C, so in-flight state is released and journaled
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(128 + signum))
+    reason = None
+    try:
+        if args[0] in ("resume", "--resume"):
+            resume_jobs(api_key, args[1:])
+            return
+        if args[0] == "promote":
+            promote(args[1:], api_key)
+            return
+        run(args, api_key)
+    except KeyboardInterrupt:
+        reason = "interrupted"
+        sys.exit(130)
+    except SystemExit as e:
+        if e.code not in (None, 0, 1):
+            reason = reason or f"exit {e.code}"
+        raise
+    finally:
+        if JOURNAL.close(reason):
+            print(file=sys.stderr)
+            print("Interrupted. Unfinished jobs are saved; continue them with: "
+                  "python3 ltx_generate.py resume", file=sys.stderr)
+
+
+def promote(args, api_key):
+    draft_ids = []
+    overrides = {}
+    workers = PROMOTE_WORKERS
+    i = 0
+    while i < len(args):
+        if args[i] == "--model" and i + 1 < len(args):
+            overrides["model"] = args[i + 1]
+            i += 2
+        elif args[i] == "--resolution" and i + 1 < len(args):
+            overrides["resolution"] = RESOLUTIONS.get(args[i + 1].lower().strip(), args[i + 1])
+            i += 2
+        elif args[i] == "--fps" and i + 1 < len(args):
+            overrides["fps"] = int(args[i + 1])
+            i += 2
+        elif args[i] == "--duration" and i + 1 < len(args):
+            overrides["duration"] = int(args[i + 1])
+            i += 2
+        elif args[i] == "--workers" and i + 1 < len(args):
+            workers = int(args[i + 1])
+            i += 2
+        elif not args[i].startswith("--"):
+            draft_ids.append(args[i])
+            i += 1
+        else:
+            i += 1
+
+    if "--run" in args:
+        run_promotions(api_key, workers)
+        return
+    if not draft_ids:
+        print("ERROR: promote needs draft ids (see: ltx_generate.py drafts)", file=sys.stderr)
+        sys.exit(1)
+    promote_drafts(api_key, draft_ids, overrides, "--wait" in args, workers)
+
+
+def run(args, api_key):
+
     # Parse arguments
     mode = None
     prompt = None
@@ -319,6 +617,16 @@ def main():
     audio_path = None
     output_dir = None
     estimate_only = False
+    use_cache = True
+    cache_unseeded = False
+    coalesce = True
+    webhook_bind = None
+    webhook_url = None
+    auto_fix = False
+    project = None
+    draft = False
+    deadline = None
+    priority = "interactive"
 
     i = 0
     while i < len(args):
@@ -332,7 +640,7 @@ def main():
             model = args[i + 1]
             i += 2
         elif args[i] == "--resolution" and i + 1 < len(args):
-            resolution = args[i + 1]
+            resolution = RESOLUTIONS.get(args[i + 1].lower().strip(), args[i + 1])
             i += 2
         elif args[i] == "--duration" and i + 1 < len(args):
             duration = int(args[i + 1])
@@ -355,6 +663,40 @@ def main():
         elif args[i] == "--estimate":
             estimate_only = True
             i += 1
+        elif args[i] == "--no-cache":
+            use_cache = False
+            i += 1
+        elif args[i] == "--cache-unseeded":
+            cache_unseeded = True
+            i += 1
+        elif args[i] == "--no-coalesce":
+            coalesce = False
+            i += 1
+        elif args[i] == "--webhook" and i + 1 < len(args):
+            webhook_bind = args[i + 1]
+            i += 2
+        elif args[i] == "--webhook-url" and i + 1 < len(args):
+            webhook_url = args[i + 1]
+            i += 2
+        elif args[i] == "--auto-fix":
+            auto_fix = True
+            i += 1
+        elif args[i] == "--project" and i + 1 < len(args):
+            project = args[i + 1]
+            i += 2
+        elif args[i] == "--draft":
+            draft = True
+            i += 1
+        elif args[i] == "--deadline" and i + 1 < len(args):
+            try:
+                deadline = parse_seconds(args[i + 1])
+            except ValueError as e:
+                print(f"ERROR: --deadline: {e}", file=sys.stderr)
+                sys.exit(1)
+            i += 2
+        elif args[i] == "--priority" and i + 1 < len(args):
+            priority = args[i + 1]
+            i += 2
         else:
             i += 1
 
@@ -372,9 +714,21 @@ def main():
         print("ERROR: --prompt required", file=sys.stderr)
         sys.exit(1)
 
+    if webhook_bind:
+        receiver = start_webhook(webhook_bind, webhook_url)
+        print(f"Webhook receiver: {receiver.callback_url}")
+
     generate(mode, prompt, api_key, model, resolution, duration, fps, seed,
-             image_path, audio_path, output_dir)
+             image_path, audio_path, output_dir, use_cache, cache_unseeded, coalesce, auto_fix,
+             project, draft, deadline, priority)
+
 
 
 if __name__ == "__main__":
-    main()
+    try:
+        sys.argv[1:], session = instrument(sys.argv[1:])
+    except (ValueError, OSError) as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        sys.exit(1)
+    with session:
+        main()
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+s3_standin.py — local S3-compatible object store for trying asset uploads
+
+Stdlib only. Serves path-style PUT/GET/HEAD/DELETE on
+http://127.0.0.1:PORT/BUCKET/KEY and keeps objects as files under a root
+directory. Every request must carry a valid SigV4 signature (header or
+presigned query), and presigned URLs stop working once they expire, so the
+client's signing and URL refresh are exercised the way a real store would.
+
+Usage:
+    python3 scripts/s3_standin.py --port 9000 --root /tmp/cineclaw-s3
+
+    export CINECLAW_ASSET_STORE=s3://assets/cineclaw
+    export CINECLAW_ASSET_ENDPOINT=http://127.0.0.1:9000
+    export AWS_ACCESS_KEY_ID=standin AWS_SECRET_ACCESS_KEY=standin
+"""
+
+import os
+import sys
+import hmac
+import time
+import calendar
+import mimetypes
+import secrets
+import threading
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from ltx_client import CHUNK_SIZE, sigv4_canonical, sigv4_sign
+
+# Credentials the stand-in accepts (override with --access-key/--secret-key)
+ACCESS_KEY = "standin"
+
+SECRET_KEY = "standin"
+
+# Longest presigned URL lifetime accepted, as on S3 (seconds)
+MAX_EXPIRES = 7 * 86400
+
+
+class ObjectStoreHandler(BaseHTTPRequestHandler):
+    """One S3 request: check its signature, then act on the object file."""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _error(self, status, code, message):
+        body = (f'<?xml version="1.0" encoding="UTF-8"?>\n<Error><Code>{code}</Code>'
+                f"<Message>{message}</Message></Error>").encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/xml")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _authorize(self, path, query):
+        """None if the request is signed with the configured key, else why not."""
+        auth = self.headers.get("Authorization", "")
+        params = dict(query)
+        if auth.startswith("AWS4-HMAC-SHA256 "):
+            fields = dict(part.strip().split("=", 1) for part in auth[17:].split(","))
+            credential = fields.get("Credential", "")
+            signed_names = fields.get("SignedHeaders", "").split(";")
+            signature = fields.get("Signature", "")
+            amz_date = self.headers.get("x-amz-date", "")
+            payload_hash = self.headers.get("x-amz-content-sha256", "UNSIGNED-PAYLOAD")
+        elif params.get("X-Amz-Algorithm") == "AWS4-HMAC-SHA256":
+            credential = params.get("X-Amz-Credential", "")
+            signed_names = params.get("X-Amz-SignedHeaders", "").split(";")
+            signature = params.get("X-Amz-Signature", "")
+            amz_date = params.get("X-Amz-Date", "")
+            payload_hash = "UNSIGNED-PAYLOAD"
+            try:
+                signed_at = calendar.timegm(time.strptime(amz_date, "%Y%m%dT%H%M%SZ"))
+                expires = int(params.get("X-Amz-Expires", ""))
+            except ValueError:
+                return "malformed presigned URL"
+            if expires > MAX_EXPIRES:
+                return "X-Amz-Expires must be at most 604800"
+            if time.time() > signed_at + expires:
+                return "Request has expired"
+        else:
+            return "missing SigV4 signature"
+        scope = credential.split("/")
+        if len(scope) != 5 or scope[0] != self.server.access_key:
+            return "unknown access key"
+        headers = {name: self.headers.get(name, "") for name in signed_names if name}
+        query = [(name, value) for name, value in query if name != "X-Amz-Signature"]
+        expected = sigv4_sign(self.server.secret_key, amz_date, scope[2],
+                              sigv4_canonical(self.command, path, query, headers, payload_hash))
+        if not hmac.compare_digest(expected, signature):
+            return "signature does not match"
+        return None
+
+    def _object(self):
+        """The addressed object's file, or None once an error has been sent."""
+        parts = urllib.parse.urlsplit(self.path)
+        path = urllib.parse.unquote(parts.path)
+        query = urllib.parse.parse_qsl(parts.query, keep_blank_values=True)
+        problem = self._authorize(path, query)
+        if problem:
+            self._error(403, "AccessDenied", problem)
+            return None
+        bucket, _, key = path.lstrip("/").partition("/")
+        target = (self.server.root / bucket / key).resolve()
+        if not bucket or not key or self.server.root.resolve() not in target.parents:
+            self._error(400, "InvalidRequest", "path-style /bucket/key required")
+            return None
+        with self.server.lock:
+            self.server.requests[self.command] += 1
+        return target
+
+    def do_PUT(self):
+        target = self._object()
+        if target is None:
+            return
+        length = self.headers.get("Content-Length")
+        if length is None:
+            self._error(411, "MissingContentLength", "Content-Length required")
+            return
+        remaining = int(length)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_name(f".{target.name}.{secrets.token_hex(4)}.part")
+        with open(tmp, "wb") as f:
+            while remaining:
+                chunk = self.rfile.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                f.write(chunk)
+                remaining -= len(chunk)
+        if remaining:
+            tmp.unlink()
+            self.close_connection = True
+            return
+        os.replace(tmp, target)
+        with self.server.lock:
+            self.server.stored_bytes += int(length)
+        self.send_response(200)
+        self.send_header("ETag", f'"{secrets.token_hex(16)}"')
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_GET(self):
+        target = self._object()
+        if target is None:
+            return
+        if not target.is_file():
+            self._error(404, "NoSuchKey", "The specified key does not exist.")
+            return
+        size = target.stat().st_size
+        self.send_response(200)
+        self.send_header("Content-Type",
+                         mimetypes.guess_type(target.name)[0] or "application/octet-stream")
+        self.send_header("Content-Length", str(size))
+        self.end_headers()
+        if self.command == "HEAD":
+            return
+        with open(target, "rb") as f:
+            while True:
+                chunk = f.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                self.wfile.write(chunk)
+
+    do_HEAD = do_GET
+
+    def do_DELETE(self):
+        target = self._object()
+        if target is None:
+            return
+        target.unlink(missing_ok=True)
+        self.send_response(204)
+        self.end_headers()
+
+
+def make_server(port=9000, root=None, access_key=ACCESS_KEY, secret_key=SECRET_KEY,
+                verbose=False, host="127.0.0.1"):
+    """Build the stand-in server (not yet serving). Objects land under root."""
+    server = ThreadingHTTPServer((host, port), ObjectStoreHandler)
+    server.daemon_threads = True
+    server.root = Path(root or Path.cwd() / "s3-standin")
+    server.root.mkdir(parents=True, exist_ok=True)
+    server.access_key = access_key
+    server.secret_key = secret_key
+    server.verbose = verbose
+    server.lock = threading.Lock()
+    server.stored_bytes = 0
+    server.requests = {"PUT": 0, "GET": 0, "HEAD": 0, "DELETE": 0}
+    return server
+
+
+def main():
+    args = sys.argv[1:]
+    options = {"port": 9000, "root": None, "access_key": ACCESS_KEY,
+               "secret_key": SECRET_KEY, "verbose": "--verbose" in args}
+    i = 0
+    while i < len(args):
+        name = args[i][2:].replace("-", "_") if args[i].startswith("--") else None
+        if name in ("port", "root", "access_key", "secret_key") and i + 1 < len(args):
+            options[name] = int(args[i + 1]) if name == "port" else args[i + 1]
+            i += 2
+        elif args[i] in ("-h", "--help"):
+            print(__doc__.strip())
+            return
+        else:
+            i += 1
+    server = make_server(**options)
+    print(f"S3 stand-in on http://127.0.0.1:{server.server_address[1]} "
+          f"storing under {server.root} (Ctrl-C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print()
+    finally:
+        server.server_close()
+        print(f"Requests: {server.requests}; {server.stored_bytes / (1024 * 1024):.1f} MB stored")
+
+
+if __name__ == "__main__":
+    main()
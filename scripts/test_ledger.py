@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+test_ledger.py — CostLedger reservations and budget caps, alone and behind
+LTXClient against ltx_emulator
+
+Threads and separate processes race for the same cap on one ledger file;
+nothing is mocked. Runs with a scratch CINECLAW_HOME and no client-side rate
+limiting.
+
+Usage:
+    python3 -m unittest scripts/test_ledger.py
+"""
+
+import io
+import os
+import sys
+import atexit
+import contextlib
+import shutil
+import tempfile
+import threading
+import unittest
+import subprocess
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Scratch state and no rate limiting; both must be set before ltx_client is imported
+SCRATCH = Path(tempfile.mkdtemp(prefix="cineclaw-test-"))
+atexit.register(shutil.rmtree, SCRATCH, ignore_errors=True)
+os.environ["CINECLAW_HOME"] = str(SCRATCH)
+os.environ["CINECLAW_RATE_LIMITS"] = "off"
+
+from ltx_client import (  # noqa: E402
+    APIError, BudgetExceeded, CostLedger, GenerationRequest, LTXClient, SingleFlight,
+    SyncTransport, estimated_cost,
+)
+from ltx_emulator import EmulatorConfig, LTXEmulator  # noqa: E402
+
+# Key sent to the emulator (it accepts any)
+TEST_KEY = "test-key"
+
+# What each test reservation asks for; exact in binary, so caps divide evenly
+ESTIMATE = 0.25
+
+# Reserves ESTIMATE on the ledger argv[1] under a daily cap of argv[2] until
+# refused, then prints how many it got
+RESERVER = """
+import sys
+from ltx_client import BudgetExceeded, CostLedger
+ledger = CostLedger(sys.argv[1], {"daily": float(sys.argv[2])})
+count = 0
+while True:
+    try:
+        ledger.reserve(%r, "t2v", "ltx-2-fast", "1920x1080", 6)
+    except BudgetExceeded:
+        break
+    count += 1
+print(count)
+""" % ESTIMATE
+
+
+class LedgerTests(unittest.TestCase):
+
+    def ledger(self, **budgets):
+        return CostLedger(SCRATCH / f"ledger-{self.id()}.sqlite3", budgets)
+
+    def reserve(self, ledger, project=None, estimate=ESTIMATE):
+        return ledger.reserve(estimate, "t2v", "ltx-2-fast", "1920x1080", 6, project)
+
+    def test_lifecycle(self):
+        ledger = self.ledger()
+        settled, estimated, released = (self.reserve(ledger) for _ in range(3))
+        ledger.settle(settled, 0.1, "gen_1")
+        ledger.settle(estimated)
+        ledger.release(released)
+        [row] = ledger.report(())
+        self.assertEqual(row["jobs"], 2)
+        self.assertEqual(row["estimated"], 2 * ESTIMATE)
+        self.assertAlmostEqual(row["actual"], 0.1)
+        self.assertAlmostEqual(row["charged"], 0.1 + ESTIMATE)
+        self.assertEqual(row["reserved"], 0)
+
+    def test_daily_cap(self):
+        ledger = self.ledger(daily=1.0)
+        charges = [self.reserve(ledger) for _ in range(4)]
+        with self.assertRaises(BudgetExceeded) as caught:
+            self.reserve(ledger)
+        self.assertEqual((caught.exception.scope, caught.exception.spent), ("daily", 1.0))
+        # Released reservations and cheaper actual costs free the difference
+        ledger.release(charges[0])
+        ledger.settle(charges[1], 0.0)
+        self.reserve(ledger)
+        self.reserve(ledger)
+        with self.assertRaises(BudgetExceeded):
+            self.reserve(ledger)
+
+    def test_project_cap(self):
+        ledger = self.ledger(projects={"trailer": 0.5})
+        self.reserve(ledger, "trailer")
+        self.reserve(ledger, "trailer")
+        with self.assertRaises(BudgetExceeded) as caught:
+            self.reserve(ledger, "trailer")
+        self.assertEqual(caught.exception.scope, "project 'trailer'")
+        self.reserve(ledger, "teaser")
+        self.reserve(ledger)
+        rows = ledger.report(("project",))
+        self.assertEqual([(row["project"], row["jobs"]) for row in rows],
+                         [(None, 1), ("teaser", 1), ("trailer", 2)])
+
+    def test_concurrent_threads(self):
+        ledger = self.ledger(daily=2.0)
+        granted = []
+        refused = []
+        start = threading.Barrier(16)
+
+        def worker():
+            start.wait()
+            for _ in range(4):
+                try:
+                    granted.append(self.reserve(ledger))
+                except BudgetExceeded:
+                    refused.append(1)
+
+        threads = [threading.Thread(target=worker) for _ in range(16)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(granted), 8)
+        self.assertEqual(len(refused), 56)
+        self.assertEqual(ledger.report(())[0]["charged"], 2.0)
+
+    def test_concurrent_processes(self):
+        path = SCRATCH / f"ledger-{self.id()}.sqlite3"
+        workers = [subprocess.Popen([sys.executable, "-c", RESERVER, str(path), "5.0"],
+                                    cwd=os.path.dirname(os.path.abspath(__file__)),
+                                    stdout=subprocess.PIPE, text=True)
+                   for _ in range(4)]
+        counts = [int(worker.communicate(timeout=60)[0]) for worker in workers]
+        self.assertEqual(sum(counts), 20)
+        [row] = CostLedger(path, {}).report(())
+        self.assertEqual((row["jobs"], row["charged"]), (20, 5.0))
+
+
+class ClientLedgerTests(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.api = LTXEmulator(EmulatorConfig(latency="fixed:0.5", video_bytes=64 * 1024,
+                                             seed=1)).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.api.stop()
+
+    def setUp(self):
+        self.api.configure(errors={})
+        self.ledger = CostLedger(SCRATCH / f"ledger-{self.id()}.sqlite3",
+                                 {"daily": estimated_cost("ltx-2-fast", "1920x1080", 6)})
+
+    def client(self):
+        return LTXClient(TEST_KEY, SyncTransport(self.api.base_url), SCRATCH / "videos",
+                         use_cache=False, ledger=self.ledger,
+                         flights=SingleFlight(SCRATCH / f"flights-{self.id()}.sqlite3"))
+
+    def request(self, prompt):
+        return GenerationRequest("t2v", prompt)
+
+    def test_coalesced_waiters_reserve_nothing(self):
+        # The cap fits one job, so every caller but the leader must share its video
+        client = self.client()
+        results = []
+        errors = []
+        start = threading.Barrier(4)
+
+        def worker():
+            start.wait()
+            try:
+                results.append(client.generate(self.request("A heron lifts off a still lake")))
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        # Waiters announce themselves on stderr
+        with contextlib.redirect_stderr(io.StringIO()) as out:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(out.getvalue().count("waiting for it"), 3)
+        self.assertEqual(sorted(result.coalesced for result in results),
+                         [False, True, True, True])
+        self.assertEqual(len({result.request_id for result in results}), 1)
+        self.assertEqual(self.ledger.report(())[0]["jobs"], 1)
+        with self.assertRaises(BudgetExceeded):
+            client.generate(self.request("A heron lands on a still lake"))
+
+    def test_rejected_job_is_released(self):
+        self.api.configure(errors={422: 1.0})
+        with self.assertRaises(APIError):
+            self.client().generate(self.request("A kite over the dunes"))
+        self.assertEqual(self.ledger.report(())[0]["jobs"], 0)
+        # The released estimate is available again
+        self.api.configure(errors={})
+        result = self.client().generate(self.request("A kite over the dunes"))
+        self.assertFalse(result.coalesced)
+        self.assertEqual(self.ledger.report(())[0]["jobs"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+test_validation.py — the supported-configurations validator, fix_request() and
+the batch manifest check, plus what ltx_emulator says about the same requests
+
+Local checks run without the network; the emulator answers the requests that
+do get sent, with the real 422 for unsupported ones. Runs with a scratch
+CINECLAW_HOME and no client-side rate limiting.
+
+Usage:
+    python3 -m unittest scripts/test_validation.py
+"""
+
+import os
+import sys
+import json
+import atexit
+import shutil
+import tempfile
+import unittest
+import urllib.error
+import importlib.util
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Scratch state and no rate limiting; both must be set before ltx_client is imported
+SCRATCH = Path(tempfile.mkdtemp(prefix="cineclaw-test-"))
+atexit.register(shutil.rmtree, SCRATCH, ignore_errors=True)
+os.environ["CINECLAW_HOME"] = str(SCRATCH)
+os.environ["CINECLAW_RATE_LIMITS"] = "off"
+
+from ltx_client import (  # noqa: E402
+    MAX_PROMPT_CHARS, SUPPORTED_CONFIGS, GenerationRequest, InvalidRequestError,
+    LTXClient, SyncTransport, api_call, check_request, fix_request, validate_fields,
+    validate_request,
+)
+from ltx_emulator import EmulatorConfig, LTXEmulator  # noqa: E402
+
+# Key sent to the emulator (it accepts any)
+TEST_KEY = "test-key"
+
+# A prompt every test request can use
+PROMPT = "A red fox trots across fresh snow at dawn"
+
+# The top-level CLI, loaded under its own name since scripts/ has an ltx_generate.py too
+_spec = importlib.util.spec_from_file_location(
+    "cineclaw_cli", Path(__file__).resolve().parent.parent / "ltx_generate.py")
+cli = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(cli)
+
+
+def request(**fields):
+    """A t2v request for PROMPT with fields overridden."""
+    return GenerationRequest(**dict({"mode": "t2v", "prompt": PROMPT}, **fields))
+
+
+class ValidateTests(unittest.TestCase):
+
+    def test_every_supported_config_passes(self):
+        for (model, resolution, fps), (low, high) in SUPPORTED_CONFIGS.items():
+            for duration in (low, high):
+                self.assertEqual(validate_fields("t2v", PROMPT, model, resolution, fps,
+                                                 duration), [])
+
+    def test_duration_range(self):
+        # ltx-2-fast allows 6-10s at 1080p/50fps but 6-20s at 25fps
+        self.assertEqual(validate_request(request(fps=50, duration=20)),
+                         ["ltx-2-fast at 1920x1080/50fps allows 6-10s, not 20s"])
+        self.assertEqual(validate_request(request(duration=20)), [])
+        self.assertTrue(validate_request(request(duration=5)))
+
+    def test_unsupported_combination(self):
+        self.assertEqual(validate_request(request(resolution="3840x2160", fps=50)),
+                         ["ltx-2-fast doesn't support 3840x2160 at 50fps"])
+
+    def test_unknown_values(self):
+        problems = validate_request(request(model="ltx-3", mode="v2v", camera_motion="orbit"))
+        self.assertEqual(len(problems), 3)
+        self.assertIn("unknown camera motion 'orbit'", problems)
+        self.assertTrue(problems[1].startswith("unknown model 'ltx-3'"))
+        self.assertTrue(problems[2].startswith("unknown mode 'v2v'"))
+
+    def test_a2v_is_pro_1080p_only(self):
+        self.assertEqual(validate_request(request(mode="a2v", model="ltx-2-pro")), [])
+        self.assertEqual(validate_request(request(mode="a2v")),
+                         ["a2v only supports ltx-2-pro at 1920x1080"])
+
+    def test_prompt_limits(self):
+        self.assertEqual(validate_request(request(prompt="  ")), ["prompt is empty"])
+        self.assertEqual(validate_request(request(prompt=None)), ["prompt is empty"])
+        self.assertEqual(validate_request(request(prompt="x" * MAX_PROMPT_CHARS)), [])
+        self.assertEqual(validate_request(request(prompt="x" * (MAX_PROMPT_CHARS + 1))),
+                         [f"prompt is {MAX_PROMPT_CHARS + 1} characters "
+                          f"(max {MAX_PROMPT_CHARS})"])
+
+    def test_wrong_types(self):
+        self.assertEqual(validate_request(request(duration="6")),
+                         ["fps and duration must be numbers, not 25 and '6'"])
+        self.assertEqual(validate_request(request(model=["ltx-2-fast"])),
+                         ["mode, model, resolution and camera_motion must be strings"])
+
+    def test_check_request(self):
+        check_request(request())
+        with self.assertRaises(InvalidRequestError) as caught:
+            check_request(request(prompt="", duration=30))
+        self.assertEqual(str(caught.exception), "Invalid request: prompt is empty; "
+                         "ltx-2-fast at 1920x1080/25fps allows 6-20s, not 30s")
+
+
+class FixRequestTests(unittest.TestCase):
+
+    def test_valid_request_unchanged(self):
+        original = request(model="ltx-2-pro", resolution="2560x1440", fps=50, duration=8)
+        self.assertEqual(fix_request(original), (original, []))
+
+    def test_trims_duration_before_dropping_fps(self):
+        fixed, changes = fix_request(request(fps=50, duration=12))
+        self.assertEqual((fixed.fps, fixed.duration), (50, 10))
+        self.assertEqual(changes, ["duration 12 -> 10 (nearest supported: "
+                                   "ltx-2-fast 1920x1080/50fps, 6-10s)"])
+
+    def test_drops_fps_for_long_videos(self):
+        fixed, changes = fix_request(request(fps=50, duration=20))
+        self.assertEqual((fixed.fps, fixed.duration), (25, 20))
+        self.assertEqual(len(changes), 1)
+
+    def test_changes_model_last(self):
+        # ltx-2-pro has 4k at 50fps, but dropping to 25fps costs less than switching model
+        fixed, _ = fix_request(request(resolution="3840x2160", fps=50))
+        self.assertEqual((fixed.model, fixed.resolution, fixed.fps),
+                         ("ltx-2-fast", "3840x2160", 25))
+        fixed, _ = fix_request(request(model="nope"))
+        self.assertEqual(fixed.model, "ltx-2-fast")
+
+    def test_trims_prompt_at_a_word(self):
+        fixed, changes = fix_request(request(prompt="word " * 1200))
+        self.assertLessEqual(len(fixed.prompt), MAX_PROMPT_CHARS)
+        self.assertTrue(fixed.prompt.endswith("word"))
+        self.assertEqual(changes, [f"prompt trimmed from 6000 to {len(fixed.prompt)} characters"])
+
+    def test_a2v_and_camera_motion(self):
+        fixed, changes = fix_request(request(mode="a2v", resolution="3840x2160",
+                                             camera_motion="orbit"))
+        self.assertEqual((fixed.model, fixed.resolution, fixed.camera_motion),
+                         ("ltx-2-pro", "1920x1080", None))
+        self.assertEqual(len(changes), 3)
+
+    def test_unfixable(self):
+        for bad in (request(prompt=""), request(mode="v2v"), request(duration="6"),
+                    request(model="nope", duration="6"), request(fps="25"),
+                    request(model=["ltx-2-fast"])):
+            with self.assertRaises(InvalidRequestError):
+                fix_request(bad)
+
+
+class ManifestTests(unittest.TestCase):
+
+    def write(self, jobs):
+        path = SCRATCH / f"manifest-{self.id()}.jsonl"
+        path.write_text("".join(line if isinstance(line, str) else json.dumps(line) + "\n"
+                                for line in jobs), encoding="utf-8")
+        return path
+
+    def test_problems_by_line(self):
+        path = self.write([
+            {"mode": "t2v", "prompt": PROMPT},
+            "# comment\n",
+            "\n",
+            {"mode": "t2v", "prompt": PROMPT, "fps": 50, "duration": 20},
+            "not json\n",
+            {"mode": "t2v", "prompt": PROMPT, "colour": "red"},
+            {"mode": "t2v", "prompt": PROMPT, "resolution": "4k"},
+        ])
+        rows, problems = cli.validate_manifest(path)
+        self.assertEqual(rows, 5)
+        self.assertEqual([line_no for line_no, _ in problems], [4, 5, 6])
+        self.assertEqual(problems[2][1], "unknown field(s): colour")
+
+    def test_auto_fix(self):
+        job = {"mode": "t2v", "prompt": PROMPT, "fps": 50, "duration": 20}
+        path = self.write([job, job, dict(job, prompt=""), dict(job, duration="20")])
+        self.assertEqual(len(cli.validate_manifest(path)[1]), 4)
+        rows, problems = cli.validate_manifest(path, auto_fix=True)
+        self.assertEqual(rows, 4)
+        self.assertEqual([line_no for line_no, _ in problems], [3, 4])
+
+    def test_large_manifest(self):
+        # Repeated configurations are memoized; every tenth row is invalid
+        jobs = [{"mode": "t2v", "prompt": f"{PROMPT} #{i}", "duration": 30 if i % 10 == 0 else 6}
+                for i in range(20000)]
+        rows, problems = cli.validate_manifest(self.write(jobs))
+        self.assertEqual((rows, len(problems)), (20000, 2000))
+
+
+class EmulatorTests(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.api = LTXEmulator(EmulatorConfig(latency="fixed:0.1", video_bytes=64 * 1024,
+                                             seed=1)).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.api.stop()
+
+    def sent(self):
+        return sum(self.api.stats()["requests"].values())
+
+    def client(self, **options):
+        return LTXClient(TEST_KEY, SyncTransport(self.api.base_url), SCRATCH / "videos",
+                         use_cache=False, coalesce=False, **options)
+
+    def test_emulator_rejects_what_validator_rejects(self):
+        data = {"prompt": PROMPT, "model": "ltx-2-fast", "resolution": "3840x2160",
+                "fps": 50, "duration": 6}
+        with self.assertRaises(urllib.error.HTTPError) as caught:
+            api_call("/generations/text-to-video", TEST_KEY, method="POST", data=data,
+                     base_url=self.api.base_url)
+        self.assertEqual(caught.exception.code, 422)
+        self.assertIn("doesn't support 3840x2160 at 50fps", caught.exception.read().decode())
+
+    def test_rejected_locally(self):
+        before = self.sent()
+        with self.assertRaises(InvalidRequestError):
+            self.client().generate(request(resolution="3840x2160", fps=50))
+        self.assertEqual(self.sent(), before)
+
+    def test_auto_fixed_request_is_accepted(self):
+        changes = []
+        result = self.client(auto_fix=True).generate(
+            request(fps=50, duration=12),
+            on_event=lambda event, **info: changes.append(info.get("change")))
+        self.assertEqual(result.bytes, 64 * 1024)
+        self.assertIn("duration 12 -> 10 (nearest supported: ltx-2-fast 1920x1080/50fps, "
+                      "6-10s)", changes)
+
+
+if __name__ == "__main__":
+    unittest.main()
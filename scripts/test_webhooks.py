@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+test_webhooks.py — WebhookReceiver and GenerationPoller.notify() against ltx_emulator
+
+The emulator sends real signed callbacks to a real receiver; nothing is
+mocked. Runs with a scratch CINECLAW_HOME and no client-side rate limiting.
+
+Usage:
+    python3 -m unittest scripts/test_webhooks.py
+"""
+
+import os
+import sys
+import atexit
+import hmac
+import json
+import time
+import shutil
+import hashlib
+import tempfile
+import unittest
+import http.client
+import urllib.error
+import urllib.parse
+import urllib.request
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Scratch state and no rate limiting; both must be set before ltx_client is imported
+SCRATCH = Path(tempfile.mkdtemp(prefix="cineclaw-test-"))
+atexit.register(shutil.rmtree, SCRATCH, ignore_errors=True)
+os.environ["CINECLAW_HOME"] = str(SCRATCH)
+os.environ["CINECLAW_RATE_LIMITS"] = "off"
+
+from ltx_client import GenerationPoller, WebhookReceiver, api_call  # noqa: E402
+from ltx_emulator import EmulatorConfig, LTXEmulator  # noqa: E402
+
+# Shared by the emulator and the receiver
+SECRET = "test-secret"
+
+# Key sent to the emulator (it accepts any)
+TEST_KEY = "test-key"
+
+# Where a callback is sent to be lost: nothing listens on port 1
+LOST_URL = "http://127.0.0.1:1/cineclaw/callback/lost"
+
+
+def wait_for(condition, timeout=10.0):
+    """Poll condition() until it is true; False if timeout runs out first."""
+    end = time.monotonic() + timeout
+    while time.monotonic() < end:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+class WebhookTests(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.api = LTXEmulator(EmulatorConfig(latency="fixed:0.2", video_bytes=64 * 1024,
+                                             webhook_secret=SECRET, seed=1)).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.api.stop()
+
+    def setUp(self):
+        self.api.configure(webhook_secret=SECRET)
+        self.poller = GenerationPoller(SCRATCH / f"timings-{self.id()}.sqlite3")
+        self.receiver = WebhookReceiver(self.poller, secret=SECRET).start()
+        self.addCleanup(self.receiver.stop)
+
+    def submit(self, callback_url=None):
+        """Start an async generation on the emulator; returns its id."""
+        data = {"prompt": "A red fox trots across fresh snow at dawn", "model": "ltx-2-fast",
+                "duration": 6, "resolution": "1920x1080",
+                "callback_url": callback_url or self.receiver.callback_url}
+        return api_call("/generations/text-to-video", TEST_KEY, method="POST", data=data,
+                        base_url=self.api.base_url)["id"]
+
+    def track(self, gen_id, timeout=30):
+        return self.poller.track(gen_id, TEST_KEY, timeout=timeout, webhook=True,
+                                 base_url=self.api.base_url)
+
+    def post(self, body, signature=None, headers=None):
+        """POST body to the receiver's callback URL; returns the status code."""
+        headers = dict(headers or {}, **{"Content-Type": "application/json"})
+        if signature is None:
+            signature = hmac.new(SECRET.encode(), body, hashlib.sha256).hexdigest()
+        headers["X-Signature"] = signature
+        request = urllib.request.Request(self.receiver.callback_url, data=body,
+                                         headers=headers)
+        try:
+            with urllib.request.urlopen(request, timeout=10) as resp:
+                return resp.status
+        except urllib.error.HTTPError as e:
+            return e.code
+
+    def test_delivery(self):
+        gen_id = self.submit()
+        record = self.track(gen_id).result(timeout=10)
+        self.assertEqual(record["id"], gen_id)
+        self.assertEqual(record["status"], "completed")
+        self.assertEqual(self.receiver.counts["delivered"], 1)
+        stats = self.poller.stats()
+        self.assertEqual(stats["completed_by"], {"push": 1})
+        self.assertEqual(stats["polls"], 0)
+
+    def test_duplicate_callback(self):
+        gen_id = self.submit()
+        record = self.track(gen_id).result(timeout=10)
+        self.assertEqual(self.post(json.dumps(record).encode()), 200)
+        self.assertEqual(self.receiver.counts["duplicate"], 1)
+        self.assertEqual(self.poller.stats()["completed"], 1)
+
+    def test_bad_signature_rejected(self):
+        self.api.configure(webhook_secret="not-the-secret")
+        gen_id = self.submit()
+        future = self.track(gen_id)
+        self.assertTrue(wait_for(lambda: self.receiver.counts["rejected"] == 1))
+        self.assertFalse(future.done())
+        body = json.dumps({"id": gen_id, "status": "completed"}).encode()
+        self.assertEqual(self.post(body, signature="0" * 64), 401)
+        self.assertEqual(self.post(body, signature=""), 401)
+        self.assertFalse(future.done())
+        self.assertEqual(self.receiver.counts["delivered"], 0)
+
+    def test_early_callback(self):
+        gen_id = self.submit()
+        self.assertTrue(wait_for(lambda: self.receiver.counts["early"] == 1))
+        record = self.track(gen_id).result(timeout=1)
+        self.assertEqual(record["id"], gen_id)
+        self.assertEqual(self.poller.stats()["completed_by"], {"push": 1})
+
+    def test_lost_callback_falls_back_to_polling(self):
+        gen_id = self.submit(callback_url=LOST_URL)
+        # With no history the first poll lands at the timeout, well after the job ends
+        record = self.track(gen_id, timeout=2).result(timeout=10)
+        self.assertEqual(record["id"], gen_id)
+        self.assertEqual(self.poller.stats()["completed_by"], {"poll": 1})
+        self.assertEqual(self.receiver.counts["delivered"], 0)
+
+    def test_bad_content_length(self):
+        url = urllib.parse.urlsplit(self.receiver.callback_url)
+        for length in ("abc", "-1"):
+            conn = http.client.HTTPConnection(url.hostname, url.port, timeout=5)
+            conn.putrequest("POST", url.path)
+            conn.putheader("Content-Length", length)
+            conn.endheaders()
+            self.assertEqual(conn.getresponse().status, 400)
+            conn.close()
+        self.assertEqual(self.receiver.counts["rejected"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()